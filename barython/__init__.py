@@ -3,31 +3,94 @@ import logging
 import time
 import threading
 
-from barython import tools
 from barython.hooks import HooksPool
+from barython.log import log_sampled
+from barython.metrics import registry
 
 
 logger = logging.getLogger("barython")
 
 
 class _BarSpawner():
-    _cache = None
+    #: content versions of the last drawn frame
+    _versions = None
+    #: monotonic time of the last start, used to measure the first frame
+    _start_time = None
+    #: seconds between start() and the first frame written in the bar
+    time_to_first_frame = None
 
     def _write_in_bar(self, content):
         if self._stop.is_set():
             return
+        metrics_enabled = registry.enabled
+        if metrics_enabled:
+            start = time.monotonic()
         self._bar.stdin.write(content)
-        logger.debug("Writing {}".format(content))
+        log_sampled(logging.DEBUG, "write", "Writing {}", content)
         self._bar.stdin.flush()
+        if metrics_enabled:
+            registry.histogram("write").observe(time.monotonic() - start)
+            registry.frame_written(len(content))
+
+    def _first_frame_drawn(self):
+        """
+        Report the time-to-first-frame metric once per start
+        """
+        if self.time_to_first_frame is not None or self._start_time is None:
+            return
+        self.time_to_first_frame = time.monotonic() - self._start_time
+        if registry.enabled:
+            registry.gauge("time_to_first_frame").set(self.time_to_first_frame)
+        logger.info(
+            "First frame drawn in {:.3f}s".format(self.time_to_first_frame)
+        )
 
     def draw(self):
         """
         Draws the bar on the screen
         """
-        content = (self.gather() + "\n").encode()
-        if self._cache == content:
+        if registry.enabled:
+            return registry.timed(
+                "{}.draw".format(self.__class__.__name__), self._draw
+            )
+        return self._draw()
+
+    @property
+    def suspended(self):
+        return self._suspended.is_set()
+
+    def suspend(self):
+        """
+        Drop the redraws until resumed
+        """
+        self._suspended.set()
+
+    def resume(self):
+        """
+        Allow the redraws again
+        """
+        self._suspended.clear()
+
+    def _draw(self):
+        if self._suspended.is_set():
+            # nothing is shown, the versions are kept so the first frame
+            # after resuming catches up all changes
+            return
+        # versions and content come from the same capture: a widget updated
+        # meanwhile will trigger a new draw
+        captured = self.capture()
+        versions = self.content_versions(captured)
+        if self._versions == versions:
             return
-        self._cache = content
+        if registry.enabled:
+            content = registry.timed(
+                "{}.render".format(self.__class__.__name__), self.render,
+                captured
+            )
+        else:
+            content = self.render(captured)
+        content += b"\n"
+        self._versions = versions
         # if stopped, do not init lemonbar
         if not self._stop.is_set():
             try:
@@ -39,6 +102,8 @@ class _BarSpawner():
                     self.stop_bar(kill=True)
                 self.init_bar()
                 self._write_in_bar(content)
+            self._first_frame_drawn()
+            self.save_snapshot_later()
         else:
             logger.debug("Screen is stopped, will not draw anything")
 
@@ -46,6 +111,33 @@ class _BarSpawner():
         """
         Gather all widgets content
         """
+        return self.render().decode()
+
+    def capture(self):
+        """
+        Capture a consistent view of the widgets content, without locking
+
+        Widgets publish immutable content records, so reading them is enough.
+        """
+        raise NotImplementedError()
+
+    def content_versions(self, captured=None):
+        """
+        Return the versions of the gathered content
+
+        Compared to the versions of the last frame to know if anything changed
+        without gathering and comparing the whole content.
+
+        :param captured: content returned by capture(). Capture it if None.
+        """
+        raise NotImplementedError()
+
+    def render(self, captured=None):
+        """
+        Render the content to draw, encoded
+
+        :param captured: content returned by capture(). Capture it if None.
+        """
         raise NotImplementedError()
 
     def update(self, no_wait=False):
@@ -75,7 +167,9 @@ class _BarSpawner():
 
     def init_bar(self):
         """
-        Spawn lemonbar and store the pipe in self._bar
+        Open a bar in the output of the panel, and store it in self._bar
+
+        The default output spawns lemonbar, see barython.output.
 
         Before starting, tries to terminate self._bar in case of refresh
         """
@@ -92,10 +186,28 @@ class _BarSpawner():
         else:
             geometry = (None, self.height)
         bar_cmd = getattr(self, "bar_cmd", None) or self.panel.bar_cmd
-        self._bar = tools.lemonbar(
-            bar_cmd=bar_cmd, geometry=geometry, fonts=self.fonts,
-            fg=self.fg, bg=self.bg, clickable=self.clickable
+        owner = getattr(self, "panel", None) or self
+        actions = owner.actions
+        self._bar = owner.output.open(
+            self, bar_cmd=bar_cmd, geometry=geometry, fonts=self.fonts,
+            fg=self.fg, bg=self.bg, clickable=self.clickable,
+            shell_actions=not actions
         )
+        if actions and self._bar.stdout is not None:
+            actions.listen(self._bar, owner=self)
+
+    def save_snapshot(self, force=False):
+        """
+        Persist the widgets content, if a snapshot is configured
+        """
+        pass
+
+    def save_snapshot_later(self):
+        """
+        Persist the widgets content out of the draw path, if a snapshot is
+        configured
+        """
+        pass
 
     def propage_hooks_changes(self):
         """
@@ -103,8 +215,33 @@ class _BarSpawner():
         """
         pass
 
+    def _start_with_placeholder(self, static, others, draw=True):
+        """
+        Start widgets and draw a placeholder frame as soon as possible
+
+        Static widgets are updated synchronously and the others are started in
+        their own threads before spawning the bar, so lemonbar is launched in
+        parallel with the widgets warm-up. The update lock is held until the
+        placeholder frame is drawn: updates triggered meanwhile by the widgets
+        will then fill the bar as they resolve.
+
+        :param static: widgets to start synchronously, before the first frame
+        :param others: widgets or screens to start in their own threads
+        :param draw: draw the placeholder frame. Set to False if the frame is
+                     drawn by someone else (the panel, for example).
+        """
+        with self._update_lock:
+            for widget in static:
+                widget.start()
+            for obj in others:
+                threading.Thread(target=obj.start).start()
+            if draw:
+                self.draw()
+
     def start(self):
-        self._cache = None
+        self._versions = None
+        self._start_time = time.monotonic()
+        self.time_to_first_frame = None
         self._stop.clear()
         self.hooks.start()
 
@@ -118,7 +255,11 @@ class _BarSpawner():
             else:
                 self._bar.terminate()
                 self._bar.wait()
+            shell = getattr(self._bar, "actions_shell", None)
             self._bar = None
+            if shell:
+                # exits with the bar output, reap it
+                shell.wait(timeout=1)
         except:
             pass
 
@@ -142,6 +283,8 @@ class _BarSpawner():
         #: event to stop the screen
         self._stop = threading.Event()
         self._stop.set()
+        #: set while the screens are off, to drop the redraws
+        self._suspended = threading.Event()
 
         self.height = height
         self.offset = offset if offset is not None else (0, 0, 0)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import threading
+import time
+
+from barython.hooks.reader import reader as default_reader
+from barython.log import lazy
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+#: characters needing a shell to run an action
+SHELL_CHARS = frozenset(";&|<>$`\n")
+
+
+def bspwm_socket_path():
+    """
+    Return the path of the bspwm socket, like bspc does
+    """
+    if os.environ.get("BSPWM_SOCKET"):
+        return os.environ["BSPWM_SOCKET"]
+    host, _, display = os.environ.get("DISPLAY", ":0").rpartition(":")
+    display_number, _, screen_number = display.partition(".")
+    return "/tmp/bspwm{}_{}_{}-socket".format(
+        host, display_number or 0, screen_number or 0
+    )
+
+
+class BspwmActions():
+    """
+    Send bspc commands through the bspwm socket, without spawning bspc
+    """
+    #: first byte of a bspwm reply when the command failed
+    FAILURE = b"\x07"
+
+    def __call__(self, argv):
+        path = self.path or bspwm_socket_path()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(path)
+                sock.sendall(
+                    b"".join(arg.encode() + b"\0" for arg in argv[1:])
+                )
+                sock.shutdown(socket.SHUT_WR)
+                reply = sock.recv(4096)
+        except OSError as e:
+            logger.debug("Cannot join bspwm on {}: {}".format(path, e))
+            return False
+        if reply.startswith(self.FAILURE):
+            logger.error("bspc {} failed: {}".format(
+                " ".join(argv[1:]), reply[1:].decode(errors="replace")
+            ))
+        return True
+
+    def __init__(self, path=None, timeout=1):
+        #: path of the bspwm socket. Default to the one used by bspc
+        self.path = path
+        self.timeout = timeout
+
+
+class MPDActions():
+    """
+    Run the playback commands of mpc with one MPD connection
+    """
+    #: mpc commands handled, with the MPDClient method to call
+    COMMANDS = {
+        "play": "play", "stop": "stop", "next": "next", "prev": "previous",
+        "previous": "previous",
+    }
+    _client = None
+
+    def _connect(self):
+        if self._client is None:
+            import mpd
+            self._client = mpd.MPDClient()
+            self._client.timeout = self.timeout
+            self._client.connect(self.host, self.port)
+        return self._client
+
+    def _disconnect(self):
+        try:
+            self._client.disconnect()
+        except Exception:
+            pass
+        self._client = None
+
+    def _run(self, command):
+        client = self._connect()
+        if command == "toggle":
+            if client.status()["state"] == "play":
+                client.pause(1)
+            else:
+                client.play()
+        elif command == "pause":
+            client.pause(1)
+        else:
+            getattr(client, self.COMMANDS[command])()
+
+    def __call__(self, argv):
+        if len(argv) != 2 or argv[1] not in (
+                "toggle", "pause", *self.COMMANDS.keys()):
+            return False
+        with self._lock:
+            # the connection may have been closed by MPD: retry once
+            for attempt in range(2):
+                try:
+                    self._run(argv[1])
+                    return True
+                except Exception as e:
+                    logger.debug("MPD command {} failed: {}".format(
+                        argv[1], e
+                    ))
+                    self._disconnect()
+        return False
+
+    def __init__(self, host=None, port=None, timeout=1):
+        self.host = host or os.environ.get("MPD_HOST", "localhost")
+        self.port = port or int(os.environ.get("MPD_PORT", 6600))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+
+class ActionDispatcher():
+    """
+    Read the clicked actions on the bars output and run them in process
+
+    Actions are dispatched on their command name (the first word) to the
+    registered handlers, called with the splitted action. An action without
+    handler, whose handler returns False, or using shell features (pipes,
+    variables, etc.) falls back on a shell.
+    """
+    #: reader of the bars output. Default to the one of the hooks
+    reader = None
+
+    def register(self, name, handler):
+        """
+        Handle the actions starting with name
+
+        :param name: command name, like "bspc"
+        :param handler: called with the action splitted as argv. Return
+                        False to fall back on the shell.
+        """
+        self.handlers[name] = handler
+
+    def run_in_shell(self, action):
+        # reap the previous actions, to not keep zombies
+        self._children = [c for c in self._children if c.poll() is None]
+        logger.debug(lazy("Running {action} in a shell", action=action))
+        self._children.append(subprocess.Popen(
+            action, shell=True, stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, start_new_session=True
+        ))
+
+    def predict(self, action, owner):
+        """
+        Let the widgets of the bar draw the expected result of action
+
+        :param owner: screen or panel of the bar
+        """
+        for w in owner.widgets:
+            w.optimistic_update(action)
+
+    def dispatch(self, action, owner=None):
+        """
+        Run an action
+
+        :param owner: screen or panel of the bar the action comes from. Its
+                      widgets can draw an optimistic update before the action
+                      is run.
+        """
+        start = time.monotonic()
+        if owner is not None:
+            self.predict(action, owner)
+        try:
+            argv = shlex.split(action)
+        except ValueError:
+            argv = []
+        needs_shell = not argv or SHELL_CHARS.intersection(action)
+        handler = self.handlers.get(argv[0]) if not needs_shell else None
+        handled = False
+        if handler is not None:
+            try:
+                handled = handler(argv) is not False
+            except Exception as e:
+                logger.error("Error when running {}: {}".format(action, e))
+        if not handled:
+            self.run_in_shell(action)
+        if registry.enabled:
+            registry.histogram("action.dispatch").observe(
+                time.monotonic() - start
+            )
+
+    def _dispatch_in_worker(self, action, owner=None):
+        try:
+            self.dispatch(action, owner)
+        except Exception as e:
+            logger.error("Error when dispatching {}: {}".format(action, e))
+
+    def _on_lines(self, lines, owner=None):
+        """
+        Hand the actions read to the worker
+
+        Dispatching can block (predictions, sockets, connections), and the
+        reader is shared with all the hooks.
+        """
+        for line in lines:
+            action = line.decode(errors="replace").strip()
+            if action:
+                self.worker.submit(self._dispatch_in_worker, action, owner)
+
+    def listen(self, bar, owner=None):
+        """
+        Dispatch the actions written by a bar
+
+        :param owner: screen or panel of the bar
+        """
+        reader = self.reader if self.reader is not None else default_reader
+        reader.register(
+            bar.stdout, functools.partial(self._on_lines, owner=owner)
+        )
+
+    def __init__(self, handlers=None):
+        #: handlers by command name
+        self.handlers = (
+            handlers if handlers is not None
+            else {"bspc": BspwmActions(), "mpc": MPDActions()}
+        )
+
+        #: runs the actions one after the other, out of the reader thread
+        self.worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="barython-actions"
+        )
+
+        self._children = []
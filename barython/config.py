@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+import importlib
+import json
+import logging
+import threading
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+from barython.panel import Panel
+from barython.screen import Screen
+from barython.source import freeze
+import barython.widgets
+import barython.widgets.base
+
+
+logger = logging.getLogger("barython")
+
+ALIGNMENTS = ("l", "c", "r")
+
+#: frozen layout tree, compiled from a config
+PanelSpec = namedtuple("PanelSpec", ("options", "screens"))
+ScreenSpec = namedtuple("ScreenSpec", ("key", "options", "widgets"))
+WidgetSpec = namedtuple("WidgetSpec", ("type", "options"))
+
+
+def thaw(value):
+    """
+    Convert back a frozen value to dicts and lists
+    """
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+def get_widget_class(name):
+    """
+    Return a widget class from its name
+
+    :param name: name of a widget exported by barython.widgets or
+                 barython.widgets.base, or a dotted path to the class
+    """
+    for module in (barython.widgets, barython.widgets.base):
+        if hasattr(module, name):
+            return getattr(module, name)
+    module_name, _, class_name = name.rpartition(".")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError):
+        raise ValueError("Unknown widget type {}".format(name))
+
+
+def load_config(path):
+    """
+    Read a config file, in JSON or in TOML if its extension is .toml
+    """
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML configs need Python 3.11 or later")
+        with open(path, "rb") as f:
+            try:
+                return tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError("Invalid config {}: {}".format(path, e))
+    with open(path) as f:
+        return json.load(f)
+
+
+def _compile_widget(widget):
+    widget = dict(widget)
+    try:
+        type_name = widget.pop("type")
+    except KeyError:
+        raise ValueError("Widget without a type: {}".format(widget))
+    get_widget_class(type_name)
+    return WidgetSpec(type_name, freeze(widget, sort_keys=True))
+
+
+def compile_config(config):
+    """
+    Compile a config into a frozen layout tree
+
+    The config is a dict with the panel options in "panel", and a list of
+    screens in "screens". Each screen has its options and its widgets by
+    alignment in "widgets". A widget is a dict with its class in "type", the
+    other items being its parameters.
+
+    :return: PanelSpec
+    """
+    screens = []
+    for i, screen in enumerate(config.get("screens", [])):
+        screen = dict(screen)
+        widgets = screen.pop("widgets", {})
+        if set(widgets.keys()) - set(ALIGNMENTS):
+            raise ValueError("'alignement' might be either 'l', 'c' or 'r'")
+        key = screen.get("name") or "#{}".format(i)
+        if key in (s.key for s in screens):
+            raise ValueError("Screen {} defined twice".format(key))
+        screens.append(ScreenSpec(key, freeze(screen, sort_keys=True), tuple(
+            (alignment, tuple(
+                _compile_widget(w) for w in widgets.get(alignment, ())
+            )) for alignment in ALIGNMENTS
+        )))
+    return PanelSpec(
+        freeze(config.get("panel", {}), sort_keys=True), tuple(screens)
+    )
+
+
+def build_widget(spec):
+    return get_widget_class(spec.type)(**thaw(spec.options))
+
+
+class ConfigLoader():
+    """
+    Build a panel from a config file, and reload it in place
+
+    On reload, the new layout tree is compared with the running one: only
+    the screens and widgets which changed are restarted, the others keep
+    running with their hooks and subprocesses.
+    """
+    #: panel built from the config
+    panel = None
+    #: layout tree of the running panel
+    spec = None
+
+    def compile(self):
+        return compile_config(load_config(self.path))
+
+    def _build_screen(self, spec):
+        screen = Screen(**thaw(spec.options))
+        for alignment, widgets in spec.widgets:
+            if widgets:
+                screen.add_widget(
+                    alignment, *(build_widget(w) for w in widgets)
+                )
+        return screen
+
+    def build(self):
+        """
+        Build the panel described by the config
+        """
+        self.spec = self.compile()
+        self.panel = Panel(**thaw(self.spec.options))
+        self.panel.config_loader = self
+        for screen_spec in self.spec.screens:
+            screen = self._build_screen(screen_spec)
+            self._screens[screen_spec.key] = screen
+            self.panel.add_screen(screen)
+        return self.panel
+
+    def _is_running(self):
+        return not self.panel._stop.is_set()
+
+    def _start(self, obj):
+        if self._is_running():
+            threading.Thread(target=obj.start).start()
+
+    def _replace_screen(self, key, new_screen):
+        old_screen = self._screens.pop(key, None)
+        if old_screen is not None:
+            self.panel.remove_screen(old_screen)
+            old_screen.stop()
+        if new_screen is not None:
+            self._screens[key] = new_screen
+            self.panel.add_screen(new_screen)
+            self._start(new_screen)
+
+    def _reload_widgets(self, screen, old_spec, new_spec):
+        """
+        Update the widgets of a screen, keeping the unchanged ones running
+        """
+        available = dict()
+        for (alignment, specs), widgets in zip(
+                old_spec.widgets, screen._widgets.values()):
+            for spec, w in zip(specs, widgets):
+                available.setdefault((alignment, spec), []).append(w)
+
+        layout, started = [], []
+        for alignment, specs in new_spec.widgets:
+            widgets = []
+            for spec in specs:
+                reusable = available.get((alignment, spec))
+                if reusable:
+                    widgets.append(reusable.pop(0))
+                else:
+                    widgets.append(build_widget(spec))
+                    started.append(widgets[-1])
+            layout.append((alignment, widgets))
+
+        removed = [w for ws in available.values() for w in ws]
+        screen.remove_widget(*removed)
+        for w in removed:
+            w.stop()
+        for alignment, widgets in layout:
+            screen._widgets[alignment] = []
+            if widgets:
+                screen.add_widget(alignment, *widgets)
+        for w in started:
+            self._start(w)
+        logger.debug("Screen reloaded: {} widgets started, {} stopped".format(
+            len(started), len(removed)
+        ))
+
+    def reload(self):
+        """
+        Reload the config and apply the differences on the running panel
+
+        :return: False if the config is invalid, True otherwise
+        """
+        with self._lock:
+            try:
+                spec = self.compile()
+            except (OSError, ValueError) as e:
+                logger.error("Cannot reload the config: {}".format(e))
+                return False
+            if spec == self.spec:
+                return True
+            if spec.options != self.spec.options:
+                logger.warning(
+                    "Panel options changed, they will be applied at restart"
+                )
+            old_screens = {s.key: s for s in self.spec.screens}
+            new_keys = {s.key for s in spec.screens}
+            for key in old_screens.keys() - new_keys:
+                self._replace_screen(key, None)
+            for screen_spec in spec.screens:
+                old_spec = old_screens.get(screen_spec.key)
+                if old_spec == screen_spec:
+                    continue
+                elif (old_spec is None or
+                      old_spec.options != screen_spec.options):
+                    self._replace_screen(
+                        screen_spec.key, self._build_screen(screen_spec)
+                    )
+                else:
+                    screen = self._screens[screen_spec.key]
+                    self._reload_widgets(screen, old_spec, screen_spec)
+                    if self._is_running():
+                        threading.Thread(
+                            target=screen.update, kwargs={"no_wait": True}
+                        ).start()
+            self.panel._screens = [
+                self._screens[s.key] for s in spec.screens
+            ]
+            self.panel.refresh_screens()
+            self.spec = spec._replace(options=self.spec.options)
+            if self._is_running():
+                # start the hooks needed by the new widgets
+                self.panel.hooks.start()
+                if not self.panel.instance_per_screen:
+                    self.panel.update(no_wait=True)
+            return True
+
+    def __init__(self, path):
+        #: path of the config file
+        self.path = path
+
+        #: running screens, by key
+        self._screens = dict()
+        self._lock = threading.Lock()
+
+
+def load_panel(path):
+    """
+    Build a panel from a config file, reloaded on SIGHUP
+    """
+    return ConfigLoader(path).build()
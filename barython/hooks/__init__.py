@@ -7,7 +7,14 @@ import os
 import shlex
 import subprocess
 import threading
-
+import time
+
+from barython.hooks.reader import reader as default_reader
+from barython.hooks.supervisor import Supervisor, UP
+from barython.log import lazy
+from barython.metrics import registry
+from barython.profiler import owns_thread, run_owned
+from barython.scheduler import scheduler
 from barython.tools import splitted_sleep
 
 
@@ -16,6 +23,10 @@ logger = logging.getLogger("barython")
 
 class _Hook():
     _running_thread = None
+    #: last state sent by notify_state
+    _signaled_state = None
+    #: EventRecorder recording the events, see barython.hooks.replay
+    recorder = None
 
     def parse_event(self, event):
         """
@@ -23,26 +34,78 @@ class _Hook():
         """
         return {"event": event, }
 
+    def _parse_event(self, *args, **kwargs):
+        """
+        Record the event if a recorder is set, then parse it
+        """
+        if self.recorder is not None:
+            self.recorder.record(self, args, kwargs)
+        return self.parse_event(*args, **kwargs)
+
     def notify(self, *args, **kwargs):
+        self._timed_dispatch(*args, **kwargs)
+        if self.refresh:
+            splitted_sleep(self.refresh, stop=self._stop_event.is_set)
+
+    def _timed_dispatch(self, *args, **kwargs):
+        if registry.enabled:
+            registry.timed(
+                "{}.notify".format(self.__class__.__name__),
+                self._dispatch, *args, **kwargs
+            )
+        else:
+            self._dispatch(*args, **kwargs)
+
+    def _dispatch(self, *args, **kwargs):
+        """
+        Call each callback in its own thread
+        """
         for c in self.callbacks:
             try:
-                threading.Thread(target=c, args=args, kwargs=kwargs).start()
+                threading.Thread(
+                    target=run_owned,
+                    args=(getattr(c, "__self__", self), c) + args,
+                    kwargs=kwargs
+                ).start()
             except Exception as e:
-                logger.debug("Error in hook: {}".format(e))
+                logger.debug(lazy("Error in hook: {}", e))
                 continue
-        if self.refresh:
-            splitted_sleep(self.refresh, stop=self._stop_event.is_set)
+
+    def notify_state(self, state):
+        """
+        Signal the health of the source to the owners of the callbacks
+
+        Owners (the widgets, for bound handlers) defining on_source_state are
+        called with the hook and its new state, see barython.hooks.supervisor.
+        """
+        if state == self._signaled_state:
+            return
+        self._signaled_state = state
+        for c in tuple(self.callbacks):
+            on_source_state = getattr(
+                getattr(c, "__self__", None), "on_source_state", None
+            )
+            if on_source_state is None:
+                continue
+            try:
+                on_source_state(self, state)
+            except Exception as e:
+                logger.debug("Error when signaling state: {}".format(e))
 
     def run(self, *args, **kwargs):
         raise NotImplementedError()
 
+    @owns_thread
+    def _run(self, *args, **kwargs):
+        return self.run(*args, **kwargs)
+
     def start(self, *args, **kwargs):
         if self._running_thread and self._running_thread.is_alive():
             raise threading.ThreadError("Thread already running")
 
         self._stop_event.clear()
         self._running_thread = threading.Thread(
-            target=self.run, args=args, kwargs=kwargs, daemon=self.daemon
+            target=self._run, args=args, kwargs=kwargs, daemon=self.daemon
         )
         self._running_thread.start()
 
@@ -57,6 +120,13 @@ class _Hook():
     def is_compatible(self, hook):
         return True
 
+    def key(self):
+        """
+        Return what identifies this hook among the hooks of its class, used
+        to replay its events. Has to be serializable in JSON.
+        """
+        return None
+
     def copy(self):
         new_h = copy_module.copy(self)
         new_h.callbacks = self.callbacks.copy()
@@ -85,7 +155,21 @@ class _Hook():
 
 
 class SubprocessHook(_Hook):
+    """
+    Notify for each line written by a subprocess
+
+    The output is read by a SubprocessReader, which serves all subprocess
+    hooks in one thread. Every line is notified, spaced by the refresh without
+    blocking the reader: coalescing is left to latest_only and to the
+    widgets policies.
+    When the subprocess exits, it is restarted according to its supervisor,
+    and the callbacks owners are signaled about the source state.
+    """
     _subproc = None
+    #: time before which the next line is not notified, with a refresh
+    _next_dispatch = 0
+    #: reader of the subprocess output. Default to the shared one
+    reader = None
 
     def _init_subproc(self):
         """
@@ -98,7 +182,9 @@ class SubprocessHook(_Hook):
             self._subproc.poll() is not None
         )
         if process_dead:
-            logger.debug("Launching {}".format(" ".join(self.cmd)))
+            logger.debug(lazy("Launching {cmd}", cmd=self.cmd))
+            if registry.enabled:
+                registry.counter("subprocess_spawns").inc()
             return subprocess.Popen(
                 self.cmd, stdout=subprocess.PIPE, shell=self.shell,
                 env=self.env
@@ -106,37 +192,107 @@ class SubprocessHook(_Hook):
         else:
             return self._subproc
 
-    def run(self):
-        while not self._stop_event.is_set():
-            try:
-                self._subproc = self._init_subproc()
-                if self._subproc is None:
-                    continue
+    def _get_reader(self):
+        return self.reader if self.reader is not None else default_reader
 
-                line = self._subproc.stdout.readline()
-                notify_kwargs = self.parse_event(
-                    line.decode().replace('\n', '').replace('\r', '')
-                )
-                self.notify(**notify_kwargs)
-                subproc_poll = self._subproc.poll()
-                if subproc_poll is not None and subproc_poll != 0:
-                    splitted_sleep(self.failure_refresh,
-                                   stop=self._stop_event.is_set)
+    def _on_lines(self, lines):
+        """
+        Called by the reader with the lines read at once
+        """
+        if self.supervisor.running():
+            self.notify_state(UP)
+        for line in lines:
+            if registry.enabled:
+                registry.mark_event()
+            try:
+                notify_kwargs = self._parse_event(line.decode())
             except Exception as e:
-                logger.error("Error when reading line: {}".format(e))
-                try:
-                    self._subproc.kill()
-                except:
-                    pass
+                logger.error("Error when parsing line: {}".format(e))
+                continue
+            if self.refresh:
+                self._dispatch_spaced(notify_kwargs)
+            else:
+                self._timed_dispatch(**notify_kwargs)
+
+    def _dispatch_spaced(self, notify_kwargs):
+        """
+        Dispatch now or schedule the dispatch, refresh after the previous one
+        """
+        now = time.monotonic()
+        delay = max(0, self._next_dispatch - now)
+        self._next_dispatch = now + delay + self.refresh
+        if delay:
+            scheduler.call_later(delay, self._dispatch_if_started,
+                                 notify_kwargs)
+        else:
+            self._timed_dispatch(**notify_kwargs)
+
+    def _dispatch_if_started(self, notify_kwargs):
+        if not self._stop_event.is_set():
+            self._timed_dispatch(**notify_kwargs)
+
+    def _on_eof(self):
+        """
+        Called by the reader when the subprocess closes its output
+        """
+        if not self._stop_event.is_set():
+            threading.Thread(target=self._restart, daemon=True).start()
+
+    def _restart(self):
+        """
+        Reap the subprocess, then schedule its restart with the supervisor
+        """
+        subproc, returncode = self._subproc, None
+        if subproc is not None:
+            self._get_reader().unregister(subproc.stdout)
+            try:
+                returncode = subproc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                # output closed but the process is still alive: useless
+                subproc.kill()
+                returncode = subproc.wait()
+        if self._stop_event.is_set():
+            return
+        delay = self.supervisor.exited(returncode)
+        self.notify_state(self.supervisor.state)
+        scheduler.call_later(delay, self._spawn)
+
+    def _spawn(self):
+        """
+        Spawn the subprocess and register its output in the reader
+        """
+        if self._stop_event.is_set():
+            return
         try:
-            self._subproc.kill()
-        except:
-            pass
+            self._subproc = self._init_subproc()
+        except Exception as e:
+            logger.error("Error when launching {}: {}".format(self.cmd, e))
+            self._subproc = None
+            self._restart()
+            return
+        if self._subproc is not None:
+            self.supervisor.started()
+            self._get_reader().register(
+                self._subproc.stdout, self._on_lines, on_eof=self._on_eof,
+                latest_only=self.latest_only
+            )
+
+    def run(self):
+        self._spawn()
+
+    def start(self, *args, **kwargs):
+        if self.is_started():
+            raise threading.ThreadError("Hook already running")
+        self._stop_event.clear()
+        self._next_dispatch = 0
+        self.run()
 
     def stop(self):
         self._stop_event.set()
+        self.supervisor.stopped()
         try:
             if self._subproc:
+                self._get_reader().unregister(self._subproc.stdout)
                 self._subproc.terminate()
                 self._subproc.wait()
         except Exception as e:
@@ -145,7 +301,11 @@ class SubprocessHook(_Hook):
             ))
         super().stop()
 
-    def __init__(self, cmd, *args, **kwargs):
+    def key(self):
+        return " ".join(self.cmd)
+
+    def __init__(self, cmd, latest_only=False, supervisor=None,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         if isinstance(cmd, str):
             cmd = shlex.split(cmd)
@@ -156,6 +316,21 @@ class SubprocessHook(_Hook):
         self.cmd = cmd
         self.shell = False
 
+        #: only notify the latest line when several are read at once, for
+        #  subprocesses writing their whole state on each line
+        self.latest_only = latest_only
+
+        #: decide when to restart the subprocess. Default to a backoff
+        #  starting at failure_refresh.
+        self.supervisor = supervisor if supervisor is not None else Supervisor(
+            name=" ".join(self.cmd), base_delay=self.failure_refresh or 0.5
+        )
+
+    def copy(self):
+        new_h = super().copy()
+        new_h.supervisor = self.supervisor.copy()
+        return new_h
+
 
 class HooksPool():
     def propage_changes(self):
@@ -193,6 +368,36 @@ class HooksPool():
                     self.merge_hook(h, hook_class)
         self.propage_changes()
 
+    def remove_callbacks(self, *callbacks):
+        """
+        Remove callbacks from all hooks of the pool
+
+        Hooks left without any callback are dropped, and stopped if the pool
+        is listening.
+        """
+        for hook_class, hooks in tuple(self.hooks.items()):
+            for h in tuple(hooks):
+                h.callbacks.difference_update(callbacks)
+                if h.callbacks:
+                    continue
+                hooks.remove(h)
+                if self.listen and h.is_started():
+                    try:
+                        h.stop()
+                    except Exception as e:
+                        logger.error("Error when stopping hook {}: {}".format(
+                            h.__class__, e
+                        ))
+            if not hooks:
+                del self.hooks[hook_class]
+
+    def callbacks(self):
+        """
+        Return the callbacks of all hooks of the pool
+        """
+        return {c for hooks in self.hooks.values() for h in hooks
+                for c in h.callbacks}
+
     def subscribe(self, callback, event, *args, **kwargs):
         """
         Subscribe to event, listened on by the panel
@@ -38,7 +38,7 @@ class BspwmHook(SubprocessHook):
         return {"monitors": monitors}
 
     def __init__(self, bspwm_version="0.9", cmd=None, failure_refresh=1,
-                 *args, **kwargs):
+                 latest_only=True, *args, **kwargs):
         if cmd is None:
             if bspwm_version == "0.9":
                 cmd = ["bspc", "control", "--subscribe"]
@@ -46,4 +46,5 @@ class BspwmHook(SubprocessHook):
                 cmd = ["bspc", "subscribe", "report"]
         self.bspwm_version = bspwm_version
         super().__init__(*args, **kwargs, cmd=cmd,
-                         failure_refresh=failure_refresh)
+                         failure_refresh=failure_refresh,
+                         latest_only=latest_only)
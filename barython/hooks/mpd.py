@@ -5,6 +5,7 @@ import mpd
 import select
 
 from . import _Hook
+from barython.metrics import registry
 from barython.tools import splitted_sleep
 
 logger = logging.getLogger("barython")
@@ -32,7 +33,7 @@ class MPDHook(_Hook):
                     self._mpdclient.ping()
                     self._mpdclient.send_idle()
                     try:
-                        self.notify(**self.parse_event(run=True))
+                        self.notify(**self._parse_event(run=True))
                     except Exception as e:
                         logger.error(e)
                     killed = False
@@ -43,7 +44,9 @@ class MPDHook(_Hook):
                     )
                     if not changes[0]:
                         continue
-                    notify_kwargs = self.parse_event(
+                    if registry.enabled:
+                        registry.mark_event()
+                    notify_kwargs = self._parse_event(
                         self._mpdclient.fetch_idle()
                     )
                     try:
@@ -60,7 +63,7 @@ class MPDHook(_Hook):
                         "MPD is maybe not running or host/port are not correct"
                     )
                     try:
-                        notify_kwargs = self.parse_event(run=False)
+                        notify_kwargs = self._parse_event(run=False)
                         try:
                             self.notify(**notify_kwargs)
                         except Exception as e:
@@ -76,6 +79,9 @@ class MPDHook(_Hook):
             hook.password == self.password
         )
 
+    def key(self):
+        return "{}:{}".format(self.host, self.port)
+
     def stop(self):
         super().stop()
         try:
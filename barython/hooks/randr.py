@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import select
+import xcffib
+import xcffib.randr
+
+from . import _Hook
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+
+class RandrHook(_Hook):
+    """
+    Notify when screens are plugged, unplugged or reconfigured, on the RandR
+    ScreenChangeNotify events
+
+    The hook uses its own X connection, so the events are not read off the
+    socket by the requests of other threads.
+    """
+    _conn = None
+
+    def parse_event(self):
+        return {}
+
+    def _connect(self):
+        conn = xcffib.connect()
+        conn.randr = conn(xcffib.randr.key)
+        root = conn.get_setup().roots[0].root
+        conn.randr.SelectInput(root, xcffib.randr.NotifyMask.ScreenChange)
+        conn.flush()
+        return conn
+
+    def _screens_changed(self):
+        """
+        Read the pending events, and return True if screens changed
+        """
+        changed = False
+        event = self._conn.poll_for_event()
+        while event is not None:
+            if isinstance(event, xcffib.randr.ScreenChangeNotifyEvent):
+                changed = True
+            event = self._conn.poll_for_event()
+        return changed
+
+    def run(self):
+        try:
+            self._conn = self._connect()
+        except Exception as e:
+            logger.debug("Cannot listen on RandR events: {}".format(e))
+            return
+        fd = self._conn.get_file_descriptor()
+        try:
+            while not self._stop_event.is_set():
+                select.select([fd, self._wakeup_r], [], [])
+                if self._stop_event.is_set():
+                    break
+                if self._screens_changed():
+                    logger.debug("RandR screen change received")
+                    if registry.enabled:
+                        registry.mark_event()
+                    self.notify(**self._parse_event())
+        except Exception as e:
+            logger.error("Error when reading RandR events: {}".format(e))
+        finally:
+            self._conn.disconnect()
+            self._conn = None
+
+    def start(self, *args, **kwargs):
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        super().start(*args, **kwargs)
+
+    def stop(self, *args, **kwargs):
+        self._stop_event.set()
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except (AttributeError, OSError):
+            pass
+        super().stop(*args, **kwargs)
+        for fd in (self._wakeup_r, self._wakeup_w):
+            try:
+                os.close(fd)
+            except (TypeError, OSError):
+                pass
+        self._wakeup_r = self._wakeup_w = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: pipe waking up the hook thread when stopped
+        self._wakeup_r = self._wakeup_w = None
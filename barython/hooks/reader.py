@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import selectors
+import threading
+
+
+logger = logging.getLogger("barython")
+
+
+class LineBuffer():
+    """
+    Split a stream of chunks in lines
+
+    The buffer is reused between chunks, and a partial line is kept until its
+    end is received.
+    """
+    def feed(self, data):
+        """
+        Add a chunk to the buffer
+
+        :return: list of complete lines, without the line endings
+        """
+        self._buffer += data
+        end = self._buffer.rfind(b"\n")
+        if end == -1:
+            if len(self._buffer) > self.max_size:
+                logger.debug("Line too long, dropping it")
+                del self._buffer[:]
+            return []
+        lines = [
+            line.rstrip(b"\r")
+            for line in bytes(self._buffer[:end]).split(b"\n")
+        ]
+        del self._buffer[:end + 1]
+        return lines
+
+    def __init__(self, max_size=65536):
+        #: maximum size of a partial line
+        self.max_size = max_size
+
+        self._buffer = bytearray()
+
+
+class _Stream():
+    def __init__(self, callback, on_eof, latest_only):
+        self.callback = callback
+        self.on_eof = on_eof
+        self.latest_only = latest_only
+        self.buffer = LineBuffer()
+
+
+class SubprocessReader():
+    """
+    Read the output of many subprocesses in one thread
+
+    Streams are registered with a callback, called with the list of lines
+    read at once. If latest_only, only the latest of them is kept: a producer
+    faster than its consumer is drained without queuing outdated lines.
+    """
+    _running_thread = None
+
+    #: size of each read
+    chunk_size = 65536
+
+    def register(self, fileobj, callback, on_eof=None, latest_only=False):
+        """
+        Read fileobj and call callback(lines) for each batch of lines
+
+        :param fileobj: file object or file descriptor to read
+        :param callback: called in the reader thread with the list of lines
+        :param on_eof: called in the reader thread when fileobj is closed
+        :param latest_only: only keep the latest line of a batch
+        """
+        with self._lock:
+            self._selector.register(
+                fileobj, selectors.EVENT_READ,
+                _Stream(callback, on_eof, latest_only)
+            )
+            if not (self._running_thread and self._running_thread.is_alive()):
+                self._running_thread = threading.Thread(
+                    target=self.run, daemon=True
+                )
+                self._running_thread.start()
+        self._wakeup()
+
+    def unregister(self, fileobj):
+        with self._lock:
+            try:
+                self._selector.unregister(fileobj)
+            except (KeyError, ValueError):
+                return
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except BlockingIOError:
+            # a wake up is already pending
+            pass
+
+    def _read(self, key):
+        stream = key.data
+        try:
+            data = os.read(key.fd, self.chunk_size)
+        except OSError:
+            data = b""
+        if not data:
+            self.unregister(key.fileobj)
+            if stream.on_eof:
+                stream.on_eof()
+            return
+        lines = stream.buffer.feed(data)
+        if not lines:
+            return
+        if stream.latest_only:
+            lines = lines[-1:]
+        stream.callback(lines)
+
+    def run(self):
+        while True:
+            events = self._selector.select()
+            for key, _ in events:
+                if key.fd == self._wakeup_r:
+                    try:
+                        os.read(self._wakeup_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                with self._lock:
+                    # unregistered by a previous callback
+                    if self._selector.get_map().get(key.fileobj) is not key:
+                        continue
+                try:
+                    self._read(key)
+                except Exception as e:
+                    logger.error("Error when reading a stream: {}".format(e))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+
+#: default reader, shared by all subprocess hooks
+reader = SubprocessReader()
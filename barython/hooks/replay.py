@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+import time
+
+from . import _Hook
+from barython.log import lazy
+
+
+logger = logging.getLogger("barython")
+
+
+def hook_name(hook_class):
+    return "{}.{}".format(hook_class.__module__, hook_class.__qualname__)
+
+
+class EventRecorder():
+    """
+    Record the events of hooks in a JSON lines file
+
+    Each line holds the time since the recording started, the hook class and
+    key, and the arguments given to its parse_event, so the events can be
+    replayed by a ReplayHook. Events which cannot be serialized (Xorg ones)
+    are skipped.
+    """
+    _file = None
+    _start = None
+
+    def attach(self, *pools):
+        """
+        Record the events of the hooks of pools
+
+        Hooks are copied by the pools merges: attach to the pool listening on
+        the events, like the one of the panel.
+        """
+        for pool in pools:
+            for hooks in pool.hooks.values():
+                for h in hooks:
+                    h.recorder = self
+        if self._file is None:
+            self.start()
+
+    def record(self, hook, args, kwargs):
+        if self._file is None:
+            return
+        try:
+            line = json.dumps({
+                "t": time.monotonic() - self._start,
+                "hook": hook_name(type(hook)), "key": hook.key(),
+                "args": args, "kwargs": kwargs,
+            })
+        except (TypeError, ValueError):
+            self.skipped += 1
+            return
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self.recorded += 1
+
+    def start(self):
+        with self._lock:
+            self._file = open(self.path, "w")
+            self._start = time.monotonic()
+
+    def stop(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.info(lazy(
+            "{recorded} events recorded in {path}, {skipped} skipped",
+            recorded=self.recorded, path=self.path, skipped=self.skipped
+        ))
+
+    def __init__(self, path):
+        #: JSON lines file to record in
+        self.path = path
+
+        self.recorded = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+
+def read_events(path, hook_class=None, key=None):
+    """
+    Read the events recorded in path
+
+    :param hook_class: only yield the events of this hook class
+    :param key: only yield the events of the hook with this key, see
+                _Hook.key()
+    :return: yield (time, args, kwargs)
+    """
+    name = hook_name(hook_class) if hook_class is not None else None
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if name is not None and event["hook"] != name:
+                continue
+            if key is not None and event.get("key") != key:
+                continue
+            yield event["t"], event["args"], event["kwargs"]
+
+
+class ReplayHook(_Hook):
+    """
+    Replay the recorded events of a hook class
+
+    Events are parsed with the parse_event of hook_class, then notified like
+    the real hook would. The parse_event of hook_class is called on the
+    replay hook, it should not depend on the hook attributes.
+
+    :param path: file recorded by an EventRecorder
+    :param hook_class: class of the hook replayed
+    :param speed: pace of the replay, relative to the recording. 0 to replay
+                  as fast as possible.
+    :param loop: replay again from the start once finished
+    :param key: key of the hook replayed, to replay only its events when
+                several hooks of hook_class were recorded
+    """
+    def parse_event(self, *args, **kwargs):
+        return self.hook_class.parse_event(self, *args, **kwargs)
+
+    def run(self):
+        events = list(
+            read_events(self.path, self.hook_class, self.replayed_key)
+        )
+        while not self._stop_event.is_set():
+            start = time.monotonic()
+            for t, args, kwargs in events:
+                if self.speed:
+                    delay = start + t / self.speed - time.monotonic()
+                    if delay > 0 and self._stop_event.wait(delay):
+                        return
+                elif self._stop_event.is_set():
+                    return
+                try:
+                    self.notify(**self.parse_event(*args, **kwargs))
+                except Exception as e:
+                    logger.error("Error when replaying event: {}".format(e))
+                self.replayed += 1
+            if not self.loop:
+                break
+        self.finished.set()
+
+    def start(self, *args, **kwargs):
+        self.finished.clear()
+        super().start(*args, **kwargs)
+
+    def is_compatible(self, hook):
+        return (
+            isinstance(hook, ReplayHook) and hook.path == self.path and
+            hook.hook_class == self.hook_class and
+            hook.replayed_key == self.replayed_key
+        )
+
+    def __init__(self, path, hook_class, speed=1, loop=False, key=None,
+                 *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self.hook_class = hook_class
+        self.replayed_key = key
+        self.speed = speed
+        self.loop = loop
+
+        #: number of events notified
+        self.replayed = 0
+        #: set once all events have been replayed
+        self.finished = threading.Event()
+
+
+def replace_hooks(pool, hook_class, path, speed=1, loop=False):
+    """
+    Replace the hooks of hook_class in a pool by replays of their events
+
+    The callbacks subscribed to the replaced hooks are kept, and each replay
+    only notifies the events of the hook it replaces.
+
+    :return: the replay hooks
+    """
+    replays = [
+        ReplayHook(path, hook_class, speed=speed, loop=loop, key=h.key(),
+                   callbacks=h.callbacks, refresh=h.refresh)
+        for h in pool.hooks.get(hook_class, [])
+    ]
+    if replays:
+        pool.hooks[hook_class] = replays
+    return replays
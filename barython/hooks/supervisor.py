@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import logging
+import random
+import time
+
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+#: health states of a supervised source
+STOPPED = "stopped"
+STARTING = "starting"
+UP = "up"
+BACKOFF = "backoff"
+DOWN = "down"
+
+
+class Supervisor():
+    """
+    Decide when to restart a subprocess, and keep track of its health
+
+    Each exit is followed by a jittered exponential backoff, reset once the
+    subprocess has run for min_uptime. If it exits more than budget times in
+    budget_window seconds, the source is considered down and only retried
+    every max_delay.
+    """
+    state = STOPPED
+    _started_at = None
+
+    #: number of exits
+    crashes = 0
+
+    def _set_state(self, state):
+        changed = state != self.state
+        self.state = state
+        return changed
+
+    def started(self):
+        """
+        The subprocess has been spawned
+        """
+        self._started_at = time.monotonic()
+        return self._set_state(STARTING)
+
+    def running(self):
+        """
+        The subprocess produced an output
+
+        :return: True if the state changed
+        """
+        return self._set_state(UP)
+
+    def exited(self, returncode=None):
+        """
+        The subprocess exited or could not be spawned
+
+        :param returncode: exit code, None if it could not be spawned
+        :return: delay to wait before restarting it, in seconds
+        """
+        now = time.monotonic()
+        self.crashes += 1
+        if (self._started_at is not None and
+                now - self._started_at >= self.min_uptime):
+            self._attempts = 0
+        self._exits.append(now)
+        while self._exits and now - self._exits[0] > self.budget_window:
+            self._exits.popleft()
+
+        if len(self._exits) > self.budget:
+            if self.state != DOWN:
+                logger.warning(
+                    "{} exited {} times in {}s, retry every {}s".format(
+                        self.name, len(self._exits), self.budget_window,
+                        self.max_delay
+                    )
+                )
+                if registry.enabled:
+                    registry.counter("supervisor.budget_exhausted").inc()
+            self._set_state(DOWN)
+            delay = self.max_delay
+        else:
+            self._set_state(BACKOFF)
+            delay = min(self.max_delay, self.base_delay * 2 ** self._attempts)
+            self._attempts += 1
+        delay *= random.uniform(1 - self.jitter, 1)
+
+        logger.debug("{} exited with {}, restart in {:.2f}s".format(
+            self.name, returncode, delay
+        ))
+        if registry.enabled:
+            registry.counter("supervisor.restarts").inc()
+        return delay
+
+    def stopped(self):
+        return self._set_state(STOPPED)
+
+    def copy(self):
+        """
+        Return a new supervisor with the same settings
+        """
+        return Supervisor(
+            name=self.name, base_delay=self.base_delay,
+            max_delay=self.max_delay, jitter=self.jitter, budget=self.budget,
+            budget_window=self.budget_window, min_uptime=self.min_uptime
+        )
+
+    def __init__(self, name=None, base_delay=0.5, max_delay=60, jitter=0.5,
+                 budget=5, budget_window=60, min_uptime=10):
+        #: name of the source, for logging
+        self.name = name
+
+        #: delay before the first restart, doubled after each exit
+        self.base_delay = base_delay
+
+        #: maximum delay between 2 restarts
+        self.max_delay = max_delay
+
+        #: delays are randomly reduced by up to this ratio, so sources
+        #  failing together do not restart together
+        self.jitter = jitter
+
+        #: maximum number of exits in budget_window before the source is down
+        self.budget = budget
+        self.budget_window = budget_window
+
+        #: uptime after which the backoff is reset
+        self.min_uptime = min_uptime
+
+        self._attempts = 0
+        self._exits = deque()
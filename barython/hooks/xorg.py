@@ -4,6 +4,7 @@ import logging
 import xpybutil
 
 from . import _Hook
+from barython.metrics import registry
 from barython.tools import splitted_sleep
 
 logger = logging.getLogger("xorg_hook")
@@ -36,8 +37,10 @@ class _XorgHook(_Hook):
                 xpybutil.event.read()
                 if len(xpybutil.event.peek()):
                     logger.debug("Xorg events received")
+                    if registry.enabled:
+                        registry.mark_event()
                     self.notify(
-                        **self.parse_event(events=xpybutil.event.queue())
+                        **self._parse_event(events=xpybutil.event.queue())
                     )
             except Exception as e:
                 logger.error(e)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import json
+import logging
+import os
+import threading
+import time
+
+from barython.tools import runtime_dir
+
+
+logger = logging.getLogger("barython")
+
+
+def default_log_path():
+    return os.path.join(runtime_dir(), "barython-{}.log".format(os.getpid()))
+
+
+class LazyMessage():
+    """
+    Log message formatted with str.format only when a handler emits it
+
+    Its arguments are kept as structured fields.
+    """
+    __slots__ = ("fmt", "args", "fields")
+
+    def __str__(self):
+        return self.fmt.format(*self.args, **self.fields)
+
+    def __init__(self, fmt, *args, **fields):
+        self.fmt = fmt
+        self.args = args
+        self.fields = fields
+
+
+#: shorter name, used in the logging calls
+lazy = LazyMessage
+
+
+class Sampler():
+    """
+    Let one message per interval through, by key
+
+    For messages logged on each frame or event.
+    """
+    def allow(self, key):
+        """
+        :return: (allowed, number of messages skipped since the last one)
+        """
+        now = time.monotonic()
+        with self._lock:
+            last, skipped = self._keys.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._keys[key] = (last, skipped + 1)
+                return False, skipped + 1
+            self._keys[key] = (now, 0)
+            return True, skipped
+
+    def __init__(self, interval=1):
+        #: minimum time between 2 messages with the same key, in seconds
+        self.interval = interval
+        self._keys = dict()
+        self._lock = threading.Lock()
+
+
+sampler = Sampler()
+
+
+def log_sampled(level, key, fmt, *args, **fields):
+    """
+    Log a lazy message, sampled by key
+
+    Costs a level check when the level is disabled.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    allowed, skipped = sampler.allow(key)
+    if not allowed:
+        return
+    if skipped:
+        fmt += " ({skipped} similar messages skipped)"
+        fields["skipped"] = skipped
+    logger.log(level, LazyMessage(fmt, *args, **fields))
+
+
+class _ForwardHandler(logging.Handler):
+    """
+    Forward the records to the parent logger, above a level
+    """
+    def emit(self, record):
+        self.parent.handle(record)
+
+    def __init__(self, parent, level):
+        super().__init__(level)
+        self.parent = parent
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keep the last records in memory, to dump them on demand
+
+    Records are formatted at dump time only. Attached to a logger, records
+    down to the handler level are captured, without changing what the other
+    handlers receive.
+
+    :param capacity: number of records kept
+    :param level: lowest level captured
+    :param path: file to dump in
+    """
+    _forward = None
+    _attached = None
+
+    def emit(self, record):
+        self.buffer.append(record)
+
+    def records(self):
+        return tuple(self.buffer)
+
+    def _to_dict(self, record):
+        msg = record.msg
+        fields = dict(msg.fields) if isinstance(msg, LazyMessage) else {}
+        if isinstance(msg, LazyMessage) and msg.args:
+            fields["args"] = msg.args
+        return {
+            "time": record.created, "level": record.levelname,
+            "thread": record.threadName, "message": record.getMessage(),
+            "fields": fields,
+        }
+
+    def dump(self, path=None):
+        """
+        Write the records in a file, one JSON object per line
+
+        :param path: file to write in. Default to self.path
+        """
+        path = path or self.path
+        with open(path, "w") as f:
+            for record in self.records():
+                try:
+                    line = json.dumps(self._to_dict(record), default=str)
+                except Exception as e:
+                    line = json.dumps({"error": str(e)})
+                f.write(line + "\n")
+        logger.info("Logs dumped in {}".format(path))
+        return path
+
+    def attach(self, target=logger):
+        """
+        Capture the records of a logger
+
+        If the logger level is above the handler one, it is lowered. The
+        records are then forwarded to the parent handlers only above the
+        previous level, so they do not get more verbose.
+        """
+        self._attached = (target, target.level, target.propagate)
+        effective_level = target.getEffectiveLevel()
+        target.addHandler(self)
+        if self.level < effective_level:
+            target.setLevel(self.level)
+            if target.propagate and target.parent is not None:
+                self._forward = _ForwardHandler(target.parent, effective_level)
+                target.addHandler(self._forward)
+                target.propagate = False
+
+    def detach(self):
+        if self._attached is None:
+            return
+        target, level, propagate = self._attached
+        target.removeHandler(self)
+        if self._forward is not None:
+            target.removeHandler(self._forward)
+            self._forward = None
+        target.setLevel(level)
+        target.propagate = propagate
+        self._attached = None
+
+    def __init__(self, capacity=1000, level=logging.DEBUG, path=None):
+        super().__init__(level)
+        #: last records
+        self.buffer = deque(maxlen=capacity)
+        #: file to dump in
+        self.path = path if path is not None else default_log_path()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+from functools import lru_cache
+import re
+
+
+#: tokens of lemonbar markup: escaped percent, tag or text
+_TOKENS = re.compile(r"%%|%\{[^}]*\}|[^%]+|%")
+#: styles tracked by the builder: background, foreground and font
+_STYLES = "BFT"
+#: order of the tags written on a style change
+_RESET_ORDER = (2, 1, 0)
+_SET_ORDER = (0, 1, 2)
+#: state of a style changed by a tag the builder cannot follow
+_UNKNOWN = object()
+#: style not changed by style(), kept by restore()
+_KEEP = object()
+#: first letter of the commands known by lemonbar
+_COMMANDS = "lcrRBFUTSOA+-!"
+
+
+@lru_cache(maxsize=1024)
+def escape(text):
+    """
+    Escape a text to show it as is in lemonbar
+
+    Cached, as the same titles and names are shown frame after frame.
+    """
+    return "{}".format(text).replace("%", "%%")
+
+
+@lru_cache(maxsize=256)
+def escape_command(cmd):
+    """
+    Escape the colons of an action command, if not already escaped
+    """
+    return re.sub(r"(?<!\\):", r"\:", "{}".format(cmd))
+
+
+@lru_cache(maxsize=1024)
+def _tokenize(markup):
+    return tuple(_TOKENS.findall(markup))
+
+
+class Markup():
+    """
+    Build lemonbar markup, escaping the texts and merging the redundant tags
+
+    Background, foreground and font tags are only written before some text or
+    offset, if they change what is drawn: adjacent tags overriding each other
+    are merged, and the ones setting the current style dropped. The other
+    tags are written as is.
+    """
+    def style(self, fg=None, bg=None, font=None):
+        """
+        Change the style of the next texts
+
+        :param fg: foreground, unchanged if None. "-" for the default one.
+        :param bg: background, unchanged if None. "-" for the default one.
+        :param font: index of font, unchanged if None. "-" for the default
+                     one.
+        :return: previous style, to give to restore()
+        """
+        previous = [_KEEP] * len(_STYLES)
+        for i, value in enumerate((bg, fg, font)):
+            if value is not None:
+                previous[i] = self._style[i]
+                self._style[i] = None if value == "-" else "{}".format(value)
+        return previous
+
+    def restore(self, previous):
+        """
+        Restore the styles changed by style()
+        """
+        for i, value in enumerate(previous):
+            if value is not _KEEP:
+                self._style[i] = value
+
+    def text(self, text):
+        """
+        Add a text, escaped
+        """
+        if text:
+            self._flush()
+            self._parts.append(escape(text))
+
+    def raw(self, markup):
+        """
+        Add some markup, already escaped
+
+        Its tags are merged with the ones around.
+        """
+        if not markup:
+            return
+        for token in _tokenize(markup):
+            if token.startswith("%{"):
+                self.tag(token[2:-1])
+            else:
+                self._flush()
+                self._parts.append(token)
+
+    def tag(self, command):
+        """
+        Add a tag
+
+        :param command: content of the tag, without %{ and }
+        """
+        if command.startswith("A"):
+            self._parts.append("%{{{}}}".format(command))
+        elif len(command) > 1 and command[0] in _STYLES and (
+                " " not in command):
+            value = command[1:]
+            self._style[_STYLES.index(command[0])] = (
+                None if value == "-" else value
+            )
+        elif command.startswith("R") or " " in command:
+            # swapping colors or several commands: written in place, the
+            # styles changed cannot be followed anymore
+            self._flush()
+            self._parts.append("%{{{}}}".format(command))
+            lost = (0, 1) if command == "R" else range(len(_STYLES))
+            for i in lost:
+                self._emitted[i] = self._style[i] = _UNKNOWN
+        else:
+            if command.startswith("O"):
+                # offsets are drawn with the current background
+                self._flush()
+            self._parts.append("%{{{}}}".format(command))
+
+    def open_actions(self, actions):
+        """
+        Open the actions, dict of commands by button
+
+        :return: number of actions opened, to give to close_actions()
+        """
+        try:
+            items = actions.items()
+        except AttributeError:
+            return 0
+        for button, cmd in items:
+            self.tag("A{}:{}:".format(button, escape_command(cmd)))
+        return len(items)
+
+    def close_actions(self, count):
+        for _ in range(count):
+            self.tag("A")
+
+    def _flush(self):
+        """
+        Write the tags to draw with the current style
+        """
+        emitted, style = self._emitted, self._style
+        if emitted == style:
+            return
+        for i in _RESET_ORDER:
+            if style[i] is None and emitted[i] is not None:
+                self._parts.append("%{{{}-}}".format(_STYLES[i]))
+        for i in _SET_ORDER:
+            if style[i] is not None and style[i] is not _UNKNOWN and (
+                    style[i] != emitted[i]):
+                self._parts.append("%{{{}{}}}".format(_STYLES[i], style[i]))
+        self._emitted = list(style)
+
+    def __str__(self):
+        self._flush()
+        return "".join(self._parts)
+
+    def encode(self):
+        return str(self).encode()
+
+    def __init__(self):
+        self._parts = []
+        #: (background, foreground, font) of the next texts, None for the
+        #  default ones
+        self._style = [None] * len(_STYLES)
+        #: (background, foreground, font) written in the tags
+        self._emitted = [None] * len(_STYLES)
+
+
+def merge(markup):
+    """
+    Merge the redundant tags of some markup
+    """
+    builder = Markup()
+    builder.raw(markup)
+    return str(builder)
+
+
+def validate(markup):
+    """
+    Check that some markup is understood by lemonbar
+
+    :raise ValueError: with the position of the first error
+    """
+    actions = 0
+    i = 0
+    while i < len(markup):
+        if markup.startswith("%%", i):
+            i += 2
+            continue
+        if not markup.startswith("%{", i):
+            i += 1
+            continue
+        start, i = i, i + 2
+        while True:
+            if i >= len(markup):
+                raise ValueError("Unclosed tag at {}".format(start))
+            c = markup[i]
+            if c == "}":
+                i += 1
+                break
+            elif c == " ":
+                i += 1
+            elif c not in _COMMANDS:
+                raise ValueError(
+                    "Unknown command '{}' at {}".format(c, i)
+                )
+            elif c == "A":
+                i += 1
+                while i < len(markup) and markup[i].isdigit():
+                    i += 1
+                if i < len(markup) and markup[i] == ":":
+                    end = i + 1
+                    while True:
+                        end = markup.find(":", end)
+                        if end == -1:
+                            raise ValueError(
+                                "Unclosed action command at {}".format(i)
+                            )
+                        if markup[end - 1] != "\\":
+                            break
+                        end += 1
+                    i = end + 1
+                    actions += 1
+                else:
+                    actions -= 1
+                    if actions < 0:
+                        raise ValueError(
+                            "Action closed without being opened at {}".format(
+                                i - 1
+                            )
+                        )
+            else:
+                # the command argument lasts until the next space or }
+                while i < len(markup) and markup[i] not in " }":
+                    i += 1
+    if actions:
+        raise ValueError("{} actions not closed".format(actions))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+
+logger = logging.getLogger("barython")
+
+#: upper bounds of the histograms buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, float("inf")
+)
+#: buckets of the sizes in bytes
+BYTES_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, float("inf"))
+
+
+class Counter():
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def export(self):
+        return self.value
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+
+class Gauge():
+    def set(self, value):
+        self.value = value
+
+    def export(self):
+        return self.value
+
+    def __init__(self):
+        self.value = None
+
+
+class Histogram():
+    """
+    Count samples in buckets and keep the most recent ones for percentiles
+    """
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+            self.samples.append(value)
+
+    def percentile(self, q):
+        """
+        Return the q-th percentile of the recent samples
+
+        :param q: percentile, between 0 and 100
+        """
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        index = int(round(q / 100 * (len(samples) - 1)))
+        return samples[min(len(samples) - 1, index)]
+
+    def export(self):
+        return {
+            "count": self.count, "sum": self.sum,
+            "min": self.min, "max": self.max,
+            "p50": self.percentile(50), "p99": self.percentile(99),
+            "buckets": [
+                (str(bound), count)
+                for bound, count in zip(self.buckets, self.bucket_counts)
+            ],
+        }
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, samples=1024):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+        #: recent samples, used to compute percentiles
+        self.samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+
+class Rate():
+    """
+    Compute a rate of events per second on a sliding window
+    """
+    def mark(self):
+        self._events.append(time.monotonic())
+
+    def export(self):
+        now = time.monotonic()
+        recent = [t for t in tuple(self._events) if now - t <= self.window]
+        return len(recent) / self.window
+
+    def __init__(self, window=10, maxlen=4096):
+        #: duration of the window, in seconds
+        self.window = window
+        self._events = deque(maxlen=maxlen)
+
+
+class Registry():
+    """
+    Store all metrics, by name
+
+    Metrics are disabled by default. Instrumented code checks
+    registry.enabled before recording anything, so the overhead when disabled
+    is a single attribute lookup.
+    """
+    #: if False, instrumented code does not record anything
+    enabled = False
+
+    def _get(self, name, metric_class, *args, **kwargs):
+        try:
+            return self._metrics[name]
+        except KeyError:
+            with self._lock:
+                return self._metrics.setdefault(
+                    name, metric_class(*args, **kwargs)
+                )
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def gauge(self, name):
+        return self._get(name, Gauge)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: upper bounds of the buckets, used if the histogram
+                        does not exist yet. Default to durations in seconds.
+        """
+        return self._get(name, Histogram, buckets=buckets)
+
+    def rate(self, name):
+        return self._get(name, Rate)
+
+    def timed(self, name, func, *args, **kwargs):
+        """
+        Call func and record its duration in the histogram name
+        """
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.histogram(name).observe(time.monotonic() - start)
+
+    def mark_event(self):
+        """
+        Mark the reception of an event, to measure the event-to-pixel latency
+
+        Only the oldest event not drawn yet is kept.
+        """
+        if self._pending_event is None:
+            self._pending_event = time.monotonic()
+
+    def frame_written(self, nbytes=None):
+        """
+        Record a frame written in a bar
+        """
+        self.rate("frames").mark()
+        self.counter("frames_total").inc()
+        if nbytes is not None:
+            self.histogram("frame_bytes", buckets=BYTES_BUCKETS).observe(
+                nbytes
+            )
+        pending_event, self._pending_event = self._pending_event, None
+        if pending_event is not None:
+            self.histogram("event_to_pixel").observe(
+                time.monotonic() - pending_event
+            )
+
+    def snapshot(self):
+        """
+        Return all metrics in a dict, ready to be serialized
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        r = {name: m.export() for name, m in sorted(metrics.items())}
+        r["threads"] = threading.active_count()
+        return r
+
+    def reset(self):
+        with self._lock:
+            self._metrics = dict()
+            self._pending_event = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def __init__(self):
+        self._metrics = dict()
+        self._lock = threading.Lock()
+        self._pending_event = None
+
+
+#: default registry, used by all barython components
+registry = Registry()
+
+
+class _Exporter():
+    _running_thread = None
+
+    def run(self):
+        raise NotImplementedError()
+
+    def start(self):
+        self._stop_event.clear()
+        self._running_thread = threading.Thread(target=self.run, daemon=True)
+        self._running_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._running_thread:
+            self._running_thread.join()
+
+    def __init__(self, registry=registry):
+        self.registry = registry
+        self._stop_event = threading.Event()
+        self._stop_event.set()
+
+
+class LogExporter(_Exporter):
+    """
+    Periodically log all metrics in one line
+    """
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            logger.info("Metrics: {}".format(
+                json.dumps(self.registry.snapshot())
+            ))
+
+    def __init__(self, interval=60, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: interval between 2 log lines, in seconds
+        self.interval = interval
+
+
+class SocketExporter(_Exporter):
+    """
+    Send all metrics in JSON to each client connecting to a UNIX socket
+    """
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                with conn:
+                    conn.sendall(
+                        json.dumps(self.registry.snapshot()).encode() + b"\n"
+                    )
+            except OSError as e:
+                logger.debug("Error when exporting metrics: {}".format(e))
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(0.5)
+        self._sock.bind(self.path)
+        self._sock.listen()
+        super().start()
+
+    def stop(self):
+        super().stop()
+        try:
+            self._sock.close()
+            os.unlink(self.path)
+        except (AttributeError, OSError):
+            pass
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: path of the UNIX socket
+        self.path = path
+        self._sock = None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+from collections import deque, namedtuple
+import logging
+import threading
+import time
+
+from barython import tools
+
+
+logger = logging.getLogger("barython")
+
+#: frame written by a screen or a panel, with its monotonic time
+Frame = namedtuple("Frame", ("time", "target", "data"))
+
+
+class LemonbarOutput():
+    """
+    Draw in a lemonbar subprocess
+    """
+    def open(self, target, **options):
+        """
+        Open a bar for target, a screen or a panel
+
+        The bar behaves like a lemonbar subprocess: frames are written on its
+        stdin, and the clicked actions can be read on its stdout if not None.
+
+        :param options: parameters of tools.lemonbar
+        """
+        return tools.lemonbar(**options)
+
+    def close(self):
+        pass
+
+
+class _SinkBar():
+    """
+    Bar of the sinks outputs, behaving like a lemonbar subprocess without
+    actions
+    """
+    stdout = None
+    actions_shell = None
+
+    @property
+    def stdin(self):
+        return self
+
+    def write(self, data):
+        if self.returncode is not None:
+            raise BrokenPipeError()
+        self.output._write(self.target, data)
+
+    def flush(self):
+        pass
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = 0
+
+    kill = terminate
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def __init__(self, output, target, options):
+        self.output = output
+        self.target = target
+        #: options given to open the bar, as for lemonbar
+        self.options = options
+        self.returncode = None
+
+
+class MemoryOutput():
+    """
+    Keep the frames drawn in memory, with the time they were written
+
+    Runs the whole pipeline without X or lemonbar, for the tests and the
+    benchmarks.
+
+    :param maxlen: number of frames kept, None to keep all of them
+    """
+    def open(self, target, **options):
+        return _SinkBar(self, target, options)
+
+    def _write(self, target, data):
+        with self._written:
+            self.frames.append(Frame(time.monotonic(), target, data))
+            self.count += 1
+            self._written.notify_all()
+
+    def frames_of(self, target):
+        return [f for f in tuple(self.frames) if f.target is target]
+
+    def wait_frames(self, count, timeout=None):
+        """
+        Wait until count frames have been written since the creation
+
+        :return: False if the timeout expired
+        """
+        with self._written:
+            return self._written.wait_for(
+                lambda: self.count >= count, timeout
+            )
+
+    def close(self):
+        pass
+
+    def __init__(self, maxlen=None):
+        #: last frames written
+        self.frames = deque(maxlen=maxlen)
+        #: number of frames written
+        self.count = 0
+        self._written = threading.Condition()
+
+
+class FileOutput():
+    """
+    Write the frames drawn in a file
+
+    Each line holds the monotonic time of the frame, the name of its screen
+    (or "panel"), and the frame.
+
+    :param path: file to write in. Frames are appended.
+    """
+    _file = None
+
+    def open(self, target, **options):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+        return _SinkBar(self, target, options)
+
+    def _write(self, target, data):
+        name = getattr(target, "name", None) or type(target).__name__.lower()
+        line = "{:.6f} {} ".format(time.monotonic(), name).encode() + data
+        with self._lock:
+            if self._file is None:
+                raise BrokenPipeError()
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
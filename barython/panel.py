@@ -1,27 +1,89 @@
 #!/usr/bin/env python3
 
 
+import hashlib
+import itertools
 import logging
 import os
 import signal
 import threading
 
 from barython import _BarSpawner
-from barython.screen import get_randr_screens
+from barython.actions import ActionDispatcher
+from barython.hooks.randr import RandrHook
+from barython.log import RingBufferHandler
+from barython.output import LemonbarOutput
+from barython.power import PowerMonitor
+from barython.profiler import owns_thread
+from barython.scheduler import scheduler
+from barython.screen import RandrGeometry
+from barython.snapshot import ContentSnapshot, default_snapshot_path
 
 
 SIG_TO_CATCH = (signal.SIGINT, signal.SIGTERM, signal.SIGQUIT)
+#: signals asking to dump the debugging informations (profile)
+SIG_TO_DUMP = (signal.SIGUSR2, )
+#: signals asking to reload the config
+SIG_TO_RELOAD = (signal.SIGHUP, )
 logger = logging.getLogger("barython")
 
+#: counts the panels created in the process, for their default uid
+_panels_count = itertools.count()
+
+
+def _screen_tag(index):
+    """
+    Return the tag drawing on the index-th screen
+
+    lemonbar only targets the first 10 screens by their index, so the next
+    ones are reached from the previous one.
+    """
+    return "%{{S{}}}".format(index if index < 10 else "+").encode()
+
 
 class Panel(_BarSpawner):
     #: command for lemonbar
     bar_cmd = "lemonbar"
+    #: ConfigLoader the panel has been built from, reloaded on SIG_TO_RELOAD
+    config_loader = None
+    #: Runtime listening on the hooks of this panel, if any
+    runtime = None
 
     @property
     def screens(self):
-        return (self.clean_screens() if not self.keep_unplugged_screens else
-                self._screens)
+        """
+        Plugged screens, detected once and cached until refresh_screens()
+        """
+        screens = self._plugged_screens
+        if screens is None:
+            screens = tuple(
+                self.clean_screens() if not self.keep_unplugged_screens
+                else self._screens
+            )
+            self._plugged_screens = screens
+        return screens
+
+    def refresh_screens(self):
+        """
+        Forget the plugged screens and their cached frames
+
+        Call it when screens are plugged or unplugged, the screens are
+        detected again on next access.
+        """
+        self._plugged_screens = None
+        self._frames = dict()
+
+    def screens_changed(self, *args, **kwargs):
+        """
+        Detect the screens again and redraw, when screens are plugged or
+        unplugged
+
+        Called on the RandR events and on SIG_TO_RELOAD.
+        """
+        logger.info("Screens changed, detect them again")
+        self.refresh_screens()
+        if not self.instance_per_screen and not self._stop.is_set():
+            self.update(no_wait=True)
 
     def add_screen(self, *screens, index=None):
         """
@@ -45,12 +107,67 @@ class Panel(_BarSpawner):
                 self._screens[:index] + list(screens) + self._screens[index:]
             )
             self._screens = new_screen_list
+        self.refresh_screens()
 
-    def gather(self):
+    def remove_screen(self, *screens):
         """
-        Gather all widgets content
+        Remove screens from the panel, and unsubscribe their widgets from the
+        hooks
+
+        Screens are not stopped.
+
+        :param *screens: screens to remove
         """
-        return "%{S+}".join(screen.gather() for screen in self.screens)
+        self._screens = [s for s in self._screens if s not in screens]
+        self.refresh_screens()
+        callbacks = set()
+        for s in screens:
+            for w in s.widgets:
+                callbacks.update(w.hooks.callbacks())
+        self.hooks.remove_callbacks(*callbacks)
+
+    @property
+    def widgets(self):
+        """
+        Iterate over the widgets of all screens, without duplicates
+        """
+        seen = set()
+        for s in self._screens:
+            for w in s.widgets:
+                if id(w) not in seen:
+                    seen.add(id(w))
+                    yield w
+
+    def capture(self):
+        return tuple((screen, screen.capture()) for screen in self.screens)
+
+    def content_versions(self, captured=None):
+        return tuple(
+            screen.content_versions(screen_captured)
+            for screen, screen_captured in captured or self.capture()
+        )
+
+    def render(self, captured=None):
+        """
+        Render the content of all screens, each one targeted with %{Sn}
+
+        The content of each screen is cached with its versions, so only the
+        screens which changed are rendered again.
+        """
+        captured = captured or self.capture()
+        frames = []
+        for screen, screen_captured in captured:
+            versions = screen.content_versions(screen_captured)
+            cached = self._frames.get(screen)
+            if cached is None or cached[0] != versions:
+                cached = (versions, screen.render(screen_captured))
+                self._frames[screen] = cached
+            frames.append(cached[1])
+        if len(frames) < 2:
+            return b"".join(frames)
+        return b"".join(
+            _screen_tag(i) + frame for i, frame in enumerate(frames)
+        )
 
     def clean_screens(self):
         """
@@ -64,34 +181,161 @@ class Panel(_BarSpawner):
                 if s.geometry:
                     yield s
         else:
-            nb_randr_screens = len(get_randr_screens())
+            nb_randr_screens = len(self.geometry_provider.screens())
             for screen, i in zip(self._screens, range(nb_randr_screens)):
                 yield screen
 
+    def check_uids(self):
+        """
+        Make the widgets uids unique in the panel, as they key its snapshot
+
+        Generated uids shared by several widgets (for screens with the same
+        name) are suffixed.
+
+        :raise ValueError: if a uid set by the user is shared
+        """
+        taken = set()
+        for w in self.widgets:
+            if w.uid in taken:
+                if not w.generated_uid:
+                    raise ValueError(
+                        "Several widgets have the uid {}".format(w.uid)
+                    )
+                uid, i = w.uid, 1
+                while w.uid in taken:
+                    w.uid = "{}~{}".format(uid, i)
+                    i += 1
+            taken.add(w.uid)
+
+    def default_uid(self):
+        """
+        Return a uid identifying this panel between restarts
+
+        Computed from its position in the process and its layout, so
+        different bars, in one process or not, get different uids.
+        """
+        layout = (
+            self._index, self.bar_cmd, self.geometry,
+            tuple(w.uid for w in self.widgets)
+        )
+        return hashlib.sha1(repr(layout).encode()).hexdigest()[:12]
+
+    def restore_snapshot(self):
+        """
+        Restore the widgets content from the snapshot, if configured
+        """
+        if self.snapshot and self.snapshot is not True:
+            restored = self.snapshot.restore(self.widgets)
+            logger.debug("{} widgets restored from snapshot".format(restored))
+
+    def save_snapshot(self, force=False):
+        # True until the snapshot of the panel is created at start
+        if self.snapshot and self.snapshot is not True:
+            self.snapshot.save(self.widgets, force=force)
+
+    def save_snapshot_later(self):
+        """
+        Save the snapshot in the scheduler thread, once the throttling of the
+        snapshot allows it
+
+        Frames drawn meanwhile are saved by the same call.
+        """
+        if not self.snapshot or self.snapshot is True:
+            return
+        if self._snapshot_call is None:
+            self._snapshot_call = scheduler.call_later(
+                self.snapshot.save_delay(), self._scheduled_save_snapshot
+            )
+
+    def _scheduled_save_snapshot(self):
+        self._snapshot_call = None
+        self.save_snapshot()
+
+    def suspend(self):
+        """
+        Pause the infinite widgets and drop the redraws
+        """
+        super().suspend()
+        for screen in self._screens:
+            screen.suspend()
+
+    def resume(self):
+        """
+        Resume the screens and draw one catch-up frame
+        """
+        super().resume()
+        for screen in self._screens:
+            screen.resume()
+        if not self.instance_per_screen and not self._stop.is_set():
+            threading.Thread(
+                target=self.update, kwargs={"no_wait": True}
+            ).start()
+
+    @owns_thread
     def start(self):
         logging.debug("Starts the panel")
         try:
             for s in SIG_TO_CATCH:
                 signal.signal(s, self._handler_signal)
+            if self.profiler or self.log_buffer:
+                for s in SIG_TO_DUMP:
+                    signal.signal(s, self._handler_signal)
+            for s in SIG_TO_RELOAD:
+                signal.signal(s, self._handler_signal)
         except ValueError:
             # Probably launched in a thread, so ignoring it
             pass
 
+        if self.profiler:
+            self.profiler.start()
+        if self.log_buffer:
+            self.log_buffer.attach()
+        if isinstance(self.geometry_provider, RandrGeometry):
+            # detect the screens plugged or unplugged while running
+            self.hooks.subscribe(self.screens_changed, RandrHook)
+
         super().start()
+        self.refresh_screens()
+        self.check_uids()
+        if self.uid is None:
+            self.uid = self.default_uid()
+        if self.snapshot is True:
+            self.snapshot = ContentSnapshot(
+                path=default_snapshot_path(self.uid)
+            )
+        self.restore_snapshot()
+        if self.power_monitor:
+            self.power_monitor.start(self)
 
-        # update to force drawing the bar
-        if not self.instance_per_screen:
-            self.update(no_wait=True)
+        if self.fast_startup and not self.instance_per_screen:
+            screens = tuple(self.screens)
+            self._start_with_placeholder(
+                [w for s in screens for w in s.widgets if w.static], screens
+            )
+        else:
+            # update to force drawing the bar
+            if not self.instance_per_screen:
+                self.update(no_wait=True)
 
-        for screen in self.screens:
-            threading.Thread(
-                target=screen.start
-            ).start()
+            for screen in self.screens:
+                threading.Thread(
+                    target=screen.start
+                ).start()
 
         self._stop.wait()
 
     def stop(self, *args, **kwargs):
         super().stop(*args, **kwargs)
+        if self._snapshot_call is not None:
+            self._snapshot_call.cancel()
+            self._snapshot_call = None
+        self.save_snapshot(force=True)
+        if self.profiler:
+            self.profiler.stop()
+        if self.log_buffer:
+            self.log_buffer.detach()
+        if self.power_monitor:
+            self.power_monitor.stop()
         if self.hooks.listen:
             try:
                 self.hooks.stop()
@@ -102,23 +346,67 @@ class Panel(_BarSpawner):
                 screen.stop()
             except:
                 continue
+        self.output.close()
+
+    def propage_hooks_changes(self):
+        """
+        Propage a change in the hooks pool to the runtime, if any
+        """
+        if self.runtime:
+            self.runtime.hooks.merge(self.hooks)
+
+    def reload(self):
+        """
+        Detect the screens again, and reload the config the panel has been
+        built from, if any
+        """
+        self.screens_changed()
+        if self.config_loader:
+            return self.config_loader.reload()
+
+    def dump(self):
+        """
+        Dump the debugging informations
+        """
+        if self.profiler:
+            self.profiler.dump()
+        if self.log_buffer:
+            self.log_buffer.dump()
 
-    def _handler_signal(self, *args, **kwargs):
+    def _handler_signal(self, signum=None, *args, **kwargs):
+        if signum in SIG_TO_DUMP:
+            try:
+                self.dump()
+            except Exception as e:
+                logger.error("Error when dumping: {}".format(e))
+            return
+        if signum in SIG_TO_RELOAD:
+            threading.Thread(target=self.reload).start()
+            return
         self.stop()
         os.sys.exit(0)
 
     def __init__(self, instance_per_screen=True, geometry=None, refresh=0.1,
-                 screens=None, keep_unplugged_screens=False, *args, **kwargs):
+                 screens=None, keep_unplugged_screens=False,
+                 fast_startup=False, snapshot=None, profiler=None,
+                 power_monitor=None, actions=True, log_buffer=None,
+                 output=None, geometry_provider=None, uid=None,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.hooks.listen = True
 
         #: screens attached to this panel
         self._screens = []
+        #: plugged screens, cached by the screens property
+        self._plugged_screens = None
+        #: versions and rendered content of each screen, for the single
+        #  instance mode
+        self._frames = dict()
         if screens:
             self.add_screen(*screens)
 
-        #: launch one bar per screen or use only one with %{S+}
+        #: launch one bar per screen or use only one with %{Sn}
         self.instance_per_screen = instance_per_screen
 
         #: doesn't start undetected/unplugged screens
@@ -129,3 +417,47 @@ class Panel(_BarSpawner):
 
         #: geometry
         self.geometry = geometry
+
+        #: where the bars draw, see barython.output. Default to lemonbar.
+        self.output = output if output is not None else LemonbarOutput()
+
+        #: fetch the screens geometry. Default to RandR.
+        self.geometry_provider = (
+            geometry_provider if geometry_provider is not None
+            else RandrGeometry()
+        )
+
+        #: draw a placeholder frame with static widgets and spawn lemonbar in
+        #  parallel with the widgets warm-up
+        self.fast_startup = fast_startup
+
+        #: ContentSnapshot used to persist widgets content between restarts.
+        #  True to use one in the default path of this panel, created at
+        #  start.
+        self.snapshot = snapshot
+
+        #: stable identifier of the panel, keying its default snapshot.
+        #  Default to default_uid(), computed at start.
+        self.uid = uid
+        self._index = next(_panels_count)
+        #: save of the snapshot scheduled after a frame, if any
+        self._snapshot_call = None
+
+        #: SamplingProfiler running with the panel, dumped on SIG_TO_DUMP
+        self.profiler = profiler
+
+        #: RingBufferHandler keeping the last log records while the panel
+        #  runs, dumped on SIG_TO_DUMP. True to use the default one.
+        self.log_buffer = (
+            RingBufferHandler() if log_buffer is True else log_buffer
+        )
+
+        #: ActionDispatcher running the clicked actions in process. True to
+        #  use the default one, False to pipe the actions in a shell.
+        self.actions = ActionDispatcher() if actions is True else actions
+
+        #: PowerMonitor suspending the panel while the screens are off. True
+        #  to use the default one.
+        self.power_monitor = (
+            PowerMonitor() if power_monitor is True else power_monitor
+        )
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger("barython")
+
+#: processes names of the common screen lockers
+SCREEN_LOCKERS = (
+    "i3lock", "light-locker", "physlock", "slock", "xsecurelock", "xtrlock",
+)
+
+
+class DPMSStateProvider():
+    """
+    Detect if the monitors are turned off, with the X DPMS extension
+
+    Requests go through the X connection used by RandR.
+    """
+    _conn = None
+
+    def _dpms(self):
+        from barython.screen import x_connection
+        conn = x_connection.get()
+        if conn is not self._conn:
+            import xcffib.dpms
+            self._conn = conn
+            self._dpms_ext = conn(xcffib.dpms.key)
+        return self._dpms_ext
+
+    def is_inactive(self):
+        import xcffib.dpms
+        try:
+            info = self._dpms().Info().reply()
+        except Exception as e:
+            logger.debug("Cannot get the DPMS state: {}".format(e))
+            self._conn = None
+            return False
+        return (
+            bool(info.state) and
+            info.power_level != xcffib.dpms.DPMSMode.On
+        )
+
+
+class ScreenLockerProvider():
+    """
+    Detect if a screen locker is running
+
+    Once found, only the process of the locker is checked, until it exits.
+    """
+    #: pid of the running screen locker, if any
+    _locker_pid = None
+
+    def _is_locker(self, pid):
+        try:
+            with open(os.path.join(self.proc_dir, pid, "comm")) as f:
+                return f.read().strip() in self.lockers
+        except OSError:
+            return False
+
+    def is_inactive(self):
+        if self._locker_pid is not None:
+            if self._is_locker(self._locker_pid):
+                return True
+            self._locker_pid = None
+        try:
+            pids = [pid for pid in os.listdir(self.proc_dir) if pid.isdigit()]
+        except OSError:
+            return False
+        for pid in pids:
+            if self._is_locker(pid):
+                self._locker_pid = pid
+                return True
+        return False
+
+    def __init__(self, lockers=SCREEN_LOCKERS, proc_dir="/proc"):
+        #: name of the screen lockers processes
+        self.lockers = set(lockers)
+        self.proc_dir = proc_dir
+
+
+class PowerMonitor():
+    """
+    Suspend the panel while the screens are off or the session is locked
+
+    Each provider has an is_inactive() method, returning True if rendering is
+    useless. The panel is suspended if any provider is inactive, and resumed
+    when all of them are active again.
+    """
+    _running_thread = None
+    panel = None
+
+    def check(self):
+        """
+        Check the providers and suspend or resume the panel
+        """
+        inactive = any(p.is_inactive() for p in self.providers)
+        if inactive and not self.panel.suspended:
+            logger.info("Screens are inactive, suspend the panel")
+            self.panel.suspend()
+        elif not inactive and self.panel.suspended:
+            logger.info("Screens are active again, resume the panel")
+            self.panel.resume()
+        return inactive
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Error when checking power state: {}".format(e))
+            self._stop_event.wait(self.interval)
+
+    def start(self, panel):
+        """
+        Start to monitor the power state for a panel
+        """
+        self.panel = panel
+        self._stop_event.clear()
+        self._running_thread = threading.Thread(target=self.run, daemon=True)
+        self._running_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._running_thread:
+            self._running_thread.join()
+
+    def __init__(self, providers=None, interval=2):
+        #: state providers. Default to DPMS and screen lockers detection
+        self.providers = (
+            providers if providers is not None
+            else (DPMSStateProvider(), ScreenLockerProvider())
+        )
+
+        #: interval between 2 checks, in seconds
+        self.interval = interval
+
+        self._stop_event = threading.Event()
+        self._stop_event.set()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+from concurrent.futures import Future
+import itertools
+import logging
+import os
+import pickle
+import select
+import shlex
+import signal
+import socket
+import struct
+import threading
+import time
+
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+#: result of a command run by the prefork server
+Result = namedtuple("Result", ("returncode", "stdout"))
+
+_HEADER = struct.Struct("!I")
+#: kinds of the messages sent by the server: a chunk of output, or the exit
+#  code ending a command
+_OUTPUT, _EXIT = range(2)
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError()
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock):
+    size, = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+class _Children():
+    """
+    Process groups of the commands run by the server, killed when it stops
+    """
+    closed = False
+
+    def add(self, pid):
+        with self._lock:
+            self._pids.add(pid)
+            if self.closed:
+                os.killpg(pid, signal.SIGKILL)
+
+    def discard(self, pid):
+        with self._lock:
+            self._pids.discard(pid)
+
+    def kill_all(self):
+        """
+        Kill the running commands, and the ones spawned after
+        """
+        with self._lock:
+            self.closed = True
+            for pid in self._pids:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def __init__(self):
+        self._pids = set()
+        self._lock = threading.Lock()
+
+
+def _wait_or_kill(pid, grace):
+    """
+    Wait for pid, and kill it if it is still running after grace seconds
+
+    :return: the exit code of pid
+    """
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        wpid, status = os.waitpid(pid, os.WNOHANG)
+        if wpid:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.01)
+    os.killpg(pid, signal.SIGKILL)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def _spawn_and_read(argv, env, timeout, on_output, children, kill_grace):
+    """
+    Run argv with posix_spawn and stream its stdout to on_output
+
+    Run in the server process. The command leads its own process group, so
+    its children are signaled with it. On timeout, the command is
+    terminated, then killed if it is still running after kill_grace seconds.
+
+    :param children: _Children of the server
+    :return: the exit code of the command
+    """
+    r, w = os.pipe()
+    try:
+        pid = os.posix_spawnp(
+            argv[0], argv, env if env is not None else os.environ,
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, w, 1), (os.POSIX_SPAWN_CLOSE, r),
+            ],
+            setpgroup=0
+        )
+    except OSError:
+        os.close(r)
+        os.close(w)
+        return 127
+    os.close(w)
+    children.add(pid)
+
+    timed_out = False
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    os.killpg(pid, signal.SIGTERM)
+                    timed_out = True
+                    break
+            readable, _, _ = select.select([r], [], [], remaining)
+            if readable:
+                chunk = os.read(r, 65536)
+                if not chunk:
+                    break
+                on_output(chunk)
+    finally:
+        os.close(r)
+        try:
+            if timed_out:
+                returncode = _wait_or_kill(pid, kill_grace)
+            else:
+                _, status = os.waitpid(pid, 0)
+                returncode = os.waitstatus_to_exitcode(status)
+        finally:
+            children.discard(pid)
+    return returncode
+
+
+def _serve(sock, max_workers, kill_grace):
+    """
+    Main loop of the server process: run the requested commands, at most
+    max_workers at once, and stream back their output and exit code
+
+    When the main process is gone, the running commands are killed and
+    reaped.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    slots = threading.BoundedSemaphore(max_workers)
+    send_lock = threading.Lock()
+    children = _Children()
+    workers = []
+
+    def send(message):
+        try:
+            with send_lock:
+                _send(sock, message)
+        except OSError:
+            # the main process is gone, the command is killed by _serve
+            pass
+
+    def run(request_id, argv, env, timeout):
+        try:
+            returncode = _spawn_and_read(
+                argv, env, timeout,
+                lambda chunk: send((request_id, _OUTPUT, chunk)),
+                children, kill_grace
+            )
+        except Exception:
+            returncode = -1
+        finally:
+            slots.release()
+        send((request_id, _EXIT, returncode))
+
+    while True:
+        try:
+            request = _recv(sock)
+        except (EOFError, OSError):
+            # the main process is gone
+            break
+        slots.acquire()
+        workers = [t for t in workers if t.is_alive()]
+        t = threading.Thread(target=run, args=request, daemon=True)
+        t.start()
+        workers.append(t)
+
+    children.kill_all()
+    # each worker reaps its command
+    for t in workers:
+        t.join()
+
+
+class PreforkServer():
+    """
+    Run commands from a small process forked early
+
+    Forking the main process for each command copies a growing Python
+    process. The server is forked once, before the bar allocates its widgets
+    and threads, and spawns the commands with posix_spawn on request. The
+    output is streamed back over a socketpair as it is read.
+
+    Commands are expected to exit: their whole output is returned in the
+    result.
+    """
+    _pid = None
+    _sock = None
+    _reader_thread = None
+
+    @property
+    def running(self):
+        return self._sock is not None
+
+    def run(self, cmd, shell=False, env=None, timeout=None, on_output=None):
+        """
+        Ask the server to run a command
+
+        :param cmd: command to run, as a list or a string
+        :param shell: run it with /bin/sh, like subprocess.Popen
+        :param env: environment of the command. Default to the server one
+        :param timeout: terminate the command after timeout seconds. Default
+                        to self.timeout
+        :param on_output: called with each chunk of output as it is received,
+                          in the reader thread
+        :return: a Future of the Result (returncode, stdout)
+        """
+        if not self.running:
+            raise RuntimeError("Prefork server is not started")
+        if isinstance(cmd, str):
+            cmd = shlex.split(cmd)
+        argv = ["/bin/sh", "-c"] + list(cmd) if shell else list(cmd)
+        future = Future()
+        with self._lock:
+            request_id = next(self._counter)
+            self._pending[request_id] = (future, on_output, bytearray())
+        try:
+            with self._send_lock:
+                _send(self._sock, (
+                    request_id, argv, env,
+                    self.timeout if timeout is None else timeout
+                ))
+        except OSError as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            future.set_exception(e)
+        if registry.enabled:
+            registry.counter("prefork_requests").inc()
+        return future
+
+    def _read_results(self, sock):
+        while True:
+            try:
+                request_id, kind, value = _recv(sock)
+            except (EOFError, OSError, pickle.UnpicklingError):
+                break
+            with self._lock:
+                if kind == _EXIT:
+                    pending = self._pending.pop(request_id, None)
+                else:
+                    pending = self._pending.get(request_id, None)
+            if pending is None:
+                continue
+            future, on_output, output = pending
+            if kind == _EXIT:
+                future.set_result(Result(value, bytes(output)))
+                continue
+            output += value
+            if on_output is not None:
+                try:
+                    on_output(value)
+                except Exception as e:
+                    logger.error("Error when reading output: {}".format(e))
+        with self._lock:
+            pending, self._pending = self._pending, dict()
+        for future, _, _ in pending.values():
+            future.set_exception(EOFError("Prefork server stopped"))
+
+    def start(self):
+        """
+        Fork the server. Call it as early as possible.
+        """
+        if self.running:
+            return
+        parent_sock, child_sock = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            parent_sock.close()
+            try:
+                _serve(child_sock, self.max_workers, self.kill_grace)
+            finally:
+                os._exit(0)
+        child_sock.close()
+        self._pid, self._sock = pid, parent_sock
+        self._reader_thread = threading.Thread(
+            target=self._read_results, args=(parent_sock, ), daemon=True
+        )
+        self._reader_thread.start()
+        logger.debug("Prefork server started with pid {}".format(pid))
+
+    def stop(self):
+        if not self.running:
+            return
+        sock, self._sock = self._sock, None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        self._reader_thread.join()
+        try:
+            os.waitpid(self._pid, 0)
+        except ChildProcessError:
+            pass
+        self._pid = None
+
+    def __init__(self, max_workers=4, timeout=10, kill_grace=1):
+        #: maximum number of commands running at once
+        self.max_workers = max_workers
+
+        #: default timeout of the commands, in seconds
+        self.timeout = timeout
+
+        #: time left to the commands to exit after a timeout, in seconds,
+        #  before being killed
+        self.kill_grace = kill_grace
+
+        self._counter = itertools.count()
+        self._pending = dict()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+from collections import Counter
+import functools
+import logging
+import os
+import sys
+import threading
+
+from barython.tools import runtime_dir
+
+
+logger = logging.getLogger("barython")
+
+#: owner (widget, hook, screen or panel) of the running threads, by ident
+_thread_owners = dict()
+
+
+def owns_thread(method):
+    """
+    Register the object as the owner of the thread while method runs
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return run_owned(self, method, self, *args, **kwargs)
+    return wrapper
+
+
+def run_owned(owner, func, *args, **kwargs):
+    """
+    Call func with owner registered as the owner of the current thread
+
+    The previous owner is restored after, for nested calls.
+    """
+    ident = threading.get_ident()
+    previous = _thread_owners.get(ident)
+    _thread_owners[ident] = owner
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if previous is None:
+            _thread_owners.pop(ident, None)
+        else:
+            _thread_owners[ident] = previous
+
+
+def default_profile_path():
+    return os.path.join(
+        runtime_dir(), "barython-{}.collapsed".format(os.getpid())
+    )
+
+
+def _owner_name(owner):
+    name = (getattr(owner, "uid", None) or getattr(owner, "name", None))
+    if name:
+        return "{}({})".format(owner.__class__.__name__, name)
+    return owner.__class__.__name__
+
+
+class SamplingProfiler():
+    """
+    Sample the stacks of all threads at a regular interval
+
+    Samples are aggregated by owner: the widget, hook, screen or panel
+    registered as running the thread (see owns_thread). They can be dumped in
+    the collapsed stack format, used to generate flamegraphs.
+
+    Only the code objects of the frames are read, not their locals, so
+    sampling does not touch the state of the running threads.
+    """
+    _running_thread = None
+
+    def _frame_name(self, code):
+        try:
+            return self._names[code]
+        except KeyError:
+            name = "{}:{}".format(
+                os.path.splitext(os.path.basename(code.co_filename))[0],
+                code.co_name
+            )
+            self._names[code] = name
+            return name
+
+    def _stack(self, frame):
+        """
+        Return the list of frames names, from the outermost to the innermost
+
+        Only the max_depth innermost frames are kept.
+        """
+        names = []
+        while frame is not None:
+            names.append(self._frame_name(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return names[-self.max_depth:]
+
+    def sample(self):
+        """
+        Take one sample of all threads, except the profiler one
+        """
+        current_ident = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == current_ident:
+                continue
+            names = self._stack(frame)
+            owner = _thread_owners.get(ident)
+            owner_name = _owner_name(owner) if owner else "unknown"
+            with self._lock:
+                self.samples[";".join([owner_name] + names)] += 1
+
+    def collapsed(self):
+        """
+        Return the samples in the collapsed stack format
+        """
+        with self._lock:
+            samples = sorted(self.samples.items())
+        return "".join(
+            "{} {}\n".format(stack, count) for stack, count in samples
+        )
+
+    def by_owner(self):
+        """
+        Return the number of samples by owner
+        """
+        r = Counter()
+        with self._lock:
+            for stack, count in self.samples.items():
+                r[stack.split(";", 1)[0]] += count
+        return r
+
+    def dump(self, path=None):
+        """
+        Write the collapsed stacks in a file
+
+        :param path: file to write in. Default to self.path
+        """
+        path = path or self.path
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        logger.info("Profile dumped in {}".format(path))
+        return path
+
+    def reset(self):
+        with self._lock:
+            self.samples = Counter()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug("Error when sampling stacks: {}".format(e))
+
+    def start(self):
+        if self._running_thread and self._running_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._running_thread = threading.Thread(target=self.run, daemon=True)
+        self._running_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._running_thread:
+            self._running_thread.join()
+
+    def __init__(self, interval=0.01, path=None, max_depth=64):
+        #: interval between 2 samples, in seconds
+        self.interval = interval
+
+        #: default file where the profile is dumped
+        self.path = path if path is not None else default_profile_path()
+
+        #: maximum number of frames kept by stack
+        self.max_depth = max_depth
+
+        #: number of samples by collapsed stack
+        self.samples = Counter()
+        #: frames names, by code object
+        self._names = dict()
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stop_event.set()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import signal
+import threading
+
+from barython.hooks import HooksPool
+from barython.panel import SIG_TO_CATCH
+
+
+logger = logging.getLogger("barython")
+
+
+class Runtime():
+    """
+    Run several panels in one process, sharing their hooks and sources
+
+    The runtime listens on the hooks of all panels with one pool, so an
+    event source used by several bars is spawned once. Widgets computing the
+    same output (see Widget.source_key()) share one source: one of them
+    computes the output, and the others only decorate it.
+    """
+    @property
+    def widgets(self):
+        """
+        Iterate over the widgets of the plugged screens, without duplicates
+        """
+        seen = set()
+        for panel in self.panels:
+            for screen in panel.screens:
+                for w in screen.widgets:
+                    if id(w) not in seen:
+                        seen.add(id(w))
+                        yield w
+
+    def add_panel(self, *panels):
+        """
+        Run panels in this runtime
+
+        Their hooks are listened on by the runtime instead.
+        """
+        for p in panels:
+            p.runtime = self
+            p.hooks.listen = False
+            self.panels.append(p)
+            self.hooks.merge(p.hooks)
+
+    def share_sources(self):
+        """
+        Group the widgets by source, and let one widget per group compute
+        the output of the others
+
+        :return: number of widgets following another one
+        """
+        groups = dict()
+        for w in self.widgets:
+            w.follow(None)
+            key = w.source_key()
+            if key is not None:
+                groups.setdefault(key, []).append(w)
+        self._followers = []
+        for leader, *followers in groups.values():
+            for w in followers:
+                w.follow(leader)
+                self._followers.append(w)
+        self.propage_hooks_changes()
+        logger.debug("{} widgets share their source".format(
+            len(self._followers)
+        ))
+        return len(self._followers)
+
+    def propage_hooks_changes(self):
+        """
+        Keep the followers callbacks out of the hooks: their leader is
+        notified instead
+        """
+        callbacks = set()
+        for w in self._followers:
+            callbacks.update(w.hooks.callbacks())
+        if callbacks:
+            self.hooks.remove_callbacks(*callbacks)
+
+    def start(self):
+        logger.debug("Starts the runtime")
+        try:
+            for s in SIG_TO_CATCH:
+                signal.signal(s, self._handler_signal)
+        except ValueError:
+            # Probably launched in a thread, so ignoring it
+            pass
+        self._stop.clear()
+        for p in self.panels:
+            p.refresh_screens()
+        if self.shared_sources:
+            self.share_sources()
+        self.hooks.start()
+        for p in self.panels:
+            threading.Thread(target=p.start).start()
+        self._stop.wait()
+
+    def stop(self, *args, **kwargs):
+        self._stop.set()
+        for p in self.panels:
+            try:
+                p.stop()
+            except Exception as e:
+                logger.error("Error when stopping panel: {}".format(e))
+        self.hooks.stop()
+
+    def _handler_signal(self, *args, **kwargs):
+        self.stop()
+        os.sys.exit(0)
+
+    def __init__(self, panels=None, shared_sources=True):
+        #: panels run by this runtime
+        self.panels = []
+
+        #: listen on the hooks of all panels
+        self.hooks = HooksPool(listen=True, parent=self)
+
+        #: let widgets with the same source_key() share their source
+        self.shared_sources = shared_sources
+
+        #: widgets following another one
+        self._followers = []
+
+        #: event to stop the runtime
+        self._stop = threading.Event()
+
+        if panels:
+            self.add_panel(*panels)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+
+class _ScheduledCall():
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class Scheduler():
+    """
+    Run delayed calls in one thread
+
+    Calls are meant to be short: long tasks should start their own thread.
+    """
+    _running_thread = None
+
+    def call_later(self, delay, func, *args, **kwargs):
+        """
+        Call func after delay seconds
+
+        :return: the scheduled call, which can be cancelled
+        """
+        call = _ScheduledCall(func, args, kwargs)
+        with self._condition:
+            heapq.heappush(
+                self._queue,
+                (time.monotonic() + delay, next(self._counter), call)
+            )
+            self._condition.notify()
+            if not (self._running_thread and self._running_thread.is_alive()):
+                self._running_thread = threading.Thread(
+                    target=self.run, daemon=True
+                )
+                self._running_thread.start()
+        return call
+
+    def run(self):
+        while True:
+            with self._condition:
+                while True:
+                    timeout = None
+                    if self._queue:
+                        timeout = self._queue[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    self._condition.wait(timeout)
+                _, _, call = heapq.heappop(self._queue)
+            if call.cancelled:
+                continue
+            try:
+                call.func(*call.args, **call.kwargs)
+            except Exception as e:
+                logger.error("Error in scheduled call: {}".format(e))
+
+    def __init__(self):
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+
+#: default scheduler, shared by all rate limiters
+scheduler = Scheduler()
+
+
+class Policy():
+    """
+    Describe how a rate limiter handles a burst of calls
+
+    Calls received while a call is running or waiting are coalesced: only the
+    latest one is kept.
+    """
+    def __init__(self, wait=None, leading=True, trailing=True, debounce=0):
+        #: minimum time between 2 calls, in seconds. None to use the default
+        #  wait of the rate limiter (the widget refresh).
+        self.wait = wait
+
+        #: run the first call of a burst immediately
+        self.leading = leading
+
+        #: run the latest call of a burst at the end of the wait
+        self.trailing = trailing
+
+        #: wait for debounce seconds without any call before running the
+        #  latest one
+        self.debounce = debounce
+
+
+def leading_edge(wait=None):
+    """
+    Run the first call of a burst, drop the others
+    """
+    return Policy(wait=wait, leading=True, trailing=False)
+
+
+def trailing_edge(wait=None):
+    """
+    Run only the latest call of a burst, wait seconds after the first one
+    """
+    return Policy(wait=wait, leading=False, trailing=True)
+
+
+def debounce(delay):
+    """
+    Run the latest call once nothing has been received for delay seconds
+    """
+    return Policy(wait=0, leading=False, trailing=True, debounce=delay)
+
+
+def max_rate(hz):
+    """
+    Run at most hz calls per second, the latest one being always run
+    """
+    return Policy(wait=1 / hz)
+
+
+def latest_wins():
+    """
+    Run calls as soon as possible, keeping only the latest one while running
+    """
+    return Policy(wait=0)
+
+
+class RateLimiter():
+    """
+    Apply a policy on calls
+    """
+    _last_run = None
+    _running = False
+    _pending = None
+    _timer = None
+
+    #: number of calls received
+    submitted = 0
+    #: number of calls run
+    executed = 0
+    #: number of calls dropped or replaced by a more recent one
+    suppressed = 0
+
+    def _wait(self):
+        wait = self.policy.wait
+        if wait is None:
+            wait = self.default_wait() if self.default_wait else 0
+        return max(0, wait)
+
+    def _suppress(self):
+        self.suppressed += 1
+        if registry.enabled:
+            registry.counter("suppressed_updates").inc()
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.scheduler.call_later(delay, self._fire)
+
+    def _take(self):
+        call, self._pending = self._pending, None
+        self._running = True
+        self._last_run = time.monotonic()
+        return call
+
+    def _remaining(self):
+        if self._last_run is None:
+            return 0
+        return self._last_run + self._wait() - time.monotonic()
+
+    def _run(self, call):
+        func, args, kwargs = call
+        try:
+            self.executed += 1
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running = False
+                if self._pending is not None:
+                    if self.policy.debounce:
+                        self._schedule(self.policy.debounce)
+                    elif self.policy.trailing:
+                        self._schedule(max(0, self._remaining()))
+                    else:
+                        self._pending = None
+                        self._suppress()
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+            if self._running or self._pending is None:
+                return
+            call = self._take()
+        threading.Thread(target=self._run, args=(call, )).start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Submit a call, run now, later or never depending on the policy
+        """
+        with self._lock:
+            self.submitted += 1
+            if self._pending is not None:
+                self._suppress()
+            self._pending = (func, args, kwargs)
+            if self._running:
+                # the end of the current call will handle the pending one
+                return
+            if self.policy.debounce:
+                self._schedule(self.policy.debounce)
+                return
+            if self._timer is not None:
+                return
+            remaining = self._remaining()
+            if remaining <= 0 and self.policy.leading:
+                call = self._take()
+            elif self.policy.trailing:
+                if remaining <= 0:
+                    remaining = self._wait()
+                self._schedule(remaining)
+                return
+            else:
+                self._pending = None
+                self._suppress()
+                return
+        return self._run(call)
+
+    def cancel(self):
+        """
+        Cancel the pending call
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = None
+
+    def __init__(self, policy=None, default_wait=None, scheduler=scheduler):
+        #: policy to apply
+        self.policy = policy if policy is not None else Policy()
+
+        #: function returning the wait to use if not set in the policy
+        self.default_wait = default_wait
+
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
@@ -9,14 +9,40 @@ import xcffib.xproto
 import xcffib.randr
 
 from barython import _BarSpawner
+from barython.profiler import owns_thread
 
 
 logger = logging.getLogger("barython")
 
+ALIGNMENT_TAGS = {a: "%{{{}}}".format(a).encode() for a in ("l", "c", "r")}
+
+
+class XConnection():
+    """
+    X connection shared by RandR and the other X extensions users
+    """
+    _conn = None
+
+    def get(self):
+        """
+        Return the connection, opened again if the previous one is broken
+        """
+        with self._lock:
+            if self._conn is None or self._conn.has_error():
+                self._conn = xcffib.connect()
+                self._conn.randr = self._conn(xcffib.randr.key)
+            return self._conn
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+
+#: connection used by all barython components
+x_connection = XConnection()
+
 
 def get_randr_screens():
-    conn = xcffib.connect()
-    conn.randr = conn(xcffib.randr.key)
+    conn = x_connection.get()
 
     window = conn.get_setup().roots[0].root
     resources = conn.randr.GetScreenResourcesCurrent(window).reply()
@@ -42,8 +68,70 @@ def get_randr_screens():
     return outputs
 
 
+class RandrGeometry():
+    """
+    Fetch the geometry of the screens with RandR
+    """
+    def screens(self):
+        """
+        Return the (width, height, x, y) of the plugged screens, by name
+        """
+        return get_randr_screens()
+
+
+class StaticGeometry():
+    """
+    Fixed geometry of the screens, without X
+
+    :param screens: (width, height, x, y) of the screens, by name. The order
+                    is kept.
+    """
+    def screens(self):
+        return self._screens
+
+    def __init__(self, screens):
+        self._screens = OrderedDict(screens)
+
+
+#: geometry provider of the screens without panel
+default_geometry_provider = RandrGeometry()
+
+
+class _PanelAttribute():
+    """
+    Attribute inherited from the panel when unset (None or -1)
+
+    The panel value is read at each access, so it follows its changes.
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.attr = "_inherited_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.attr)
+        if (value is None or value == -1) and obj.panel:
+            return getattr(obj.panel, self.name, value)
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
+
+
 class Screen(_BarSpawner):
     _bspwm_monitor_name = None
+    #: incremented each time the widgets list changes
+    _layout_version = 0
+    panel = None
+
+    #: attributes to inherit from panel
+    height = _PanelAttribute()
+    fg = _PanelAttribute()
+    bg = _PanelAttribute()
+    fonts = _PanelAttribute()
+    refresh = _PanelAttribute()
+    clickable = _PanelAttribute()
 
     @property
     def geometry(self):
@@ -54,7 +142,9 @@ class Screen(_BarSpawner):
             return self._geometry
         elif self.name:
             try:
-                x, y, px, py = get_randr_screens().get(self.name, None)
+                x, y, px, py = self.geometry_provider.screens().get(
+                    self.name, None
+                )
                 self._geometry = (x, self.height, px, py)
             except (ValueError, TypeError):
                 logger.error(
@@ -67,6 +157,12 @@ class Screen(_BarSpawner):
     def geometry(self, value):
         self._geometry = value
 
+    @property
+    def geometry_provider(self):
+        if self.panel is not None:
+            return self.panel.geometry_provider
+        return default_geometry_provider
+
     @property
     def bspwm_monitor_name(self):
         return (self.name if self._bspwm_monitor_name is None
@@ -94,21 +190,69 @@ class Screen(_BarSpawner):
             self._widgets[alignment] = (
                 list_widgets[:index] + list(widgets) + list_widgets[index:]
             )
-        for w in self._widgets[alignment]:
+        self._layout_version += 1
+        for i, w in enumerate(self._widgets[alignment]):
             w.screens.add(self)
             self.hooks.merge(w.hooks)
+            if w.uid is None:
+                w.uid = self._unique_uid("{}/{}{}/{}".format(
+                    self.name, alignment, i, w.__class__.__name__
+                ))
+                w.generated_uid = True
 
-    def gather(self):
+    def _unique_uid(self, uid):
         """
-        Gather all widgets content
+        Suffix uid if a widget of the screen already uses it
+
+        Positions shift when widgets are inserted, so the uid generated from
+        a position can be taken.
         """
-        return "".join(
-            "%{{{}}}{}".format(
-                alignment, "".join([
-                    str(widget.content) if widget.content is not None
-                    else "" for widget in widgets
-                ])
-            ) for alignment, widgets in self._widgets.items() if widgets
+        taken = set(w.uid for w in self.widgets)
+        unique, i = uid, 1
+        while unique in taken:
+            unique = "{}~{}".format(uid, i)
+            i += 1
+        return unique
+
+    def remove_widget(self, *widgets):
+        """
+        Remove widgets from a screen, and unsubscribe them from the hooks
+
+        Widgets are not stopped.
+
+        :param *widgets: widgets to remove
+        """
+        for alignment, widgets_list in self._widgets.items():
+            self._widgets[alignment] = [
+                w for w in widgets_list if w not in widgets
+            ]
+        self._layout_version += 1
+        callbacks = set()
+        for w in widgets:
+            w.screens.discard(self)
+            callbacks.update(w.hooks.callbacks())
+        self.hooks.remove_callbacks(*callbacks)
+        if getattr(self, "panel", None):
+            self.panel.hooks.remove_callbacks(*callbacks)
+
+    def capture(self):
+        return self._layout_version, tuple(
+            (alignment, tuple(w._record for w in widgets))
+            for alignment, widgets in self._widgets.items() if widgets
+        )
+
+    def content_versions(self, captured=None):
+        layout_version, records = captured or self.capture()
+        return (layout_version, ) + tuple(
+            r.version for _, alignment_records in records
+            for r in alignment_records
+        )
+
+    def render(self, captured=None):
+        _, records = captured or self.capture()
+        return b"".join(
+            ALIGNMENT_TAGS[alignment] + b"".join(r.data for r in a_records)
+            for alignment, a_records in records
         )
 
     def update(self, *args, **kwargs):
@@ -124,6 +268,7 @@ class Screen(_BarSpawner):
         if getattr(self, "panel", None):
             self.panel.hooks.merge(self.hooks)
 
+    @owns_thread
     def start(self):
         """
         Start the screen panel
@@ -132,6 +277,8 @@ class Screen(_BarSpawner):
         starts a local lemonbar.
         Starts all widgets in there own threads. They will callback a screen
         update in case of any change.
+        With the panel fast_startup mode, a placeholder frame is drawn with the
+        static widgets while the other ones warm up.
         """
         super().start()
 
@@ -143,14 +290,56 @@ class Screen(_BarSpawner):
             self.content = ""
             self.stop()
             return
-        self.update(no_wait=True)
 
-        for widget in attached_widgets:
+        if self.panel.fast_startup:
+            # with one instance, the panel already started the static widgets
+            self._start_with_placeholder(
+                [w for w in attached_widgets if w.static]
+                if self.panel.instance_per_screen else [],
+                [w for w in attached_widgets if not w.static],
+                draw=self.panel.instance_per_screen
+            )
+        else:
+            self.update(no_wait=True)
+
+            for widget in attached_widgets:
+                threading.Thread(
+                    target=widget.start
+                ).start()
+
+        self._stop.wait()
+
+    @property
+    def widgets(self):
+        """
+        Iterate over the widgets attached to this screen
+        """
+        return itertools.chain(*self._widgets.values())
+
+    def suspend(self):
+        super().suspend()
+        for widget in self.widgets:
+            widget.suspend()
+
+    def resume(self):
+        """
+        Resume the widgets and draw one catch-up frame
+        """
+        super().resume()
+        for widget in self.widgets:
+            widget.resume()
+        if self.panel.instance_per_screen and not self._stop.is_set():
             threading.Thread(
-                target=widget.start
+                target=self.update, kwargs={"no_wait": True}
             ).start()
 
-        self._stop.wait()
+    def save_snapshot(self, *args, **kwargs):
+        if getattr(self, "panel", None):
+            return self.panel.save_snapshot(*args, **kwargs)
+
+    def save_snapshot_later(self):
+        if getattr(self, "panel", None):
+            return self.panel.save_snapshot_later()
 
     def stop(self, *args, **kwargs):
         super().stop(*args, **kwargs)
@@ -166,15 +355,6 @@ class Screen(_BarSpawner):
                 logger.debug("Error when stopping widget")
                 continue
 
-    def __getattribute__(self, name):
-        attr = super().__getattribute__(name)
-        # attributes to inherit from panel
-        panel_attr = ("height", "fg", "bg", "fonts", "refresh", "clickable")
-        if name in panel_attr:
-            if (attr is None or attr == -1) and self.panel:
-                return getattr(self.panel, name, attr)
-        return attr
-
     def __init__(self, name=None, refresh=-1, clickable=-1, geometry=None,
                  panel=None, bspwm_monitor_name=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
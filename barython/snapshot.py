@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from barython.tools import runtime_dir
+
+logger = logging.getLogger("barython")
+
+
+def default_snapshot_path(uid=None):
+    """
+    Return the default path of the snapshot, in the runtime directory
+
+    :param uid: uid of the panel saving the snapshot
+    """
+    name = "snapshot-{}.json".format(uid) if uid else "snapshot.json"
+    return os.path.join(runtime_dir(), name)
+
+
+class ContentSnapshot():
+    """
+    Persist the last content of each widget on disk
+
+    Loaded before the first frame, it allows a restarted bar to show a
+    complete content at once, without waiting for each hook to fire again.
+    Widgets are identified by their uid.
+    """
+    #: monotonic time of the last save
+    _last_save = None
+
+    def load(self):
+        """
+        Read the snapshot file
+
+        :return: dict of {uid: content}, empty if the snapshot does not exist,
+                 cannot be read or is older than the ttl.
+        """
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            saved_at, contents = snapshot["time"], snapshot["widgets"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(
+                "Cannot load the snapshot {}: {}".format(self.path, e)
+            )
+            return {}
+        if self.ttl is not None and time.time() - saved_at > self.ttl:
+            logger.debug("Snapshot {} is expired, ignore it".format(self.path))
+            return {}
+        return contents
+
+    def restore(self, widgets):
+        """
+        Restore the content of widgets which do not have any yet
+
+        :param widgets: widgets to restore
+        :return: number of restored widgets
+        """
+        contents = self.load()
+        restored = 0
+        for w in widgets:
+            if w.content is None and w.uid in contents:
+                w._publish(contents[w.uid])
+                restored += 1
+        return restored
+
+    def save_delay(self):
+        """
+        Return the time before the throttling allows a new save, in seconds
+        """
+        if self._last_save is None:
+            return 0
+        return max(
+            0, self._last_save + self.min_interval - time.monotonic()
+        )
+
+    def save(self, widgets, force=False):
+        """
+        Save the content of widgets
+
+        The file is replaced atomically, and saves are throttled to one every
+        min_interval seconds.
+
+        :param widgets: widgets to save
+        :param force: ignore the throttling
+        """
+        with self._lock:
+            now = time.monotonic()
+            recently_saved = (
+                self._last_save is not None and
+                now - self._last_save < self.min_interval
+            )
+            if recently_saved and not force:
+                return False
+            self._last_save = now
+            contents = {
+                w.uid: w.content for w in widgets
+                if w.uid is not None and w.content is not None
+            }
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=os.path.dirname(self.path), prefix=".snapshot"
+                )
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"time": time.time(), "widgets": contents}, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error("Cannot save the snapshot {}: {}".format(
+                    self.path, e
+                ))
+                return False
+            return True
+
+    def __init__(self, path=None, ttl=300, min_interval=5):
+        #: path of the snapshot file
+        self.path = path if path is not None else default_snapshot_path()
+
+        #: the snapshot is ignored if older than ttl seconds. None to disable
+        self.ttl = ttl
+
+        #: minimum time between 2 saves, in seconds
+        self.min_interval = min_interval
+
+        self._lock = threading.Lock()
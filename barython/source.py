@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+import logging
+import threading
+
+from barython.metrics import registry
+
+
+logger = logging.getLogger("barython")
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict, hashable to be used in values
+
+    Two FrozenDicts are only equal if their items are in the same order, as
+    the order is usually shown.
+    """
+    def __hash__(self):
+        return hash(tuple(self.items()))
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenDict):
+            return tuple(self.items()) == tuple(other.items())
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value, sort_keys=False):
+    """
+    Convert dicts, lists and sets to immutable and hashable values
+
+    :param sort_keys: sort the dicts items by key, for values where the
+                      order does not matter
+    """
+    if isinstance(value, dict):
+        items = ((k, freeze(v, sort_keys)) for k, v in value.items())
+        if sort_keys:
+            items = sorted(items, key=lambda i: i[0])
+        return FrozenDict(items)
+    elif isinstance(value, (list, tuple)):
+        frozen = tuple(freeze(v, sort_keys) for v in value)
+        # keep the namedtuples type
+        return type(value)(*frozen) if hasattr(value, "_fields") else frozen
+    elif isinstance(value, set):
+        return frozenset(freeze(v, sort_keys) for v in value)
+    return value
+
+
+class Source():
+    """
+    Emit immutable values, and notify the subscribers when the value changes
+    """
+    def emit(self, value):
+        """
+        Emit a new value
+
+        :return: False if the value did not change, so nobody is notified
+        """
+        with self._lock:
+            if self.version and value == self.value:
+                return False
+            self.value = value
+            self.version += 1
+        for callback in tuple(self.subscribers):
+            try:
+                callback(value)
+            except Exception as e:
+                logger.error("Error when notifying a value: {}".format(e))
+        return True
+
+    def subscribe(self, callback):
+        """
+        Call callback with each new value
+
+        :param callback: called with the value, in the emitting thread
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self.subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def __init__(self):
+        #: last value emitted
+        self.value = None
+        #: incremented on each new value, 0 if nothing has been emitted
+        self.version = 0
+        #: callbacks notified on each new value
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+
+class View():
+    """
+    Render values in markup with a pure function, memoized by (value, config)
+
+    The config identifies everything else the rendering depends on, like the
+    colors. Unhashable values are rendered without memoization.
+    """
+    def render(self, value, config=None):
+        try:
+            key = (value, config)
+            hash(key)
+        except TypeError:
+            return self.func(value)
+        with self._lock:
+            markup = self._cache.get(key)
+            if markup is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if markup is not None:
+            if registry.enabled:
+                registry.counter("view.hits").inc()
+            return markup
+        markup = self.func(value)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = markup
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        if registry.enabled:
+            registry.counter("view.misses").inc()
+        return markup
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __init__(self, func, maxsize=32):
+        #: pure function, rendering a value in markup
+        self.func = func
+        #: number of renderings kept
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
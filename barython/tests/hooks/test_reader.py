@@ -0,0 +1,75 @@
+
+import os
+import pytest
+import threading
+
+from barython.hooks import SubprocessHook
+from barython.hooks.reader import LineBuffer, SubprocessReader
+
+
+def test_line_buffer_partial_lines():
+    buf = LineBuffer()
+    assert buf.feed(b"foo") == []
+    assert buf.feed(b"bar\r\nbaz\nqu") == [b"foobar", b"baz"]
+    assert buf.feed(b"x\n") == [b"qux"]
+
+
+def test_line_buffer_max_size():
+    buf = LineBuffer(max_size=4)
+    assert buf.feed(b"foobar") == []
+    assert buf.feed(b"baz\n") == [b"baz"]
+
+
+def test_subprocess_reader_latest_only():
+    reader = SubprocessReader()
+    r, w = os.pipe()
+    received = []
+    eof = threading.Event()
+    reader.register(r, received.extend, on_eof=eof.set, latest_only=True)
+
+    # written at once, so read in the same batch
+    os.write(w, b"1\n2\n3\n")
+    os.close(w)
+    assert eof.wait(1)
+    os.close(r)
+
+    assert received == [b"3"]
+
+
+def test_subprocess_hook_notify_each_line(mocker):
+    callback = mocker.stub()
+    done = threading.Event()
+    callback.side_effect = lambda event: event == "2" and done.set()
+
+    hook = SubprocessHook(cmd=["printf", "1\\n2\\n"], callbacks={callback, })
+    hook.reader = SubprocessReader()
+    hook.start()
+    try:
+        assert done.wait(1)
+    finally:
+        hook.stop()
+    callback.assert_any_call(event="1")
+    callback.assert_any_call(event="2")
+
+
+def test_subprocess_hook_refresh_notify_each_line(mocker):
+    """
+    With a refresh, the lines read at once are spaced but all notified
+    """
+    events = []
+    done = threading.Event()
+
+    def callback(event):
+        events.append(event)
+        if len(events) == 3:
+            done.set()
+
+    hook = SubprocessHook(cmd=["printf", "1\\n2\\n3\\n"],
+                          callbacks={callback, }, refresh=0.05)
+    hook.reader = SubprocessReader()
+    hook.start()
+    try:
+        assert done.wait(1)
+    finally:
+        hook.stop()
+    assert sorted(events) == ["1", "2", "3"]
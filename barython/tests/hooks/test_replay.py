@@ -0,0 +1,110 @@
+
+import pytest
+import time
+
+from barython.hooks import HooksPool
+from barython.hooks.audio import PulseAudioHook
+from barython.hooks.bspwm import BspwmHook
+from barython.hooks.replay import (
+    EventRecorder, read_events, replace_hooks, ReplayHook
+)
+
+
+BSPWM_REPORT = "WMDVI-I-0:Of:od:LT"
+
+
+@pytest.fixture
+def recorded_events(tmpdir):
+    path = str(tmpdir.join("events.jsonl"))
+    pool = HooksPool()
+    pool.subscribe(lambda *args, **kwargs: None, BspwmHook)
+    pool.subscribe(lambda *args, **kwargs: None, PulseAudioHook)
+    bspwm_hook = pool.hooks[BspwmHook][0]
+    pa_hook = pool.hooks[PulseAudioHook][0]
+
+    recorder = EventRecorder(path)
+    recorder.attach(pool)
+    bspwm_hook._parse_event(BSPWM_REPORT)
+    pa_hook._parse_event("Event 'change' on sink #0")
+    time.sleep(0.2)
+    bspwm_hook._parse_event(BSPWM_REPORT)
+    recorder.stop()
+    assert recorder.recorded == 3
+    return path
+
+
+def test_recorder(recorded_events):
+    events = list(read_events(recorded_events, BspwmHook))
+    assert len(events) == 2
+    assert events[0][1:] == ([BSPWM_REPORT], {})
+    assert events[1][0] - events[0][0] >= 0.2
+    assert len(list(read_events(recorded_events))) == 3
+
+
+def test_recorder_skip_unserializable(tmpdir):
+    recorder = EventRecorder(str(tmpdir.join("events.jsonl")))
+    recorder.start()
+    recorder.record(BspwmHook(), (object(), ), {})
+    recorder.stop()
+    assert (recorder.recorded, recorder.skipped) == (0, 1)
+
+
+def test_replay_hook(recorded_events, mocker):
+    callback = mocker.stub()
+    h = ReplayHook(recorded_events, BspwmHook, speed=0, callbacks={callback})
+    h.start()
+    assert h.finished.wait(1)
+    h.stop()
+    time.sleep(0.1)
+    assert h.replayed == 2
+    assert callback.call_count == 2
+    monitors = callback.call_args[1]["monitors"]
+    assert monitors["DVI-I-0"]["desktops"] == ["Of", "od"]
+
+
+def test_replay_hook_speed(recorded_events, mocker):
+    h = ReplayHook(recorded_events, BspwmHook, speed=2,
+                   callbacks={mocker.stub()})
+    start = time.monotonic()
+    h.start()
+    assert h.finished.wait(1)
+    h.stop()
+    assert 0.1 <= time.monotonic() - start < 0.2
+
+
+def test_replace_hooks(recorded_events, mocker):
+    callback = mocker.stub()
+    pool = HooksPool()
+    pool.subscribe(callback, BspwmHook)
+    replays = replace_hooks(pool, BspwmHook, recorded_events, speed=0)
+    assert pool.hooks[BspwmHook] == replays
+    assert replays[0].callbacks == {callback}
+
+
+def test_replace_hooks_same_class(tmpdir, mocker):
+    """
+    Each replay only notifies the events of the hook it replaces
+    """
+    path = str(tmpdir.join("events.jsonl"))
+    callback0, callback1 = mocker.stub(), mocker.stub()
+    pool = HooksPool()
+    pool.hooks[BspwmHook] = [
+        BspwmHook(cmd=["bspc", "0"], callbacks={callback0}),
+        BspwmHook(cmd=["bspc", "1"], callbacks={callback1}),
+    ]
+    recorder = EventRecorder(path)
+    recorder.attach(pool)
+    pool.hooks[BspwmHook][0]._parse_event(BSPWM_REPORT)
+    pool.hooks[BspwmHook][1]._parse_event(BSPWM_REPORT)
+    pool.hooks[BspwmHook][1]._parse_event(BSPWM_REPORT)
+    recorder.stop()
+
+    replays = replace_hooks(pool, BspwmHook, path, speed=0)
+    for h in replays:
+        h.start()
+        assert h.finished.wait(1)
+        h.stop()
+    time.sleep(0.1)
+    assert [h.replayed for h in replays] == [1, 2]
+    assert callback0.call_count == 1
+    assert callback1.call_count == 2
@@ -0,0 +1,75 @@
+
+import pytest
+import threading
+
+from barython.hooks import SubprocessHook
+from barython.hooks.reader import SubprocessReader
+from barython.hooks.supervisor import BACKOFF, DOWN, UP, Supervisor
+from barython.widgets.base import Widget
+
+
+def test_supervisor_backoff():
+    sup = Supervisor(base_delay=1, max_delay=5, jitter=0, budget=10)
+    delays = []
+    for i in range(5):
+        sup.started()
+        delays.append(sup.exited(1))
+    assert delays == [1, 2, 4, 5, 5]
+    assert sup.state == BACKOFF
+    assert sup.crashes == 5
+
+
+def test_supervisor_backoff_reset_after_uptime():
+    sup = Supervisor(base_delay=1, jitter=0, min_uptime=0)
+    for i in range(3):
+        sup.started()
+        assert sup.exited(0) == 1
+
+
+def test_supervisor_budget():
+    sup = Supervisor(base_delay=0, max_delay=30, jitter=0, budget=2)
+    sup.exited()
+    sup.exited()
+    assert sup.state == BACKOFF
+    assert sup.exited() == 30
+    assert sup.state == DOWN
+
+    assert sup.running()
+    assert sup.state == UP
+
+
+def test_supervisor_jitter():
+    sup = Supervisor(base_delay=1, jitter=0.5)
+    assert 0.5 <= sup.exited() <= 1
+
+
+def test_subprocess_hook_source_down(mocker):
+    w = Widget()
+    down = threading.Event()
+    mocker.patch.object(
+        w, "on_source_state", side_effect=lambda h, s: down.set()
+    )
+    hook = SubprocessHook(
+        cmd=["false"], callbacks={w.handler, },
+        supervisor=Supervisor(base_delay=10)
+    )
+    hook.reader = SubprocessReader()
+    hook.start()
+    try:
+        assert down.wait(2)
+    finally:
+        hook.stop()
+    w.on_source_state.assert_called_once_with(hook, BACKOFF)
+    assert hook.supervisor.crashes == 1
+
+
+def test_widget_stale_marker():
+    w = Widget(stale_marker="!")
+    w._publish("test")
+
+    w.on_source_state(None, DOWN)
+    assert w.content == "!test"
+    w.on_source_state(None, BACKOFF)
+    assert w.content == "!test"
+    w.on_source_state(None, UP)
+    assert w.content == "test"
@@ -0,0 +1,138 @@
+
+import os
+import pytest
+import socket
+import threading
+
+from barython.actions import ActionDispatcher, BspwmActions, MPDActions
+from barython.hooks.reader import SubprocessReader
+
+
+def test_actions_dispatch_handler(mocker):
+    handler = mocker.stub()
+    dispatcher = ActionDispatcher(handlers={"test": handler})
+    mocker.patch.object(dispatcher, "run_in_shell")
+
+    dispatcher.dispatch("test foo \"bar baz\"")
+    handler.assert_called_once_with(["test", "foo", "bar baz"])
+    assert dispatcher.run_in_shell.call_count == 0
+
+
+def test_actions_dispatch_shell_fallback(mocker):
+    handler = mocker.stub()
+    handler.return_value = False
+    dispatcher = ActionDispatcher(handlers={"test": handler})
+    mocker.patch.object(dispatcher, "run_in_shell")
+
+    # handler refusing the action
+    dispatcher.dispatch("test foo")
+    # unknown command
+    dispatcher.dispatch("urxvt &")
+    # needs a shell
+    dispatcher.dispatch("test foo | cat")
+
+    assert handler.call_count == 1
+    assert [c[0][0] for c in dispatcher.run_in_shell.call_args_list] == [
+        "test foo", "urxvt &", "test foo | cat"
+    ]
+
+
+def test_actions_dispatch_out_of_reader(mocker):
+    """
+    A slow action does not block the reader, and actions keep their order
+    """
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def handler(argv):
+        if argv[1] == "slow":
+            release.wait(1)
+        calls.append(argv[1])
+        if len(calls) == 2:
+            done.set()
+
+    dispatcher = ActionDispatcher(handlers={"test": handler})
+    dispatcher._on_lines([b"test slow\n", b"test fast\n"])
+    assert not calls
+    release.set()
+    assert done.wait(1)
+    assert calls == ["slow", "fast"]
+
+
+def test_actions_run_in_shell(tmpdir):
+    dispatcher = ActionDispatcher(handlers={})
+    target = tmpdir.join("clicked")
+    dispatcher.run_in_shell("touch {}".format(target))
+    dispatcher._children[0].wait()
+    assert target.check()
+
+
+def test_actions_listen(mocker):
+    handler = mocker.stub()
+    dispatched = threading.Event()
+    handler.side_effect = lambda argv: dispatched.set()
+    dispatcher = ActionDispatcher(handlers={"test": handler})
+    dispatcher.reader = SubprocessReader()
+
+    r, w = os.pipe()
+    bar = mocker.Mock(stdout=os.fdopen(r, "rb"))
+    dispatcher.listen(bar)
+    os.write(w, b"test click\n")
+    try:
+        assert dispatched.wait(1)
+    finally:
+        os.close(w)
+    handler.assert_called_once_with(["test", "click"])
+
+
+def test_actions_bspwm_socket(tmpdir):
+    path = str(tmpdir.join("bspwm-socket"))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    received = []
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            received.append(conn.recv(4096))
+            conn.sendall(b"")
+
+    t = threading.Thread(target=serve)
+    t.start()
+    try:
+        assert BspwmActions(path=path)(["bspc", "desktop", "-f", "a b"])
+    finally:
+        t.join()
+        server.close()
+    assert received == [b"desktop\0-f\0a b\0"]
+
+
+def test_actions_bspwm_no_socket(tmpdir):
+    path = str(tmpdir.join("missing"))
+    assert BspwmActions(path=path)(["bspc", "desktop", "-f", "1"]) is False
+
+
+def test_actions_mpd(mocker):
+    actions = MPDActions()
+    client = mocker.Mock()
+    client.status.return_value = {"state": "play"}
+    actions._client = client
+
+    assert actions(["mpc", "toggle"])
+    client.pause.assert_called_once_with(1)
+    assert actions(["mpc", "prev"])
+    client.previous.assert_called_once_with()
+    # not a playback command, left to mpc
+    assert actions(["mpc", "volume", "+5"]) is False
+
+
+def test_actions_dispatch_predict(mocker):
+    dispatcher = ActionDispatcher(handlers={"test": mocker.stub()})
+    w0, w1 = mocker.Mock(), mocker.Mock()
+    owner = mocker.Mock(widgets=[w0, w1])
+
+    dispatcher.dispatch("test click", owner)
+    w0.optimistic_update.assert_called_once_with("test click")
+    w1.optimistic_update.assert_called_once_with("test click")
@@ -0,0 +1,139 @@
+
+import json
+import pytest
+import signal
+import threading
+
+from barython.config import ConfigLoader, compile_config, thaw
+from barython.hooks import HooksPool, _Hook
+from barython.source import freeze
+from barython.widgets.base import SubprocessWidget, TextWidget
+
+
+def write_config(path, config):
+    path.write(json.dumps(config))
+
+
+def base_config():
+    return {
+        "panel": {"instance_per_screen": False, "refresh": 0.2,
+                  "keep_unplugged_screens": True},
+        "screens": [
+            {"name": "DVI-I-0", "widgets": {
+                "l": [{"type": "TextWidget", "text": "left"}],
+                "r": [
+                    {"type": "TextWidget", "text": "right"},
+                    {"type": "SubprocessWidget", "cmd": "echo test"},
+                ],
+            }},
+            {"name": "DVI-I-1", "widgets": {
+                "c": [{"type": "TextWidget", "text": "center"}],
+            }},
+        ]
+    }
+
+
+@pytest.fixture
+def fixture_loader(tmpdir):
+    path = tmpdir.join("barython.json")
+    write_config(path, base_config())
+    loader = ConfigLoader(str(path))
+    loader.build()
+    return loader, path
+
+
+def test_config_freeze_thaw():
+    value = {"b": [1, {"c": 2}], "a": "test"}
+    frozen = freeze(value, sort_keys=True)
+    assert hash(frozen) == hash(
+        freeze({"a": "test", "b": [1, {"c": 2}]}, sort_keys=True)
+    )
+    assert thaw(frozen) == value
+
+
+def test_config_compile_errors():
+    with pytest.raises(ValueError):
+        compile_config({"screens": [{"widgets": {"x": []}}]})
+    with pytest.raises(ValueError):
+        compile_config({"screens": [{"widgets": {"l": [{"text": "a"}]}}]})
+    with pytest.raises(ValueError):
+        compile_config({"screens": [
+            {"widgets": {"l": [{"type": "barython.UnknownWidget"}]}}
+        ]})
+
+
+def test_config_build(fixture_loader):
+    loader, _ = fixture_loader
+    p = loader.panel
+    assert not p.instance_per_screen
+    assert p.refresh == 0.2
+    s0, s1 = p._screens
+    assert s0.name == "DVI-I-0"
+    left, = s0._widgets["l"]
+    right, subprocess_widget = s0._widgets["r"]
+    assert isinstance(left, TextWidget) and left.text == "left"
+    assert isinstance(subprocess_widget, SubprocessWidget)
+    assert s1._widgets["c"][0].text == "center"
+
+
+def test_config_reload_keeps_unchanged_widgets(fixture_loader):
+    loader, path = fixture_loader
+    s0, s1 = loader.panel._screens
+    left = s0._widgets["l"][0]
+    right, subprocess_widget = s0._widgets["r"]
+
+    config = base_config()
+    config["screens"][0]["widgets"]["r"][0]["text"] = "new right"
+    write_config(path, config)
+    assert loader.reload()
+
+    assert loader.panel._screens == [s0, s1]
+    assert s0._widgets["l"] == [left]
+    new_right, kept_subprocess_widget = s0._widgets["r"]
+    assert new_right is not right and new_right.text == "new right"
+    assert kept_subprocess_widget is subprocess_widget
+    assert s0 not in right.screens
+
+
+def test_config_reload_screen_options(fixture_loader):
+    loader, path = fixture_loader
+    s0, s1 = loader.panel._screens
+
+    config = base_config()
+    config["screens"][1]["height"] = 20
+    del config["screens"][0]
+    write_config(path, config)
+    assert loader.reload()
+
+    new_s1, = loader.panel._screens
+    assert new_s1 is not s1 and new_s1.height == 20
+
+
+def test_config_reload_invalid(fixture_loader):
+    loader, path = fixture_loader
+    spec = loader.spec
+    path.write("{")
+    assert not loader.reload()
+    assert loader.spec is spec
+
+
+def test_config_panel_sighup(fixture_loader, mocker):
+    loader, _ = fixture_loader
+    reloaded = threading.Event()
+    mocker.patch.object(
+        loader, "reload", side_effect=lambda: reloaded.set()
+    )
+    loader.panel._handler_signal(signal.SIGHUP)
+    assert reloaded.wait(1)
+
+
+def test_hooks_pool_remove_callbacks(mocker):
+    callback0, callback1 = mocker.stub(), mocker.stub()
+    hp = HooksPool()
+    hp.subscribe(callback0, _Hook)
+    hp.subscribe(callback1, _Hook)
+
+    hp.remove_callbacks(callback0)
+    assert hp.hooks[_Hook][0].callbacks == {callback1, }
+    hp.remove_callbacks(callback1)
+    assert _Hook not in hp.hooks
@@ -0,0 +1,95 @@
+
+import pytest
+import json
+import logging
+
+from barython.log import lazy, log_sampled, RingBufferHandler, Sampler
+import barython.log
+
+
+class CountFormat():
+    count = 0
+
+    def __format__(self, spec):
+        self.count += 1
+        return "formatted"
+
+
+@pytest.fixture
+def ring_buffer(tmpdir):
+    handler = RingBufferHandler(
+        capacity=3, path=str(tmpdir.join("barython.log"))
+    )
+    handler.attach()
+    yield handler
+    handler.detach()
+
+
+def test_lazy_message_not_formatted_when_disabled():
+    arg = CountFormat()
+    logger = logging.getLogger("barython")
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        logger.debug(lazy("Writing {}", arg))
+    finally:
+        logger.setLevel(level)
+    assert arg.count == 0
+    message = lazy("Writing {} {field}", arg, field=1)
+    assert str(message) == "Writing formatted 1"
+
+
+def test_sampler(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(barython.log.time, "monotonic", lambda: now[0])
+    sampler = Sampler(interval=1)
+    assert sampler.allow("write") == (True, 0)
+    assert sampler.allow("write") == (False, 1)
+    assert sampler.allow("other") == (True, 0)
+    now[0] = 1
+    assert sampler.allow("write") == (True, 1)
+
+
+def test_log_sampled(ring_buffer, monkeypatch):
+    monkeypatch.setattr(barython.log, "sampler", Sampler(interval=60))
+    for i in range(5):
+        log_sampled(logging.DEBUG, "key", "Frame {}", i)
+    assert [r.getMessage() for r in ring_buffer.records()] == ["Frame 0"]
+
+
+def test_ring_buffer_bounded(ring_buffer):
+    logger = logging.getLogger("barython")
+    for i in range(5):
+        logger.debug(lazy("Frame {i}", i=i))
+    records = ring_buffer.records()
+    assert [r.getMessage() for r in records] == [
+        "Frame 2", "Frame 3", "Frame 4"
+    ]
+
+    with open(ring_buffer.dump()) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[-1]["message"] == "Frame 4"
+    assert lines[-1]["fields"] == {"i": 4}
+    assert lines[-1]["level"] == "DEBUG"
+
+
+def test_ring_buffer_attach_keeps_parent_level(mocker):
+    logger = logging.getLogger("barython")
+    parent_handler = logging.Handler()
+    mocker.patch.object(parent_handler, "emit")
+    logging.getLogger().addHandler(parent_handler)
+    level, propagate = logger.level, logger.propagate
+    logger.setLevel(logging.INFO)
+    handler = RingBufferHandler()
+    try:
+        handler.attach()
+        logger.debug("debug")
+        logger.info("info")
+        assert len(handler.records()) == 2
+        assert parent_handler.emit.call_count == 1
+    finally:
+        handler.detach()
+        logging.getLogger().removeHandler(parent_handler)
+        assert logger.level == logging.INFO
+        assert logger.propagate == propagate
+        logger.setLevel(level)
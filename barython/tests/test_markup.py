@@ -0,0 +1,61 @@
+import pytest
+
+from barython.markup import (
+    Markup, escape, escape_command, merge, validate
+)
+
+
+def test_escape():
+    assert escape("100%") == "100%%"
+    assert escape("100%") is escape("100%")
+
+
+def test_escape_command():
+    assert escape_command("echo a:b") == "echo a\\:b"
+    # already escaped colons are kept
+    assert escape_command("echo a\\:b") == "echo a\\:b"
+
+
+def test_markup_builder():
+    m = Markup()
+    m.open_actions({1: "echo"})
+    previous = m.style(fg="#FFFFFF", bg="#000000")
+    m.text("50%")
+    m.restore(previous)
+    m.close_actions(1)
+    m.text("end")
+    assert str(m) == "%{A1:echo:}%{B#000000}%{F#FFFFFF}50%%%{A}%{F-}%{B-}end"
+    assert m.encode() == str(m).encode()
+
+
+def test_markup_merge():
+    assert merge(
+        "%{B#1}%{F#2} %{F-}%{B-}%{B#1}%{F#2}x%{F-}%{B-}%{B#1}%{F#3} %{F-}%{B-}"
+    ) == "%{B#1}%{F#2} x%{F#3} %{F-}%{B-}"
+    # tags without text after are kept, as they apply on the next widgets
+    assert merge("a%{F#1}") == "a%{F#1}"
+    assert merge("%{F#1}%{F-}a") == "a"
+
+
+def test_markup_merge_offset():
+    """
+    Offsets are drawn with the background, which is set before them
+    """
+    assert merge("%{B#1}%{O10}%{B-}") == "%{B#1}%{O10}%{B-}"
+    assert merge("%{B#1}%{O10}b%{B-}") == "%{B#1}%{O10}b%{B-}"
+
+
+def test_markup_merge_swap():
+    """
+    Colors cannot be followed after a swap, they are set again
+    """
+    assert merge("%{F#1}a%{R}b%{F#1}c%{F-}%{T1}d%{T-}") == (
+        "%{F#1}a%{R}b%{F#1}c%{F-}%{T1}d%{T-}"
+    )
+
+
+def test_markup_validate():
+    validate("%{l}%{A1:echo a\\:b:}%{F#FFFFFF}100%%%{F-}%{A}%{S+}")
+    for markup in ("%{F#FFFFFF", "%{Z}", "%{A}", "%{A1:echo}", "%{A1:e:}"):
+        with pytest.raises(ValueError):
+            validate(markup)
@@ -0,0 +1,100 @@
+import json
+import os
+import socket
+
+import pytest
+
+from barython.metrics import Histogram, Registry, SocketExporter, registry
+from barython.panel import Panel
+from barython.screen import Screen
+from barython.widgets.base import TextWidget
+
+
+@pytest.fixture
+def enabled_registry():
+    registry.reset()
+    registry.enable()
+    yield registry
+    registry.disable()
+    registry.reset()
+
+
+def test_histogram_percentiles():
+    h = Histogram()
+    for i in range(1, 101):
+        h.observe(i / 1000)
+
+    assert h.count == 100
+    assert h.min == 0.001
+    assert h.max == 0.1
+    assert h.percentile(50) == pytest.approx(0.05, abs=0.001)
+    assert h.percentile(99) == pytest.approx(0.099, abs=0.001)
+    assert sum(h.bucket_counts) == 100
+
+
+def test_registry_disabled_by_default():
+    assert not Registry().enabled
+
+
+def test_registry_event_to_pixel():
+    r = Registry()
+    r.mark_event()
+    r.mark_event()
+    r.frame_written(nbytes=10)
+    r.frame_written(nbytes=10)
+
+    snapshot = r.snapshot()
+    assert snapshot["event_to_pixel"]["count"] == 1
+    assert snapshot["frames_total"] == 2
+    assert snapshot["frame_bytes"]["sum"] == 20
+    assert snapshot["threads"] >= 1
+
+
+def test_registry_frame_bytes_buckets():
+    r = Registry()
+    r.frame_written(nbytes=100)
+    r.frame_written(nbytes=3000)
+
+    buckets = dict(r.snapshot()["frame_bytes"]["buckets"])
+    assert buckets["128"] == buckets["4096"] == 1
+    assert buckets["inf"] == 0
+
+
+def test_registry_widget_update(enabled_registry):
+    p = Panel(keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    w = TextWidget(text="test", uid="text")
+    s.add_widget("l", w)
+    w._timed_update()
+
+    assert enabled_registry.histogram("widget.update.text").count == 1
+
+
+def test_registry_draw(enabled_registry, mocker):
+    s = Screen()
+    s._stop.clear()
+    s._bar = mocker.Mock()
+    s.draw()
+
+    snapshot = enabled_registry.snapshot()
+    assert snapshot["Screen.draw"]["count"] == 1
+    assert snapshot["Screen.render"]["count"] == 1
+    assert snapshot["write"]["count"] == 1
+    assert snapshot["frames_total"] == 1
+
+
+def test_socket_exporter(tmpdir):
+    path = str(tmpdir.join("metrics.sock"))
+    r = Registry()
+    r.counter("test").inc(3)
+    exporter = SocketExporter(path, registry=r)
+    exporter.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            data = client.makefile().readline()
+        assert json.loads(data)["test"] == 3
+    finally:
+        exporter.stop()
+    assert not os.path.exists(path)
@@ -0,0 +1,94 @@
+
+import pytest
+import threading
+
+from barython.output import FileOutput, MemoryOutput
+from barython.panel import Panel
+from barython.screen import Screen, StaticGeometry
+from barython.widgets.base import TextWidget
+
+
+GEOMETRY = StaticGeometry([
+    ("DVI-I-0", (1920, 1080, 0, 0)), ("DVI-I-1", (1280, 1024, 1920, 0)),
+])
+
+
+def build_headless_panel(output, instance_per_screen=True):
+    p = Panel(instance_per_screen=instance_per_screen, output=output,
+              geometry_provider=GEOMETRY, actions=False, height=20)
+    screens = [Screen(name) for name in ("DVI-I-0", "DVI-I-1", "HDMI-0")]
+    for i, s in enumerate(screens):
+        s.add_widget("l", TextWidget(text="screen{}".format(i)))
+    p.add_screen(*screens)
+    return p, screens
+
+
+def wait_last_frame(output, target, expected, timeout=1):
+    """
+    Screens are drawn as their widgets get ready: wait for the expected frame
+    """
+    count = 1
+    while output.wait_frames(count, timeout=timeout):
+        frames = output.frames_of(target)
+        if frames and frames[-1].data == expected:
+            return True
+        count = output.count + 1
+    return False
+
+
+def test_memory_output_sink():
+    output = MemoryOutput(maxlen=2)
+    target = object()
+    bar = output.open(target, geometry=(100, 20))
+    assert bar.options == {"geometry": (100, 20)}
+    assert bar.poll() is None and bar.stdout is None
+
+    for data in (b"a\n", b"b\n", b"c\n"):
+        bar.stdin.write(data)
+    assert [f.data for f in output.frames_of(target)] == [b"b\n", b"c\n"]
+    assert output.count == 3
+
+    bar.terminate()
+    assert bar.poll() == 0
+    with pytest.raises(BrokenPipeError):
+        bar.stdin.write(b"d\n")
+
+
+def test_file_output(tmpdir):
+    path = str(tmpdir.join("frames"))
+    output = FileOutput(path)
+    s = Screen("DVI-I-0")
+    output.open(s).stdin.write(b"%{l}test\n")
+    output.close()
+
+    with open(path, "rb") as f:
+        time, name, frame = f.read().split(b" ", 2)
+    float(time)
+    assert (name, frame) == (b"DVI-I-0", b"%{l}test\n")
+
+
+def test_headless_panel_instance_per_screen():
+    output = MemoryOutput()
+    p, (s0, s1, s2) = build_headless_panel(output)
+    try:
+        threading.Thread(target=p.start).start()
+        assert wait_last_frame(output, s0, b"%{l}screen0\n")
+        assert wait_last_frame(output, s1, b"%{l}screen1\n")
+    finally:
+        p.stop()
+
+    # not plugged
+    assert not output.frames_of(s2)
+    assert s1.geometry[0::2] == (1280, 1920)
+
+
+def test_headless_panel_single_instance():
+    output = MemoryOutput()
+    p, screens = build_headless_panel(output, instance_per_screen=False)
+    try:
+        threading.Thread(target=p.start).start()
+        assert wait_last_frame(
+            output, p, b"%{S0}%{l}screen0%{S1}%{l}screen1\n"
+        )
+    finally:
+        p.stop()
@@ -1,28 +1,24 @@
 
+import logging
 import pytest
 import threading
 import time
 
-import barython.screen
+from barython.hooks.randr import RandrHook
+from barython.log import RingBufferHandler
 from barython.panel import Panel
-from barython.screen import Screen
+from barython.screen import Screen, StaticGeometry
 from barython.widgets import ClockWidget
-from barython.widgets.base import TextWidget
+from barython.widgets.base import TextWidget, Widget
 from barython.tests.tools import disable_spawn_bar
 
 
 @pytest.fixture
-def fixture_useful_screens(monkeypatch, mocker):
-    def mock_get_randr_screens(*args, **kwargs):
-        return {"DVI-I-0": (1920, 1080, 50, 60)}
-
-    monkeypatch.setattr(barython.panel, "get_randr_screens",
-                        mock_get_randr_screens)
-    monkeypatch.setattr(barython.screen, "get_randr_screens",
-                        mock_get_randr_screens)
-
+def fixture_useful_screens(mocker):
     disable_spawn_bar(Panel)
-    p = Panel(keep_unplugged_screens=False)
+    p = Panel(keep_unplugged_screens=False, geometry_provider=StaticGeometry(
+        {"DVI-I-0": (1920, 1080, 50, 60)}
+    ))
     disable_spawn_bar(Screen)
     s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
 
@@ -88,7 +84,8 @@ def test_pannel_add_screen_insert():
 
 
 def test_panel_gather_no_screen(fixture_useful_screens):
-    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True,
+              geometry_provider=StaticGeometry({}))
     disable_spawn_bar(p)
     p.gather()
     try:
@@ -124,19 +121,104 @@ def test_panel_gather_multiple_screens():
     s1.add_widget("l", w)
     w.update()
 
-    assert p.gather() == "%{l}test%{S+}%{l}test"
+    assert p.gather() == "%{S0}%{l}test%{S1}%{l}test"
+
+
+def test_panel_render_cached_per_screen(mocker):
+    """
+    Test that only the screens which changed are rendered again
+    """
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    s0, s1 = Screen(), Screen()
+    p.add_screen(s0, s1)
+    w0, w1 = Widget(), Widget()
+    s0.add_widget("l", w0)
+    s1.add_widget("l", w1)
+    w0._publish("test0")
+    w1._publish("test1")
+    mocker.spy(s0, "render")
+    mocker.spy(s1, "render")
+
+    assert p.gather() == "%{S0}%{l}test0%{S1}%{l}test1"
+    w1._publish("test2")
+    assert p.gather() == "%{S0}%{l}test0%{S1}%{l}test2"
+    assert s0.render.call_count == 1
+    assert s1.render.call_count == 2
+
+
+def test_panel_screen_tags_beyond_ten_screens():
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    for i in range(12):
+        s = Screen()
+        p.add_screen(s)
+        w = Widget()
+        s.add_widget("l", w)
+        w._publish(str(i))
 
+    content = p.gather()
+    assert content.startswith("%{S0}%{l}0%{S1}%{l}1")
+    assert content.endswith("%{S9}%{l}9%{S+}%{l}10%{S+}%{l}11")
 
-def test_panel_clean_screens(monkeypatch):
-    def mock_get_randr_screens(*args, **kwargs):
-        return {"DVI-I-0": (1920, 1080, 50, 60)}
 
-    monkeypatch.setattr(barython.panel, "get_randr_screens",
-                        mock_get_randr_screens)
-    monkeypatch.setattr(barython.screen, "get_randr_screens",
-                        mock_get_randr_screens)
+def test_panel_screens_cached(mocker):
+    geometry = mocker.Mock()
+    geometry.screens.return_value = {"DVI-I-0": (1920, 1080, 50, 60)}
+
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=False,
+              geometry_provider=geometry)
+    s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
+    p.add_screen(s0, s1)
+
+    assert p.screens == (s0, )
+    assert p.screens == (s0, )
+    assert geometry.screens.call_count == 1
+
+    geometry.screens.return_value = {"DVI-I-0": (1920, 1080, 50, 60),
+                                     "DVI-I-1": (1920, 1080, 1970, 60)}
+    p.refresh_screens()
+    assert p.screens == (s0, s1)
+    assert geometry.screens.call_count == 2
+
+
+def test_panel_screens_changed():
+    geometry = StaticGeometry({"DVI-I-0": (1920, 1080, 50, 60)})
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=False,
+              geometry_provider=geometry)
+    s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
+    p.add_screen(s0, s1)
+    assert p.screens == (s0, )
+
+    geometry._screens["DVI-I-1"] = (1920, 1080, 1970, 60)
+    p.reload()
+    assert p.screens == (s0, s1)
+
+
+def test_panel_listen_randr():
+    p = Panel(keep_unplugged_screens=True)
+    disable_spawn_bar(p)
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        randr_hooks = p.hooks.hooks[RandrHook]
+        assert randr_hooks[0].callbacks == {p.screens_changed}
+    finally:
+        p.stop()
+
+    p = Panel(geometry_provider=StaticGeometry({}))
+    disable_spawn_bar(p)
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert RandrHook not in p.hooks.hooks
+    finally:
+        p.stop()
+
 
-    p = Panel(instance_per_screen=False, keep_unplugged_screens=False)
+def test_panel_clean_screens():
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=False,
+              geometry_provider=StaticGeometry(
+                  {"DVI-I-0": (1920, 1080, 50, 60)}
+              ))
     s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
     w = TextWidget(text="test")
     s0.add_widget("l", w)
@@ -146,16 +228,11 @@ def test_panel_clean_screens(monkeypatch):
     assert tuple(p.clean_screens()) == (s0, )
 
 
-def test_panel_clean_screens_instance_per_screen(monkeypatch):
-    def mock_get_randr_screens(*args, **kwargs):
-        return {"DVI-I-0": (1920, 1080, 50, 60)}
-
-    monkeypatch.setattr(barython.panel, "get_randr_screens",
-                        mock_get_randr_screens)
-    monkeypatch.setattr(barython.screen, "get_randr_screens",
-                        mock_get_randr_screens)
-
-    p = Panel(instance_per_screen=True, keep_unplugged_screens=False)
+def test_panel_clean_screens_instance_per_screen():
+    p = Panel(instance_per_screen=True, keep_unplugged_screens=False,
+              geometry_provider=StaticGeometry(
+                  {"DVI-I-0": (1920, 1080, 50, 60)}
+              ))
     s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
     w = TextWidget(text="test")
     s0.add_widget("l", w)
@@ -211,3 +288,65 @@ def test_panel_no_useless_init_bar(fixture_useful_screens, mocker):
         assert s1.init_bar.call_count == 0
     finally:
         p.stop()
+
+
+def test_panel_fast_startup_placeholder(fixture_useful_screens):
+    p, s0, s1 = fixture_useful_screens
+    p.instance_per_screen = False
+    p.fast_startup = True
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert p.init_bar.call_count == 1
+        assert s0.init_bar.call_count == 0
+        # the static widget is already in the placeholder frame
+        first_frame = p._write_in_bar.call_args_list[0][0][0]
+        assert first_frame == b"%{l}test\n"
+        assert p.time_to_first_frame is not None
+    finally:
+        p.stop()
+
+
+def test_panel_fast_startup_static_started_once(fixture_useful_screens,
+                                                mocker):
+    p, s0, s1 = fixture_useful_screens
+    p.instance_per_screen = False
+    p.fast_startup = True
+    w = next(s0.widgets)
+    mocker.spy(w, "start")
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert w.start.call_count == 1
+    finally:
+        p.stop()
+
+
+def test_panel_fast_startup_instance_per_screen(fixture_useful_screens):
+    p, s0, s1 = fixture_useful_screens
+    p.instance_per_screen = True
+    p.fast_startup = True
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert p.init_bar.call_count == 0
+        assert s0.init_bar.call_count == 1
+        first_frame = s0._write_in_bar.call_args_list[0][0][0]
+        assert first_frame == b"%{l}test\n"
+        assert s0.time_to_first_frame is not None
+    finally:
+        p.stop()
+
+
+def test_panel_dump_log_buffer(tmpdir):
+    path = str(tmpdir.join("barython.log"))
+    p = Panel(keep_unplugged_screens=True,
+              log_buffer=RingBufferHandler(path=path))
+    p.log_buffer.attach()
+    try:
+        logging.getLogger("barython").debug("test")
+        p.dump()
+    finally:
+        p.log_buffer.detach()
+    with open(path) as f:
+        assert "test" in f.read()
@@ -0,0 +1,109 @@
+
+import pytest
+import threading
+import time
+
+import barython.power
+from barython.panel import Panel
+from barython.power import PowerMonitor, ScreenLockerProvider
+from barython.screen import Screen
+from barython.widgets.base import TextWidget, Widget
+from barython.tests.tools import disable_spawn_bar
+
+
+class FakeDPMSStateProvider():
+    inactive = False
+
+    def is_inactive(self):
+        return self.inactive
+
+
+@pytest.fixture
+def fixture_panel(mocker):
+    disable_spawn_bar(Panel)
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    s = Screen()
+    w = TextWidget(text="test")
+    s.add_widget("l", w)
+    p.add_screen(s)
+    mocker.spy(p, "_write_in_bar")
+    p._stop.clear()
+    p.init_bar()
+    return p, s, w
+
+
+def test_power_monitor_suspend_resume(fixture_panel):
+    p, s, w = fixture_panel
+    provider = FakeDPMSStateProvider()
+    monitor = PowerMonitor(providers=[provider])
+    monitor.panel = p
+
+    assert not monitor.check()
+    assert not p.suspended
+
+    provider.inactive = True
+    assert monitor.check()
+    assert p.suspended and s.suspended
+    assert not w._active.is_set()
+
+    provider.inactive = False
+    assert not monitor.check()
+    assert not p.suspended and not s.suspended
+    assert w._active.is_set()
+
+
+def test_power_suspended_drop_redraws(fixture_panel):
+    p, s, w = fixture_panel
+    p.suspend()
+    w._publish("test")
+    w._publish("test2")
+    p.draw()
+    assert p._write_in_bar.call_count == 0
+
+    p.resume()
+    # one catch-up frame is drawn with the last content
+    time.sleep(0.1)
+    assert p._write_in_bar.call_count == 1
+    assert b"test2" in p._write_in_bar.call_args[0][0]
+
+
+def test_power_suspended_widget_pauses():
+    w = Widget(refresh=0, infinite=True)
+    updates = []
+    w.update = lambda: updates.append(1)
+    w.suspend()
+
+    t = threading.Thread(target=w.start)
+    t.start()
+    time.sleep(0.1)
+    assert len(updates) == 0
+
+    w.resume()
+    time.sleep(0.1)
+    w.stop()
+    t.join()
+    assert len(updates) > 0
+
+
+def test_power_screen_locker_provider(tmpdir):
+    tmpdir.mkdir("42").join("comm").write("bash\n")
+    provider = ScreenLockerProvider(proc_dir=str(tmpdir))
+    assert not provider.is_inactive()
+
+    tmpdir.mkdir("43").join("comm").write("i3lock\n")
+    assert provider.is_inactive()
+
+
+def test_power_screen_locker_provider_cached_pid(tmpdir, mocker):
+    tmpdir.mkdir("42").join("comm").write("bash\n")
+    tmpdir.mkdir("43").join("comm").write("i3lock\n")
+    provider = ScreenLockerProvider(proc_dir=str(tmpdir))
+    assert provider.is_inactive()
+
+    listdir = mocker.spy(barython.power.os, "listdir")
+    assert provider.is_inactive()
+    assert listdir.call_count == 0
+
+    tmpdir.join("43", "comm").remove()
+    assert not provider.is_inactive()
+    assert listdir.call_count == 1
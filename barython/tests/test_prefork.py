@@ -0,0 +1,124 @@
+
+import os
+import pytest
+import threading
+import time
+
+from barython.prefork import PreforkServer
+from barython.widgets.base import SubprocessWidget
+
+
+@pytest.fixture
+def prefork_server():
+    server = PreforkServer(max_workers=2, timeout=2)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_prefork_run(prefork_server):
+    result = prefork_server.run(["echo", "test"]).result(timeout=2)
+    assert result.returncode == 0
+    assert result.stdout == b"test\n"
+
+
+def test_prefork_run_shell_env(prefork_server):
+    result = prefork_server.run(
+        ["echo $BARYTHON_TEST; exit 3"], shell=True,
+        env={"BARYTHON_TEST": "foo"}
+    ).result(timeout=2)
+    assert result.returncode == 3
+    assert result.stdout == b"foo\n"
+
+
+def test_prefork_unknown_command(prefork_server):
+    result = prefork_server.run("barython-unknown-cmd").result(timeout=2)
+    assert result.returncode == 127
+
+
+def test_prefork_concurrency_limit(prefork_server):
+    start = time.monotonic()
+    futures = [prefork_server.run("sleep 0.3") for i in range(4)]
+    for f in futures:
+        f.result(timeout=3)
+    # 4 commands, 2 at a time
+    assert time.monotonic() - start >= 0.6
+
+
+def test_prefork_timeout(prefork_server):
+    result = prefork_server.run("sleep 5", timeout=0.1).result(timeout=2)
+    assert result.returncode == -15
+
+
+def test_prefork_stop_fails_pending():
+    server = PreforkServer()
+    server.start()
+    future = server.run("sleep 5")
+    server.stop()
+    with pytest.raises(EOFError):
+        future.result(timeout=2)
+    assert not server.running
+
+
+def test_prefork_subprocesswidget(prefork_server, mocker):
+    sw = SubprocessWidget(cmd="echo Test", prefork=prefork_server)
+    mocker.spy(sw, "_init_subprocess")
+    sw.update()
+
+    assert sw.content == "Test"
+    assert sw._init_subprocess.call_count == 0
+
+
+def test_prefork_stream_output(prefork_server):
+    chunks = []
+    future = prefork_server.run(
+        ["echo first; sleep 0.5; echo second"], shell=True,
+        on_output=chunks.append
+    )
+    time.sleep(0.2)
+    assert chunks == [b"first\n"]
+    assert not future.done()
+    assert future.result(timeout=2).stdout == b"first\nsecond\n"
+
+
+def test_prefork_timeout_kill():
+    """
+    A command ignoring SIGTERM is killed after the grace period
+    """
+    server = PreforkServer(timeout=0.1, kill_grace=0.2)
+    server.start()
+    try:
+        result = server.run(
+            ["trap '' TERM; sleep 5"], shell=True
+        ).result(timeout=2)
+    finally:
+        server.stop()
+    assert result.returncode == -9
+
+
+def test_prefork_stop_kills_running():
+    server = PreforkServer(timeout=10)
+    server.start()
+    started = threading.Event()
+    pids = []
+
+    def on_output(chunk):
+        pids.append(int(chunk))
+        started.set()
+
+    server.run(["echo $$; exec sleep 5"], shell=True, on_output=on_output)
+    assert started.wait(2)
+    start = time.monotonic()
+    server.stop()
+    assert time.monotonic() - start < 2
+    with pytest.raises(ProcessLookupError):
+        os.kill(pids[0], 0)
+
+
+def test_prefork_subprocesswidget_first_line(prefork_server):
+    sw = SubprocessWidget(cmd=["echo Test; sleep 1"], shell=True,
+                          prefork=prefork_server)
+    start = time.monotonic()
+    sw.update()
+    assert sw.content == "Test"
+    assert time.monotonic() - start < 0.5
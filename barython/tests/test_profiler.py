@@ -0,0 +1,87 @@
+import signal
+import threading
+import time
+
+from barython.panel import Panel
+from barython.profiler import SamplingProfiler
+from barython.widgets.base import Widget
+
+
+class BusyWidget(Widget):
+    def update(self):
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            pass
+
+
+def test_profiler_sample_by_owner():
+    w = BusyWidget(uid="busy")
+    t = threading.Thread(target=w.start)
+    t.start()
+    profiler = SamplingProfiler()
+    try:
+        for i in range(5):
+            profiler.sample()
+            time.sleep(0.01)
+    finally:
+        t.join()
+
+    assert profiler.by_owner()["BusyWidget(busy)"] == 5
+    assert any(
+        line.startswith("BusyWidget(busy);") and
+        "test_profiler:update" in line
+        for line in profiler.collapsed().splitlines()
+    )
+
+
+def test_profiler_deep_stack_owner():
+    """
+    The owner is kept for stacks deeper than max_depth, and only the names
+    are truncated
+    """
+    class DeepWidget(BusyWidget):
+        def update(self, depth=20):
+            if depth:
+                return self.update(depth - 1)
+            return super().update()
+
+    w = DeepWidget(uid="deep")
+    t = threading.Thread(target=w.start)
+    t.start()
+    profiler = SamplingProfiler(max_depth=5)
+    try:
+        time.sleep(0.05)
+        profiler.sample()
+    finally:
+        t.join()
+
+    assert profiler.by_owner()["DeepWidget(deep)"] == 1
+    stack = next(s for s in profiler.samples if s.startswith("DeepWidget"))
+    assert len(stack.split(";")) == 6
+
+
+def test_profiler_thread(tmpdir):
+    path = str(tmpdir.join("profile.collapsed"))
+    w = BusyWidget()
+    t = threading.Thread(target=w.update)
+    profiler = SamplingProfiler(interval=0.01, path=path)
+    profiler.start()
+    t.start()
+    t.join()
+    profiler.stop()
+
+    profiler.dump()
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_panel_dump_on_signal(tmpdir, mocker):
+    profiler = SamplingProfiler(path=str(tmpdir.join("profile.collapsed")))
+    mocker.spy(profiler, "dump")
+    p = Panel(keep_unplugged_screens=True, profiler=profiler)
+
+    p._handler_signal(signal.SIGUSR2)
+    assert profiler.dump.call_count == 1
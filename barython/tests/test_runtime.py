@@ -0,0 +1,74 @@
+
+import pytest
+import threading
+import time
+
+from barython.hooks.audio import PulseAudioHook
+from barython.panel import Panel
+from barython.runtime import Runtime
+from barython.screen import Screen
+from barython.widgets.audio import PulseAudioWidget
+from barython.widgets.base import TextWidget
+from barython.widgets.clock import ClockWidget
+from barython.tests.tools import disable_spawn_bar
+
+
+def build_panel(*widgets):
+    disable_spawn_bar(Panel)
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    s.add_widget("l", *widgets)
+    return p
+
+
+def test_runtime_share_sources():
+    top_clock = ClockWidget(date_format="clock", fg="#FFFFFF")
+    bottom_clock = ClockWidget(date_format="clock", fg="#000000")
+    other_clock = ClockWidget(date_format="other")
+    text0, text1 = TextWidget(text="text"), TextWidget(text="text")
+    runtime = Runtime(panels=[
+        build_panel(top_clock, text0),
+        build_panel(bottom_clock, other_clock, text1),
+    ])
+
+    assert runtime.share_sources() == 1
+    assert bottom_clock._leader is top_clock
+    assert other_clock._leader is None
+    assert text1._leader is None
+
+    top_clock.update()
+    assert top_clock.content == "%{F#FFFFFF}clock%{F-}"
+    assert bottom_clock.content == "%{F#000000}clock%{F-}"
+
+    # sharing again does not chain the followers
+    assert runtime.share_sources() == 1
+    assert top_clock._followers == [bottom_clock]
+
+
+def test_runtime_share_hooks():
+    w0, w1 = PulseAudioWidget(), PulseAudioWidget()
+    runtime = Runtime(panels=[build_panel(w0), build_panel(w1)])
+    hooks = runtime.hooks.hooks[PulseAudioHook]
+    assert len(hooks) == 1
+    assert hooks[0].callbacks == {w0.handler, w1.handler}
+
+    runtime.share_sources()
+    assert hooks[0].callbacks == {w0.handler}
+    for p in runtime.panels:
+        assert not p.hooks.listen
+
+
+def test_runtime_start_stop():
+    top_clock = ClockWidget(date_format="clock", refresh=0.1)
+    bottom_clock = ClockWidget(date_format="clock", refresh=0.1)
+    runtime = Runtime(panels=[
+        build_panel(top_clock), build_panel(bottom_clock)
+    ])
+    try:
+        threading.Thread(target=runtime.start).start()
+        time.sleep(0.2)
+        assert bottom_clock.content == "clock"
+        assert all(p.gather() == "%{l}clock" for p in runtime.panels)
+    finally:
+        runtime.stop()
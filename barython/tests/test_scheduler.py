@@ -0,0 +1,121 @@
+import threading
+import time
+
+from barython.scheduler import (
+    RateLimiter, Scheduler, debounce, latest_wins, leading_edge, max_rate,
+    trailing_edge
+)
+from barython.widgets.base import Widget
+
+
+def test_scheduler_call_later(mocker):
+    stub = mocker.stub()
+    s = Scheduler()
+    s.call_later(0.05, stub, 1, a=2)
+    s.call_later(0.01, stub, 0)
+    time.sleep(0.1)
+    assert stub.call_args_list == [mocker.call(0), mocker.call(1, a=2)]
+
+
+def test_scheduler_cancel(mocker):
+    stub = mocker.stub()
+    call = Scheduler().call_later(0.02, stub)
+    call.cancel()
+    time.sleep(0.05)
+    assert stub.call_count == 0
+
+
+def test_rate_limiter_leading_and_trailing(mocker):
+    stub = mocker.stub()
+    r = RateLimiter(max_rate(10))
+    for i in range(5):
+        r.submit(stub, i)
+
+    # first call immediately, the others wait
+    stub.assert_called_once_with(0)
+    time.sleep(0.15)
+    # only the latest one is run after the wait
+    assert stub.call_args_list == [mocker.call(0), mocker.call(4)]
+    assert r.executed == 2
+    assert r.suppressed == 3
+
+
+def test_rate_limiter_leading_edge(mocker):
+    stub = mocker.stub()
+    r = RateLimiter(leading_edge(0.05))
+    for i in range(3):
+        r.submit(stub, i)
+    time.sleep(0.1)
+    stub.assert_called_once_with(0)
+    assert r.suppressed == 2
+
+
+def test_rate_limiter_trailing_edge(mocker):
+    stub = mocker.stub()
+    r = RateLimiter(trailing_edge(0.05))
+    for i in range(3):
+        r.submit(stub, i)
+    assert stub.call_count == 0
+    time.sleep(0.1)
+    stub.assert_called_once_with(2)
+
+
+def test_rate_limiter_debounce(mocker):
+    stub = mocker.stub()
+    r = RateLimiter(debounce(0.05))
+    for i in range(4):
+        r.submit(stub, i)
+        time.sleep(0.02)
+    assert stub.call_count == 0
+    time.sleep(0.1)
+    stub.assert_called_once_with(3)
+
+
+def test_rate_limiter_latest_wins(mocker):
+    calls = []
+    started = threading.Event()
+
+    def slow(i):
+        calls.append(i)
+        started.set()
+        time.sleep(0.05)
+
+    r = RateLimiter(latest_wins())
+    threading.Thread(target=r.submit, args=(slow, 0)).start()
+    started.wait()
+    for i in range(1, 4):
+        r.submit(slow, i)
+    time.sleep(0.15)
+    assert calls == [0, 3]
+
+
+def test_rate_limiter_default_wait(mocker):
+    stub = mocker.stub()
+    r = RateLimiter(default_wait=lambda: 0.05)
+    r.submit(stub, 0)
+    r.submit(stub, 1)
+    time.sleep(0.02)
+    assert stub.call_count == 1
+    time.sleep(0.06)
+    assert stub.call_count == 2
+
+
+def test_widget_handler_policy(mocker):
+    w = Widget(refresh=0.05)
+    mocker.spy(w, "update")
+    for i in range(5):
+        w.handler()
+    assert w.update.call_count == 1
+    time.sleep(0.1)
+    assert w.update.call_count == 2
+    assert w._rate_limiter.suppressed == 3
+
+
+def test_widget_stop_cancels_pending(mocker):
+    w = Widget(refresh=0.05)
+    mocker.spy(w, "update")
+    w.handler()
+    w.handler()
+    w.stop()
+    time.sleep(0.1)
+    assert w.update.call_count == 1
@@ -2,7 +2,7 @@
 import pytest
 
 from barython.panel import Panel
-from barython.screen import Screen
+from barython.screen import Screen, StaticGeometry
 from barython.widgets.base import Widget, TextWidget
 import barython.screen
 
@@ -28,6 +28,21 @@ def test_screen_refresh():
     assert s.refresh == 2
 
 
+def test_screen_inherit_panel_changes():
+    """
+    Test that inherited attributes follow the changes of the panel
+    """
+    p = Panel(keep_unplugged_screens=True, fg="#FFFFFF")
+    s = Screen(panel=p)
+    assert s.fg == "#FFFFFF" and s.height == p.height
+
+    p.fg = "#000000"
+    assert s.fg == "#000000"
+
+    s.fg = "#111111"
+    assert s.fg == "#111111"
+
+
 def test_screen_add_widget():
     """
     Test to add a widget in different alignments
@@ -90,6 +105,15 @@ def test_screen_geometry(monkeypatch):
     assert s.geometry == (1920, 20, 50, 60)
 
 
+def test_screen_static_geometry():
+    p = Panel(geometry_provider=StaticGeometry({
+        "DVI-I-0": (1920, 1080, 50, 60)
+    }))
+    s = Screen(name="DVI-I-0", height=20)
+    p.add_screen(s)
+    assert s.geometry == (1920, 20, 50, 60)
+
+
 def test_screen_gather():
     p = Panel(keep_unplugged_screens=True)
     s = Screen()
@@ -120,3 +144,43 @@ def test_screen_gather_multiple_widgets():
 
     content = s.gather()
     assert content == "%{l}testtest1%{c}testtest1%{r}testtest1"
+
+
+def test_screen_content_versions():
+    p = Panel(keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    w = TextWidget(text="test")
+    s.add_widget("l", w)
+    versions = s.content_versions()
+
+    w.update()
+    assert s.content_versions() != versions
+    versions = s.content_versions()
+
+    # same content, same version
+    w.update()
+    assert s.content_versions() == versions
+
+    s.add_widget("r", TextWidget(text="test1"))
+    assert s.content_versions() != versions
+
+
+def test_screen_draw_only_on_change(mocker):
+    s = Screen()
+    s._stop.clear()
+    s._bar = mocker.Mock()
+    mocker.spy(s, "render")
+    mocker.spy(s, "_write_in_bar")
+    w = Widget()
+    s.add_widget("l", w)
+    w._publish("test")
+
+    s.draw()
+    s.draw()
+    assert s.render.call_count == 1
+    s._write_in_bar.assert_called_once_with(b"%{l}test\n")
+
+    w._publish("test1")
+    s.draw()
+    assert s.render.call_count == 2
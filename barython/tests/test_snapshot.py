@@ -0,0 +1,161 @@
+import json
+import pytest
+import threading
+import time
+
+from barython.panel import Panel
+from barython.scheduler import scheduler
+from barython.screen import Screen
+from barython.snapshot import ContentSnapshot
+from barython.widgets.base import TextWidget, Widget
+from barython.tests.tools import disable_spawn_bar
+
+
+def test_snapshot_save_restore(tmpdir):
+    path = str(tmpdir.join("snapshot.json"))
+    w0, w1 = TextWidget(text="test", uid="w0"), TextWidget(uid="w1")
+    w0.update()
+
+    assert ContentSnapshot(path=path).save((w0, w1))
+
+    restored_w0, restored_w1 = Widget(uid="w0"), Widget(uid="w1")
+    assert ContentSnapshot(path=path).restore((restored_w0, restored_w1)) == 1
+    assert restored_w0.content == "test"
+    assert restored_w1.content is None
+
+
+def test_snapshot_restore_keeps_existing_content(tmpdir):
+    path = str(tmpdir.join("snapshot.json"))
+    w = TextWidget(text="old", uid="w")
+    w.update()
+    ContentSnapshot(path=path).save((w, ))
+
+    w.text = "new"
+    w.update()
+    assert ContentSnapshot(path=path).restore((w, )) == 0
+    assert w.content == "new"
+
+
+def test_snapshot_ttl(tmpdir):
+    path = tmpdir.join("snapshot.json")
+    path.write(json.dumps({"time": time.time() - 20, "widgets": {"w": "a"}}))
+
+    assert ContentSnapshot(path=str(path), ttl=10).load() == {}
+    assert ContentSnapshot(path=str(path), ttl=30).load() == {"w": "a"}
+
+
+def test_snapshot_missing_file(tmpdir):
+    snapshot = ContentSnapshot(path=str(tmpdir.join("missing.json")))
+    assert snapshot.load() == {}
+
+
+def test_snapshot_save_throttled(tmpdir):
+    path = str(tmpdir.join("snapshot.json"))
+    w = TextWidget(text="test", uid="w")
+    w.update()
+    snapshot = ContentSnapshot(path=path, min_interval=60)
+
+    assert snapshot.save((w, ))
+    assert not snapshot.save((w, ))
+    assert snapshot.save((w, ), force=True)
+
+
+def test_snapshot_default_uid():
+    s = Screen("DVI-I-0")
+    w0, w1 = Widget(), Widget(uid="custom")
+    s.add_widget("l", w0, w1)
+
+    assert w0.uid == "DVI-I-0/l0/Widget"
+    assert w1.uid == "custom"
+
+
+def test_snapshot_default_uid_insert():
+    s = Screen("DVI-I-0")
+    w0, w1 = Widget(), Widget()
+    s.add_widget("l", w0)
+    s.add_widget("l", w1, index=0)
+
+    assert w0.uid == "DVI-I-0/l0/Widget"
+    assert w1.uid == "DVI-I-0/l0/Widget~1"
+
+
+def test_snapshot_panel_uids():
+    p = Panel()
+    s0, s1 = Screen(), Screen()
+    w0, w1 = Widget(), Widget()
+    s0.add_widget("l", w0)
+    s1.add_widget("l", w1)
+    p.add_screen(s0, s1)
+    p.check_uids()
+    assert w0.uid != w1.uid
+
+    s1.add_widget("l", Widget(uid="custom"), Widget(uid="custom"))
+    with pytest.raises(ValueError):
+        p.check_uids()
+
+
+def test_snapshot_panel_default_path(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmpdir))
+    disable_spawn_bar(Panel)
+    panels = [
+        Panel(instance_per_screen=False, keep_unplugged_screens=True,
+              snapshot=True) for _ in range(2)
+    ]
+    for p in panels:
+        s = Screen("DVI-I-0")
+        s.add_widget("l", TextWidget(text="test"))
+        p.add_screen(s)
+        threading.Thread(target=p.start).start()
+    time.sleep(0.1)
+    for p in panels:
+        p.stop()
+
+    paths = [p.snapshot.path for p in panels]
+    assert paths[0] != paths[1]
+    assert all(p.uid in path for p, path in zip(panels, paths))
+
+
+def test_snapshot_panel_restore(tmpdir):
+    path = str(tmpdir.join("snapshot.json"))
+    snapshot = ContentSnapshot(path=path)
+    cached_w = TextWidget(text="cached", uid="w")
+    cached_w.update()
+    snapshot.save((cached_w, ), force=True)
+
+    disable_spawn_bar(Panel)
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True,
+              snapshot=snapshot)
+    s = Screen()
+    w = Widget(uid="w")
+    s.add_widget("l", w)
+    p.add_screen(s)
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert w.content == "cached"
+    finally:
+        p.stop()
+
+
+def test_snapshot_saved_out_of_draw(tmpdir, mocker):
+    disable_spawn_bar(Panel)
+    snapshot = ContentSnapshot(path=str(tmpdir.join("snapshot.json")))
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True,
+              snapshot=snapshot)
+    s = Screen()
+    w = TextWidget(text="test", uid="w")
+    s.add_widget("l", w)
+    p.add_screen(s)
+    saved = threading.Event()
+    save_threads = []
+
+    def save(*args, **kwargs):
+        save_threads.append(threading.current_thread())
+        saved.set()
+    mocker.patch.object(snapshot, "save", side_effect=save)
+
+    p._stop.clear()
+    w.update()
+    p.draw()
+    assert saved.wait(1)
+    assert save_threads == [scheduler._running_thread]
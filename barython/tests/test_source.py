@@ -0,0 +1,64 @@
+
+import pytest
+from collections import namedtuple
+
+from barython.source import freeze, FrozenDict, Source, View
+
+
+def test_source_emit_only_changes(mocker):
+    source = Source()
+    callback = mocker.stub()
+    source.subscribe(callback)
+
+    assert source.emit(("a", ))
+    assert not source.emit(("a", ))
+    assert source.emit(("b", ))
+    assert source.version == 2
+    assert callback.call_args_list == [mocker.call(("a", )),
+                                       mocker.call(("b", ))]
+
+    source.unsubscribe(callback)
+    source.emit(("c", ))
+    assert callback.call_count == 2
+
+
+def test_view_memoized(mocker):
+    func = mocker.Mock(side_effect=lambda v: "<{}>".format(v))
+    view = View(func, maxsize=2)
+
+    assert view.render("a", config="red") == "<a>"
+    assert view.render("a", config="red") == "<a>"
+    assert func.call_count == 1 and view.hits == 1
+
+    # another config is another rendering
+    view.render("a", config="blue")
+    assert func.call_count == 2
+
+    # the least recently used rendering is dropped
+    view.render("b", config="red")
+    view.render("a", config="red")
+    assert func.call_count == 4
+
+
+def test_view_unhashable_value(mocker):
+    func = mocker.Mock(return_value="markup")
+    view = View(func)
+    view.render(["a"])
+    view.render(["a"])
+    assert func.call_count == 2
+
+
+def test_freeze():
+    Point = namedtuple("Point", ("x", "y"))
+    frozen = freeze({"b": [1, {"c": 2}], "a": Point([1], 2)})
+    assert frozen == {"b": (1, {"c": 2}), "a": Point((1, ), 2)}
+    assert isinstance(frozen["a"], Point)
+    hash(frozen)
+
+    with pytest.raises(TypeError):
+        frozen["b"] = 1
+
+
+def test_frozen_dict_ordered():
+    assert FrozenDict([("a", 1), ("b", 2)]) != FrozenDict([("b", 2), ("a", 1)])
+    assert FrozenDict([("a", 1)]) == {"a": 1}
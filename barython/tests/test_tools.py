@@ -1,9 +1,13 @@
 
 import logging
+import os
+import pytest
+import stat
 import subprocess
+import tempfile
 
 import barython.tools
-from barython.tools import lemonbar, splitted_sleep
+from barython.tools import lemonbar, runtime_dir, splitted_sleep
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -31,8 +35,36 @@ def test_lemonbar(monkeypatch):
     assert launched_cmd == expected_cmd
 
 
+def test_lemonbar_without_shell_actions(mocker):
+    mocker.patch("barython.tools.subprocess.Popen")
+    lemonbar("lemonbar", shell_actions=False)
+    assert barython.tools.subprocess.Popen.call_count == 1
+
+    lemonbar("lemonbar")
+    assert barython.tools.subprocess.Popen.call_count == 3
+
+
 def test_splitted_sleep(mocker):
     mocker.patch("barython.tools.time.sleep")
     mocker.spy(barython.tools.time, "sleep")
     splitted_sleep(2, 0.5)
     assert barython.tools.time.sleep.call_count == 4
+
+
+def test_runtime_dir_private(tmpdir, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tmpdir))
+    path = runtime_dir()
+    assert path == str(tmpdir.join("barython-{}".format(os.getuid())))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert runtime_dir() == path
+
+    # a directory accessible by others is refused
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        runtime_dir()
+
+
+def test_runtime_dir_xdg(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmpdir))
+    assert runtime_dir() == str(tmpdir.join("barython"))
@@ -0,0 +1,47 @@
+
+import pytest
+
+from barython.widgets.audio import PulseAudioWidget
+from barython.widgets.base import OutputValue
+
+
+@pytest.fixture
+def audio_widget():
+    return PulseAudioWidget(icon={
+        "volume": [(50, "high"), (0, "low")], "ouput_mute": "mute"
+    })
+
+
+def test_audio_organize_result(audio_widget):
+    w = audio_widget
+    assert w.organize_result("0 false") == "low 0"
+    assert w.organize_result("50 false") == "low 50"
+    assert w.organize_result("51 false") == "high 51"
+    assert w.organize_result("51 true") == "mute"
+
+
+def test_audio_icon_from_last_value(audio_widget):
+    w = audio_widget
+    assert w.icon == "low"
+    w.source.emit(OutputValue("80 false"))
+    assert w.icon == "high"
+    assert (w._volume, w._output_mute) == (80, False)
+
+
+def test_audio_follower_reads_leader_value(audio_widget):
+    leader, follower = audio_widget, PulseAudioWidget(icon=audio_widget._icon)
+    follower.follow(leader)
+    leader.source.emit(OutputValue("80 false"))
+    assert (follower._volume, follower.icon) == (80, "high")
+
+
+def test_audio_icon_compiled_once(audio_widget, mocker):
+    w = audio_widget
+    mocker.spy(w, "compile_icon")
+    w.organize_result("20 false")
+    w.organize_result("80 false")
+    assert w.compile_icon.call_count == 1
+
+    w.icon = "static"
+    assert w.organize_result("80 false") == "static 80"
+    assert w.compile_icon.call_count == 2
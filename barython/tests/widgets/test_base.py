@@ -4,9 +4,12 @@ import threading
 import time
 import timeit
 
+import barython.widgets.base
 from barython.screen import Screen
 from barython.panel import Panel
-from barython.widgets.base import SubprocessWidget, TextWidget, Widget
+from barython.widgets.base import (
+    IconMap, SubprocessWidget, TextWidget, Widget
+)
 from barython.tests.tools import disable_spawn_bar
 
 
@@ -47,15 +50,31 @@ def test_base_widget_decorate():
     decorated_text = w.decorate(
         text, fg=fg, bg=bg, font=font, padding=padding, actions=actions
     )
+    # the tags of the padding are merged with the ones of the text
     expected_result = (
         "%{{A1:firefox&:}}%{{A3:urxvt&:}}"
-        "%{{B{}}}%{{F{}}}%{{T{}}}  %{{T-}}%{{F-}}%{{B-}}"
-        "%{{B{}}}%{{F{}}}%{{T{}}}{}%{{T-}}%{{F-}}%{{B-}}"
-        "%{{B{}}}%{{F{}}}%{{T{}}}  %{{T-}}%{{F-}}%{{B-}}%{{A}}%{{A}}"
-    ).format(bg, fg, font, bg, fg, font, text, bg, fg, font)
+        "%{{B{}}}%{{F{}}}%{{T{}}}  {}  %{{A}}%{{A}}%{{T-}}%{{F-}}%{{B-}}"
+    ).format(bg, fg, font, text)
     assert decorated_text == expected_result
 
 
+def test_base_widget_decorate_reset_in_text():
+    """
+    Test that the padding gets its colors back if the text resets them
+    """
+    w = Widget()
+    assert w.decorate("%{F-}test", fg="#FFFF11", padding=1) == (
+        "%{F#FFFF11} %{F-}test%{F#FFFF11} %{F-}"
+    )
+
+
+def test_base_widget_decorate_escape_actions():
+    w = Widget()
+    assert w.decorate("test", actions={1: "notify-send a:b"}) == (
+        "%{A1:notify-send a\\:b:}test%{A}"
+    )
+
+
 def test_base_widget_decorate_self_attributes_empty():
     """
     Test decorate_with_self_attributes without any parameter
@@ -136,3 +155,158 @@ def test_base_subprocesswidget_start():
     time.sleep(0.7)
     sw.stop()
     assert sw.content == "Test"
+
+
+def test_base_widget_publish():
+    w = Widget()
+    record = w._record
+    w._publish("tést")
+
+    assert record.text is None
+    assert w._record.text == w.content == "tést"
+    assert w._record.data == "tést".encode()
+    assert w._record.version == record.version + 1
+
+
+def test_base_widget_publish_concurrent():
+    """
+    Contents published from several threads never share a version
+    """
+    w = Widget()
+    threads = [
+        threading.Thread(
+            target=lambda i=i: [w._publish(str(i)) for _ in range(1000)]
+        ) for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert w._record.version == 4000
+
+
+def test_base_widget_poll_interval():
+    w = Widget(refresh=1)
+    assert w.poll_interval(changed=False) == 1
+
+    w.set_interval_hint("locked", 3)
+    assert w.poll_interval(changed=False) == 3
+    w.clear_interval_hint("locked")
+    assert w.poll_interval(changed=False) == 1
+
+
+def test_base_widget_adaptive_poll_interval():
+    w = Widget(refresh=1, adaptive=True, max_refresh=5)
+    intervals = [w.poll_interval(changed=False) for i in range(4)]
+    assert intervals == [2, 4, 5, 5]
+    # snaps back after a change
+    assert w.poll_interval(changed=True) == 1
+    assert w.poll_interval(changed=False) == 2
+
+
+def test_base_widget_adaptive_continuous_update(mocker):
+    w = TextWidget(text="test", refresh=1, adaptive=True)
+    w.infinite = True
+    mocker.patch("barython.widgets.base.splitted_sleep")
+    mocker.spy(w, "poll_interval")
+
+    def stop_after(*args, **kwargs):
+        if w.poll_interval.call_count >= 3:
+            w.stop()
+    barython.widgets.base.splitted_sleep.side_effect = stop_after
+    w.continuous_update()
+
+    assert [c[0][0] for c in w.poll_interval.call_args_list] == [
+        True, False, False
+    ]
+
+
+def test_base_widget_optimistic_update(mocker):
+    w = Widget(prediction_timeout=10)
+    w._publish("before")
+    mocker.patch.object(
+        w, "predict", side_effect=lambda a: "after" if a == "click" else None
+    )
+
+    assert not w.optimistic_update("other")
+    assert w.optimistic_update("click")
+    assert w.content == "after"
+
+    # the real update replaces the prediction
+    w._update_screens("real")
+    assert w.content == "real"
+    assert w._prediction is None
+
+
+def test_base_widget_optimistic_update_rollback(mocker):
+    w = Widget(prediction_timeout=0.05)
+    w._publish("before")
+    mocker.patch.object(w, "predict", return_value="after")
+
+    assert w.optimistic_update("click")
+    assert w.content == "after"
+    time.sleep(0.2)
+    assert w.content == "before"
+
+
+def test_base_widget_emit():
+    w = Widget()
+    w.organize_result = lambda text: "<{}>".format(text)
+
+    assert w.emit(("test", ))
+    assert w.content == "<test>"
+    assert not w.emit(("test", ))
+    assert w.view.misses == 1
+
+    # a change of the view attributes renders the value again
+    w.fg = "#FFFFFF"
+    w.emit(("test", ))
+    assert w.content == "%{F#FFFFFF}<test>%{F-}"
+
+
+def test_base_widget_emit_memoized():
+    w = TextWidget(text="a")
+    for text in ("a", "b", "a"):
+        w.text = text
+        w.update()
+    assert w.content == "a"
+    assert (w.view.hits, w.view.misses) == (1, 2)
+
+
+def test_base_widget_organize_result_override():
+    """
+    Widgets overriding organize_result keep working with values
+    """
+    class UpperTextWidget(TextWidget):
+        def organize_result(self, text, *args, **kwargs):
+            return text.upper()
+
+    w = UpperTextWidget(text="test")
+    w.update()
+    assert w.content == "TEST"
+
+
+def test_base_widget_follow():
+    leader, follower = TextWidget(text="test"), TextWidget(fg="#FFFFFF")
+    leader.update()
+    follower.follow(leader)
+    assert follower.content == "%{F#FFFFFF}test%{F-}"
+
+    leader.text = "test1"
+    leader.update()
+    assert follower.content == "%{F#FFFFFF}test1%{F-}"
+
+    follower.follow(None)
+    leader.text = "test2"
+    leader.update()
+    assert follower.content == "%{F#FFFFFF}test1%{F-}"
+
+
+def test_icon_map():
+    icons = IconMap(states={"mute": "M"}, thresholds=[(50, "H"), (0, "L")],
+                    default="D")
+    assert icons.lookup(state="mute", value=80) == "M"
+    assert icons.lookup(value=50) == "L"
+    assert icons.lookup(value=51) == "H"
+    assert icons.lookup(state="other") == "D"
@@ -123,3 +123,16 @@ def test_battery_widget_update(one_battery_dir):
     bw.update()
 
     assert bw._content == organized_result
+
+
+def test_battery_widget_on_ac_hint(multiple_batteries_dir):
+    bw = BatteryWidget(refresh=10, ac_refresh_factor=3)
+    bw.update()
+    # BAT0 is discharging
+    assert bw.poll_interval() == 10
+
+    bw.read_battery_infos = lambda b: {
+        "capacity": 50, "remains": 0, "status": "Charging"
+    }
+    bw.update()
+    assert bw.poll_interval() == 30
@@ -0,0 +1,47 @@
+
+import pytest
+
+from barython.source import freeze
+from barython.widgets.mpd import MPDValue, MPDWidget
+
+
+def test_mpd_predict():
+    w = MPDWidget(icon={"play": "P", "pause": "S"})
+    assert w.predict("mpc toggle") is None
+
+    w.source.emit(MPDValue(
+        "play", freeze({"artist": "artist", "title": "title"}), True
+    ))
+    assert w.predict("mpc toggle") == "S artist - title"
+    assert w.predict("mpc play") == "P artist - title"
+    assert w.predict("mpc volume +5") is None
+
+
+def test_mpd_icons_without_io(mocker):
+    w = MPDWidget(icon={"play": "P", "global": "G"})
+    w._mpdclient = mocker.Mock()
+
+    assert w.icon == "G"
+    assert w.organize_result(running=False) == "G"
+    w.source.emit(MPDValue("play", None, True))
+    assert w.icon == "P" and w.status == "play"
+    assert not w._mpdclient.method_calls
+
+
+def test_mpd_escape_current():
+    w = MPDWidget(icon={"play": "P"})
+    w.source.emit(MPDValue(
+        "play", freeze({"artist": "artist", "title": "100%{F-}"}), True
+    ))
+    assert w.content == "P artist - 100%%{F-}"
+
+
+def test_mpd_follower_reads_leader_value():
+    leader = MPDWidget(icon={"play": "P", "pause": "S"})
+    follower = MPDWidget(icon={"play": "P", "pause": "S"})
+    follower.follow(leader)
+    leader.source.emit(MPDValue(
+        "play", freeze({"artist": "artist", "title": "title"}), True
+    ))
+    assert follower.status == "play"
+    assert follower.predict("mpc toggle") == "S artist - title"
@@ -2,8 +2,12 @@
 from collections import OrderedDict
 import pytest
 
+from barython.panel import Panel
 from barython.screen import Screen
-from barython.widgets.bspwm import BspwmDesktopWidget, BspwmDesktopPoolWidget
+from barython.source import freeze
+from barython.widgets.bspwm import (
+    BspwmDesktopWidget, BspwmDesktopPoolWidget, DesktopsValue
+)
 
 
 @pytest.fixture
@@ -50,10 +54,7 @@ def test_bspwm_desktop_widget_parse_desktop(basic_bspwm_desktop_widget):
     bspwm = basic_bspwm_desktop_widget
     template_result = (
         "%{{A1:bspc desktop -f \"q\":}}"
-        "%{{B{}}}%{{F{}}} %{{F-}}%{{B-}}"
-        "%{{B{}}}%{{F{}}}q%{{F-}}%{{B-}}"
-        "%{{B{}}}%{{F{}}} %{{F-}}%{{B-}}"
-        "%{{A}}"
+        "%{{B{}}}%{{F{}}} q %{{A}}%{{F-}}%{{B-}}"
     )
 
     assoc_colors_prefix = {
@@ -66,7 +67,7 @@ def test_bspwm_desktop_widget_parse_desktop(basic_bspwm_desktop_widget):
     }
 
     for p, (fg, bg) in assoc_colors_prefix.items():
-        expected = template_result.format(*((fg, bg) * 3))
+        expected = template_result.format(fg, bg)
         assert expected == "".join(bspwm._parse_desktop(p + "q", "_"))
 
 
@@ -90,72 +91,31 @@ def test_bspwm_desktop_widget_organize_result(basic_bspwm_desktop_widget):
         ('DVI-I-0', {'desktops': ['Od'], 'layout': 'T', 'focused': False})
     ])
 
+    # colors shared by adjacent desktops are merged
     expected = (
         "%{A1:bspc monitor -f \"HDMI-0\":}"
-        "%{B#FFFFFF07}%{F#FF000007} %{F-}%{B-}"
-        "%{B#FFFFFF07}%{F#FF000007}HDMI-0%{F-}%{B-}"
-        "%{B#FFFFFF07}%{F#FF000007} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF07}%{F#FF000007} HDMI-0 %{A}"
         "%{A1:bspc desktop -f \"f\":}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004}f%{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF04}%{F#FF000004} f %{A}"
         "%{A1:bspc monitor -f \"DVI-D-0\":}"
-        "%{B#FFFFFF03}%{F#FF000003} %{F-}%{B-}"
-        "%{B#FFFFFF03}%{F#FF000003}DVI-D-0%{F-}%{B-}"
-        "%{B#FFFFFF03}%{F#FF000003} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF03}%{F#FF000003} DVI-D-0 %{A}"
         "%{A1:bspc desktop -f \"o\":}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001}o%{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{A}"
-        "%{A1:bspc desktop -f \"7\":}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001}7%{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{A}"
-        "%{A1:bspc desktop -f \"Desktop2\":}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001}Desktop2%{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF01}%{F#FF000001} o %{A}"
+        "%{A1:bspc desktop -f \"7\":} 7 %{A}"
+        "%{A1:bspc desktop -f \"Desktop2\":} Desktop2 %{A}"
         "%{A1:bspc desktop -f \"s\":}"
-        "%{B#FFFFFF00}%{F#FF000000} %{F-}%{B-}"
-        "%{B#FFFFFF00}%{F#FF000000}s%{F-}%{B-}"
-        "%{B#FFFFFF00}%{F#FF000000} %{F-}%{B-}"
-        "%{A}"
-        "%{A1:bspc desktop -f \"q\":}"
-        "%{B#FFFFFF00}%{F#FF000000} %{F-}%{B-}"
-        "%{B#FFFFFF00}%{F#FF000000}q%{F-}%{B-}"
-        "%{B#FFFFFF00}%{F#FF000000} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF00}%{F#FF000000} s %{A}"
+        "%{A1:bspc desktop -f \"q\":} q %{A}"
         "%{A1:bspc desktop -f \"p\":}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001}p%{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{A}"
-        "%{A1:bspc desktop -f \"i\":}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001}i%{F-}%{B-}"
-        "%{B#FFFFFF01}%{F#FF000001} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF01}%{F#FF000001} p %{A}"
+        "%{A1:bspc desktop -f \"i\":} i %{A}"
         "%{A1:bspc desktop -f \"u\":}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004}u%{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF04}%{F#FF000004} u %{A}"
         "%{A1:bspc monitor -f \"DVI-I-0\":}"
-        "%{B#FFFFFF03}%{F#FF000003} %{F-}%{B-}"
-        "%{B#FFFFFF03}%{F#FF000003}DVI-I-0%{F-}%{B-}"
-        "%{B#FFFFFF03}%{F#FF000003} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF03}%{F#FF000003} DVI-I-0 %{A}"
         "%{A1:bspc desktop -f \"d\":}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004}d%{F-}%{B-}"
-        "%{B#FFFFFF04}%{F#FF000004} %{F-}%{B-}"
-        "%{A}"
+        "%{B#FFFFFF04}%{F#FF000004} d %{A}"
+        "%{F-}%{B-}"
     )
 
     assert expected == "".join(bspwm.organize_result(monitors))
@@ -191,3 +151,77 @@ def test_bspwm_desktop_pool_widget_actions_desktop_same_screen(
 
     expected = {1: "bspc desktop -f \"q\""}
     assert expected == bspwm._actions_desktop("q", "HDMI-0")
+
+
+def test_bspwm_desktop_widget_predict_focus(basic_bspwm_desktop_widget):
+    bspwm = basic_bspwm_desktop_widget
+    bspwm._monitors = OrderedDict([
+        ("HDMI-0", {"desktops": ["Of", "fo"], "focused": True}),
+        ("DVI-D-0", {"desktops": ["Os"], "focused": False}),
+    ])
+    # the other monitor keeps its active desktop
+    expected = OrderedDict([
+        ("HDMI-0", {"desktops": ["Of", "fo"], "focused": False}),
+        ("DVI-D-0", {"desktops": ["Os"], "focused": True}),
+    ])
+    assert bspwm._predict_focus(bspwm._monitors, "s") == expected
+    assert bspwm.predict("bspc desktop -f \"s\"") == (
+        bspwm.decorate_with_self_attributes(bspwm.organize_result(expected))
+    )
+    assert bspwm.predict("bspc desktop -f \"unknown\"") is None
+    assert bspwm.predict("urxvt") is None
+
+
+def test_bspwm_desktop_widget_predict_swap(basic_bspwm_desktop_pool_widget):
+    bspwm = basic_bspwm_desktop_pool_widget
+    monitors = OrderedDict([
+        ("HDMI-0", {"desktops": ["Od", "fo"], "focused": True}),
+        ("DVI-D-0", {"desktops": ["Fq"], "focused": False}),
+    ])
+    expected = OrderedDict([
+        ("HDMI-0", {"desktops": ["Fq", "fo"], "focused": True}),
+        ("DVI-D-0", {"desktops": ["Od"], "focused": False}),
+    ])
+    assert bspwm._predict_swap(monitors, "q", "d") == expected
+
+
+def test_bspwm_desktop_pool_widget_predict_keeps_focused(
+        basic_bspwm_desktop_pool_widget):
+    """
+    Rendering a prediction does not change the focused desktops
+    """
+    bspwm = basic_bspwm_desktop_pool_widget
+    bspwm._monitors = OrderedDict([
+        ("HDMI-0", {"desktops": ["Od", "fo"], "focused": True}),
+        ("DVI-D-0", {"desktops": ["Fq"], "focused": False}),
+    ])
+    bspwm._focused = {"HDMI-0": "d", "DVI-D-0": "q"}
+
+    assert bspwm.optimistic_update("bspc desktop \"q\" -s \"d\"")
+    assert bspwm._focused == {"HDMI-0": "d", "DVI-D-0": "q"}
+    bspwm._rollback()
+    assert bspwm._focused == {"HDMI-0": "d", "DVI-D-0": "q"}
+
+
+def test_bspwm_desktop_pool_widget_view_screens(
+        basic_bspwm_desktop_pool_widget):
+    """
+    Attaching the widget to a screen renders the value again
+    """
+    bspwm = basic_bspwm_desktop_pool_widget
+    monitors = OrderedDict([
+        ("HDMI-0", {"desktops": ["Od"], "focused": True}),
+        ("DVI-D-0", {"desktops": ["Fq"], "focused": False}),
+    ])
+    bspwm._focused = {"HDMI-0": "d", "DVI-D-0": "q"}
+    bspwm.emit(DesktopsValue(freeze(monitors)))
+    not_attached = bspwm.content
+
+    s = Screen("HDMI-0")
+    Panel(keep_unplugged_screens=True).add_screen(s)
+    s.add_widget("l", bspwm)
+    bspwm.emit(DesktopsValue(freeze(monitors)))
+    assert bspwm.content != not_attached
+    assert bspwm.content == bspwm.render_value(
+        DesktopsValue(freeze(monitors))
+    )
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 
 import logging
+import os
+import stat
 import subprocess
+import tempfile
 import time
 
+from barython.metrics import registry
+
 
 logging.getLogger("barython")
 
 
 def lemonbar(bar_cmd="lemonbar", geometry=None, fonts=None, fg=None, bg=None,
-             clickable=None, others=None):
+             clickable=None, others=None, shell_actions=True):
     """
     Spawn a subprocess of lemonbar
 
@@ -20,6 +25,10 @@ def lemonbar(bar_cmd="lemonbar", geometry=None, fonts=None, fg=None, bg=None,
     :param bg: background value
     :param clickable: number of clickable areas
     :param others: list of additional options to join to the command
+    :param shell_actions: pipe the lemonbar output in a shell, to run the
+                          actions. The shell is stored in bar.actions_shell.
+                          If False, the actions are left to be read on
+                          bar.stdout.
     """
     cmd = [bar_cmd, ]
     if geometry and isinstance(geometry, str):
@@ -42,12 +51,48 @@ def lemonbar(bar_cmd="lemonbar", geometry=None, fonts=None, fg=None, bg=None,
     if others:
         cmd.extend(others)
     logging.debug("Launch {}".format(cmd))
+    if registry.enabled:
+        registry.counter("subprocess_spawns").inc()
     bar = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    if shell_actions:
+        try:
+            bar.actions_shell = subprocess.Popen(
+                "bash", stdin=bar.stdout, stdout=subprocess.PIPE
+            )
+        except AttributeError:
+            pass
+    return bar
+
+
+def runtime_dir():
+    """
+    Return the directory of the barython runtime files, only accessible by
+    the user
+
+    The directory is barython in $XDG_RUNTIME_DIR, or barython-<uid> in the
+    temporary directory if unset. It is created if needed.
+
+    :raise PermissionError: if the directory is not private to the user,
+                            for example created by someone else
+    """
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        path = os.path.join(os.environ["XDG_RUNTIME_DIR"], "barython")
+    else:
+        path = os.path.join(
+            tempfile.gettempdir(), "barython-{}".format(os.getuid())
+        )
     try:
-        subprocess.Popen("bash", stdin=bar.stdout, stdout=subprocess.PIPE)
-    except AttributeError:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
         pass
-    return bar
+    # lstat, to not follow a symlink planted by someone else
+    st = os.lstat(path)
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or
+            st.st_mode & 0o077):
+        raise PermissionError(
+            "Runtime directory {} is not private to the user".format(path)
+        )
+    return path
 
 
 def splitted_sleep(time_sleep, interval=0.5, stop=None,
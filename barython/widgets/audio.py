@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 
-from bisect import bisect_left
 import logging
 
-from .base import SubprocessWidget, protect_handler
-from barython.tools import splitted_sleep
+from .base import IconMap, SubprocessWidget
+from barython.log import lazy
 from barython.hooks.audio import PulseAudioHook
 
 
@@ -18,23 +17,55 @@ class PulseAudioWidget(SubprocessWidget):
     Requires pamixer to work
     """
     _icon = None
-    _volume = 0
     _input_mute = False
-    _output_mute = False
+
+    @property
+    def _volume(self):
+        return self._parse_output()[0]
+
+    @property
+    def _output_mute(self):
+        return self._parse_output()[1]
+
+    def _parse_output(self, output=None):
+        """
+        Return the volume and the output mute state from an output
+
+        :param output: output of cmd. Default to the last one emitted
+        """
+        if output is None:
+            value = self.value_source.value
+            if value is None:
+                return 0, False
+            output = value.output
+        volume, output_mute = output.split()
+        return int(volume), output_mute == "true"
+
+    def compile_icon(self, icon):
+        """
+        Compile the icons by volume, and the one of the muted output
+        """
+        if not isinstance(icon, dict):
+            return super().compile_icon(icon)
+        return IconMap(
+            states={
+                k: v for k, v in icon.items() if k == "ouput_mute"
+            }, thresholds=icon.get("volume")
+        )
+
+    def _icon_for(self, volume, output_mute):
+        return self.icons.lookup(
+            state="ouput_mute" if output_mute else None, value=volume
+        )
 
     @property
     def icon(self):
-        # In case the icon is static
-        if isinstance(self._icon, str) or self._icon is None:
-            return self._icon
-        elif self._output_mute and "ouput_mute" in self._icon:
-            return self._icon["ouput_mute"]
-        elif "volume" in self._icon:
-            volume_icons = sorted(self._icon["volume"], key=lambda k: k[0])
-            keys = [i[0] for i in volume_icons]
-            return volume_icons[bisect_left(keys, self._volume, lo=1) - 1][1]
-
-    @protect_handler
+        return self._icon_for(*self._parse_output())
+
+    @icon.setter
+    def icon(self, value):
+        self._icon = value
+
     def handler(self, event, *args, **kwargs):
         """
         Filter events sent by notifications
@@ -42,25 +73,22 @@ class PulseAudioWidget(SubprocessWidget):
         # Only notify if there is something changes in pulseaudio
         event_change_msg = "Event 'change' on sink"
         if event_change_msg in event:
-            logger.debug("PA: line \"{}\" catched.".format(event))
-            with self._lock_update:
-                self.update()
-                splitted_sleep(self.refresh, stop=self._stop.is_set)
+            logger.debug(lazy("PA: line \"{event}\" catched.", event=event))
+            return super().handler(event, *args, **kwargs)
 
     def organize_result(self, output, *args, **kwargs):
         """
         Override this method to change the infos to print
         """
-        volume, output_mute = output.split()
-        self._volume = int(volume)
-        self._output_mute = output_mute == "true"
-        if self.icon:
+        volume, output_mute = self._parse_output(output)
+        icon = self._icon_for(volume, output_mute)
+        if icon:
             return (
-                "{} {}".format(self.icon, self._volume)
-                if not self._output_mute else "{}".format(self.icon)
+                "{} {}".format(icon, volume)
+                if not output_mute else "{}".format(icon)
             )
         else:
-            return "{}".format(self._volume)
+            return "{}".format(volume)
 
     def __init__(self,
                  cmd=["echo $(pamixer --get-volume) $(pamixer --get-mute)"],
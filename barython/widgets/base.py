@@ -1,25 +1,74 @@
 #!/usr/bin/env python3
 
-import fcntl
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import Future
 import logging
 import os
+import select
 import shlex
 import subprocess
 import threading
+import time
 
 from barython.hooks import HooksPool
+from barython.hooks.supervisor import BACKOFF, DOWN, UP
+from barython.log import lazy
+from barython.markup import Markup
+from barython.metrics import registry
+from barython.profiler import owns_thread
+from barython.scheduler import Policy, RateLimiter, scheduler
+from barython.source import Source, View
 from barython.tools import splitted_sleep
 
 logger = logging.getLogger("barython")
 
+#: content published by a widget: its text, encoded text, and version
+Content = namedtuple("Content", ("text", "data", "version"))
+EMPTY_CONTENT = Content(None, b"", 0)
+
+#: values emitted by the text and subprocess widgets
+TextValue = namedtuple("TextValue", ("text", ))
+OutputValue = namedtuple("OutputValue", ("output", ))
+
+
+class IconMap():
+    """
+    Precompiled selection of an icon from a state or a numeric value
+
+    :param states: icons by state
+    :param thresholds: iterable of (threshold, icon). A value gets the icon
+                       of the highest threshold strictly lower than it, or of
+                       the lowest threshold.
+    :param default: icon if nothing matches
+    """
+    def lookup(self, state=None, value=None):
+        """
+        Return the icon of a state, or else of a value
+        """
+        if state is not None and state in self.states:
+            return self.states[state]
+        if value is not None and self._keys:
+            return self._icons[bisect_left(self._keys, value, lo=1) - 1]
+        return self.default
+
+    def __init__(self, states=None, thresholds=None, default=None):
+        self.states = dict(states) if states else dict()
+        self.default = default
+
+        thresholds = sorted(thresholds or (), key=lambda t: t[0])
+        self._keys = [t[0] for t in thresholds]
+        self._icons = [t[1] for t in thresholds]
+
 
 def protect_handler(handler):
+    """
+    Submit the handler calls to the rate limiter of the widget
+
+    The widget policy decides if a call is run now, later or dropped.
+    """
     def handler_wrapper(self, *args, **kwargs):
-        if not self._refresh_lock.acquire(blocking=False):
-            return
-        result = handler(self, *args, **kwargs)
-        self._refresh_lock.release()
-        return result
+        return self._rate_limiter.submit(handler, self, *args, **kwargs)
     return handler_wrapper
 
 
@@ -27,14 +76,36 @@ class Widget():
     """
     Basic Widget
     """
-    #: cache the content after update
-    _content = None
+    #: last published content
+    _record = EMPTY_CONTENT
     _icon = None
     _refresh = -1
+    #: static widgets are started synchronously to fill the first frame
+    static = False
+    #: attributes deciding the output before decoration, see source_key().
+    #  None if the widget cannot share its source.
+    source_attributes = None
+    #: attributes the rendering depends on besides the value, see
+    #  view_config()
+    view_attributes = ("fg", "bg", "padding", "fonts", "actions", "_icon")
+    #: view config of the last rendering
+    _rendered_config = None
+    #: (icon attribute, IconMap compiled from it)
+    _compiled_icons = None
+    #: if the uid has been generated by a screen, and not set by the user
+    generated_uid = False
 
     @property
     def content(self):
-        return self._content
+        return self._record.text
+
+    @property
+    def _content(self):
+        return self._record.text
+
+    @property
+    def _version(self):
+        return self._record.version
 
     @property
     def icon(self):
@@ -44,6 +115,31 @@ class Widget():
     def icon(self, value):
         self._icon = value
 
+    @property
+    def icons(self):
+        """
+        IconMap compiled from the icon attribute
+
+        Compiled again when the icon attribute is set, not if it is modified
+        in place.
+        """
+        compiled = self._compiled_icons
+        if compiled is None or compiled[0] is not self._icon:
+            compiled = (self._icon, self.compile_icon(self._icon))
+            self._compiled_icons = compiled
+        return compiled[1]
+
+    def compile_icon(self, icon):
+        """
+        Compile the icon attribute in an IconMap
+
+        A dict is read as icons by state, its "global" key being the default.
+        Override this method for other formats.
+        """
+        if isinstance(icon, dict):
+            return IconMap(states=icon, default=icon.get("global"))
+        return IconMap(default=icon)
+
     @property
     def refresh(self):
         if self._refresh == -1 and self.screens:
@@ -55,6 +151,27 @@ class Widget():
     def refresh(self, value):
         self._refresh = value
 
+    @property
+    def max_refresh(self):
+        if self._max_refresh is None:
+            return 8 * self.refresh
+        return max(self._max_refresh, self.refresh)
+
+    @max_refresh.setter
+    def max_refresh(self, value):
+        self._max_refresh = value
+
+    @property
+    def policy(self):
+        """
+        Policy applied on the handler calls, see barython.scheduler
+        """
+        return self._rate_limiter.policy
+
+    @policy.setter
+    def policy(self, value):
+        self._rate_limiter.policy = value if value is not None else Policy()
+
     def decorate(self, text, fg=None, bg=None, padding=0, font=None, icon=None,
                  actions=None):
         """
@@ -65,32 +182,24 @@ class Widget():
         :param padding: padding around the text
         :param font: index of font to use
         :param actions: dict of actions
+
+        text and icon are markup: escape the texts which are not, see
+        barython.markup.escape.
         """
-        try:
-            joined_actions = "".join(
-                "%{{A{}:{}:}}".format(a, cmd) for a, cmd in actions.items()
-            )
-        except (TypeError, AttributeError):
-            joined_actions = ""
-        # if colors are reset in text, padding will not have the good colors
-        if padding:
-            padding_str = self.decorate(padding * " ", fg=fg, bg=bg, font=font)
-        else:
-            padding_str = ""
-        return (12*"{}").format(
-            joined_actions,
-            padding_str,
-            "%{{B{}}}".format(bg) if bg else "",
-            "%{{F{}}}".format(fg) if fg else "",
-            "%{{T{}}}".format(font) if font else "",
-            icon + " " if icon else "",
-            text,
-            "%{{T-}}".format(font) if font else "",
-            "%{F-}" if fg else "",
-            "%{B-}" if bg else "",
-            padding_str,
-            "%{A}" * len(actions) if actions else "",
-        )
+        builder = Markup()
+        nb_actions = builder.open_actions(actions)
+        style = {"fg": fg or None, "bg": bg or None, "font": font or None}
+        previous_style = builder.style(**style)
+        builder.text(padding * " ")
+        if icon:
+            builder.raw(icon + " ")
+        builder.raw("{}".format(text))
+        # if colors are reset in text, padding has to set them again
+        builder.style(**style)
+        builder.text(padding * " ")
+        builder.restore(previous_style)
+        builder.close_actions(nb_actions)
+        return str(builder)
 
     def decorate_with_self_attributes(self, text, *args, **kwargs):
         """
@@ -108,8 +217,125 @@ class Widget():
         return self.decorate(text, **d_kwargs)
 
     def trigger_global_update(self, output=None, *args, **kwargs):
+        """
+        Decorate an organized output and update the screens
+
+        Not memoized: prefer emitting a value, see emit().
+        """
         new_content = self.decorate_with_self_attributes(output)
         self._update_screens(new_content)
+        for follower in self._followers:
+            follower.trigger_global_update(output)
+
+    def emit(self, value):
+        """
+        Emit a value from the source of this widget
+
+        The views of the source (this widget, and the ones following it)
+        render the value if it changed. If it did not, this widget renders it
+        again only if its view config changed.
+
+        :param value: immutable and hashable value, see barython.source
+        """
+        if self.source.emit(value):
+            return True
+        if self._rendered_config != self.view_config():
+            self._on_value(value)
+        return False
+
+    def view_config(self):
+        """
+        Return a key of the attributes the rendering depends on
+        """
+        return repr(tuple(
+            getattr(self, a, None) for a in self.view_attributes
+        ))
+
+    def organize_value(self, value):
+        """
+        Organize the info to show from a value
+
+        Calls organize_result with the fields of the value, so the widgets
+        overriding it keep working.
+        """
+        return self.organize_result(*value)
+
+    def render_value(self, value):
+        """
+        Render a value in markup
+
+        Has to only depend on the value and the view config, as renderings are
+        memoized.
+        """
+        return self.decorate_with_self_attributes(self.organize_value(value))
+
+    def _on_value(self, value):
+        config = self.view_config()
+        self._update_screens(self.view.render(value, config))
+        self._rendered_config = config
+
+    def redraw(self):
+        """
+        Render the last value again, after a change of the view attributes
+        """
+        source = self.value_source
+        if source.version:
+            self._on_value(source.value)
+
+    @property
+    def value_source(self):
+        """
+        Source of the values shown: the one of the leader for a follower
+
+        Read the last value from it, as the source of a follower does not
+        emit anything.
+        """
+        return self._leader.source if self._leader is not None else self.source
+
+    def source_key(self):
+        """
+        Return a key identifying the output of this widget before decoration
+
+        Widgets with the same key compute the same output, so a Runtime
+        lets one of them compute it for all the others. None if the widget
+        cannot share its source.
+        """
+        if self.source_attributes is None:
+            return None
+        return (type(self), repr(tuple(
+            getattr(self, a, None) for a in self.source_attributes
+        )))
+
+    def follow(self, leader):
+        """
+        Stop computing the output and decorate the one of leader instead
+
+        :param leader: widget with the same source_key(), or None to compute
+                       the output again
+        """
+        if self._leader is not None:
+            self._leader._followers.remove(self)
+            self._leader.source.unsubscribe(self._on_value)
+        self._leader = leader
+        if leader is not None:
+            leader._followers.append(self)
+            leader.source.subscribe(self._on_value)
+            if leader.source.version:
+                self._on_value(leader.source.value)
+
+    def _timed_update(self, *args, **kwargs):
+        """
+        Call update, and record its duration if metrics are enabled
+        """
+        if not registry.enabled:
+            return self.update(*args, **kwargs)
+        start = time.monotonic()
+        try:
+            return self.update(*args, **kwargs)
+        finally:
+            registry.histogram("widget.update.{}".format(
+                self.uid or self.__class__.__name__
+            )).observe(time.monotonic() - start)
 
     @protect_handler
     def handler(self, *args, **kwargs):
@@ -117,8 +343,7 @@ class Widget():
         To use with hooks
         """
         with self._lock_update:
-            self.update()
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
+            self._timed_update()
 
     def organize_result(self, *args, **kwargs):
         """
@@ -130,22 +355,181 @@ class Widget():
         result = "{} ".format(self.icon) if self.icon else ""
         return result + "".join(*args, *kwargs.values())
 
+    def _publish(self, content):
+        """
+        Publish a new content record
+
+        The record is immutable and swapped in one assignment, so readers can
+        take it without locking. Contents are published from several threads
+        (updates, predictions, sources states, leaders): the version is
+        incremented under _lock_publish, so two contents never share one.
+        """
+        data = content.encode() if content is not None else b""
+        with self._lock_publish:
+            self._record = Content(content, data, self._record.version + 1)
+
+    def _set_content(self, content):
+        """
+        Publish a content and request the screens update
+        """
+        self._publish(content)
+        for screen in self.screens:
+            threading.Thread(target=screen.update).start()
+
     def _update_screens(self, new_content):
         """
         If content has changed, request the screen update
+
+        A real update replaces any pending prediction.
+        """
+        if self._prediction is not None:
+            with self._lock_prediction:
+                if self._prediction is not None:
+                    self._prediction[1].cancel()
+                    self._prediction = None
+        if self._record.text != new_content:
+            self._set_content(new_content)
+
+    def predict(self, action):
+        """
+        Return the content expected once action is run, or None
+
+        Override this method to give an instant feedback on clicks.
+
+        :param action: action clicked in the bar
         """
-        if self._content != new_content:
-            self._content = new_content
-            for screen in self.screens:
-                threading.Thread(target=screen.update).start()
+        return None
+
+    def optimistic_update(self, action):
+        """
+        Draw the content predicted for action at once
+
+        The prediction is replaced by the next real update, or rolled back
+        if none comes in prediction_timeout seconds.
+
+        :return: True if a prediction has been drawn
+        """
+        try:
+            content = self.predict(action)
+        except Exception as e:
+            logger.debug(lazy("Error when predicting {}: {}", action, e))
+            return False
+        if content is None:
+            return False
+        with self._lock_prediction:
+            if self._prediction is None:
+                previous = self._record.text
+            else:
+                previous, timer, _ = self._prediction
+                timer.cancel()
+            self._prediction = (
+                previous,
+                scheduler.call_later(self.prediction_timeout, self._rollback),
+                content
+            )
+            self._set_content(content)
+        return True
+
+    def _rollback(self):
+        with self._lock_prediction:
+            if self._prediction is None:
+                return
+            previous, _, predicted = self._prediction
+            self._prediction = None
+            logger.debug("Prediction not confirmed, rollback")
+            if self._record.text == predicted:
+                self._set_content(previous)
+
+    def on_source_state(self, source, state):
+        """
+        Called by a hook when its source goes down or comes back
+
+        If a stale_marker is set, it is shown in front of the content while
+        the source is down.
+
+        :param source: hook signaling its state
+        :param state: state of the source, see barython.hooks.supervisor
+        """
+        if self.stale_marker is None:
+            return
+        if state in (BACKOFF, DOWN):
+            if self._stale is None and self.content is not None:
+                stale_content = self.stale_marker + self.content
+                self._stale = (self.content, stale_content)
+                self._update_screens(stale_content)
+        elif state == UP and self._stale is not None:
+            (fresh_content, stale_content), self._stale = self._stale, None
+            # the content may have been updated meanwhile
+            if self.content == stale_content:
+                self._update_screens(fresh_content)
+        for follower in self._followers:
+            follower.on_source_state(source, state)
+
+    def set_interval_hint(self, name, factor):
+        """
+        Stretch the polling interval while the hint is set
+
+        :param name: name of the hint, for example "on_ac"
+        :param factor: factor applied on the interval
+        """
+        self._interval_hints[name] = factor
+
+    def clear_interval_hint(self, name):
+        self._interval_hints.pop(name, None)
+
+    def poll_interval(self, changed=True):
+        """
+        Return the time to wait before the next update of an infinite widget
+
+        In adaptive mode, the interval backs off exponentially while the
+        content does not change, up to max_refresh, and snaps back to the
+        refresh after a change. Hints stretch the interval in all modes.
+
+        :param changed: if the last update changed the content
+        """
+        interval = self.refresh
+        if self.adaptive:
+            if changed:
+                self._backoff_level = 0
+            else:
+                self._backoff_level = min(self._backoff_level + 1, 32)
+            interval *= self.backoff ** self._backoff_level
+            interval = min(interval, self.max_refresh)
+        for factor in tuple(self._interval_hints.values()):
+            interval *= factor
+        return interval
+
+    def suspend(self):
+        """
+        Pause the infinite loop, until resumed
+        """
+        self._active.clear()
+
+    def resume(self):
+        self._active.set()
+
+    def _wait_active(self):
+        """
+        Block while the widget is suspended
+
+        :return: False if the widget has been stopped meanwhile
+        """
+        while not self._active.wait(0.5):
+            if self._stop.is_set():
+                return False
+        return not self._stop.is_set()
 
     def continuous_update(self):
-        while not self._stop.is_set():
+        while self._wait_active():
+            version = self._record.version
             try:
-                self.update()
+                self._timed_update()
             except Exception as e:
                 logger.error(e)
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
+            splitted_sleep(
+                self.poll_interval(self._record.version != version),
+                stop=self._stop.is_set
+            )
 
     def update(self):
         pass
@@ -158,24 +542,31 @@ class Widget():
             for s in self.screens:
                 s.hooks.merge(self)
 
+    @owns_thread
     def start(self, *args, **kwargs):
         self._stop.clear()
+        if self._leader is not None:
+            # the output is computed by the leader
+            return
         if not self._lock_start.acquire(blocking=False):
             return
         try:
             if self.infinite:
                 self.continuous_update()
             else:
-                self.update()
+                self._timed_update()
         finally:
             if self._lock_start:
                 self._lock_start.release()
 
     def stop(self):
         self._stop.set()
+        self._rate_limiter.cancel()
 
     def __init__(self, bg=None, fg=None, padding=0, fonts=None, icon="",
-                 actions=None, refresh=-1, screens=None, infinite=False):
+                 actions=None, refresh=-1, screens=None, infinite=False,
+                 uid=None, policy=None, adaptive=False, max_refresh=None,
+                 backoff=2, stale_marker=None, prediction_timeout=1):
         #: background for the widget
         self.bg = bg
 
@@ -207,23 +598,75 @@ class Widget():
         #: run in an infinite loop or not
         self.infinite = infinite
 
+        #: if infinite, back off the polling interval while the content does
+        #  not change
+        self.adaptive = adaptive
+
+        #: ceiling of the polling interval in adaptive mode. Default to 8
+        #  times the refresh.
+        self._max_refresh = max_refresh
+
+        #: factor applied on the interval after each update without change
+        self.backoff = backoff
+
+        self._backoff_level = 0
+        #: factors stretching the polling interval, by name
+        self._interval_hints = dict()
+
+        #: shown in front of the content while a source is down. None to
+        #  keep the content as is.
+        self.stale_marker = stale_marker
+        #: (fresh, stale) content while a source is down
+        self._stale = None
+
+        #: time to wait for the real update after a prediction, before
+        #  rolling it back
+        self.prediction_timeout = prediction_timeout
+        #: (previous content, rollback timer, predicted content)
+        self._prediction = None
+        self._lock_prediction = threading.Lock()
+
+        #: emits the values computed by this widget
+        self.source = Source()
+        self.source.subscribe(self._on_value)
+        #: renders the values, memoized
+        self.view = View(self.render_value)
+
+        #: widget computing the output for this one, see follow()
+        self._leader = None
+        #: widgets decorating the output of this one
+        self._followers = []
+
+        #: stable identifier, used to persist the content between restarts.
+        #  Set by the first screen the widget is attached to if None.
+        self.uid = uid
+
         #: event to stop the widget
         self._stop = threading.Event()
+        #: cleared while suspended, to pause the infinite loop
+        self._active = threading.Event()
+        self._active.set()
         self._lock_start = threading.Condition()
         self._lock_update = threading.Condition()
-        self._refresh_lock = threading.Semaphore(2)
+        #: serializes the publications of a new content
+        self._lock_publish = threading.Lock()
+
+        #: rate limiter of the handler calls. Its policy defaults to run the
+        #  first call of a burst, then the latest one after the refresh.
+        self._rate_limiter = RateLimiter(
+            policy, default_wait=lambda: self.refresh
+        )
 
 
 class TextWidget(Widget):
     text = ""
+    static = True
 
     def update(self):
         with self._lock_update:
-            new_content = self.decorate_with_self_attributes(
-                self.organize_result(self.text)
-            )
-            self._update_screens(new_content)
+            self.emit(TextValue(self.text))
 
+    @owns_thread
     def start(self):
         with self._lock_start:
             self.update()
@@ -240,20 +683,7 @@ class SubprocessWidget(Widget):
     """
     _subscribe_subproc = None
     _subproc = None
-
-    def _no_blocking_read(self, output):
-        """
-        Set the output to be non blockant and read it
-        """
-        fd = output.fileno()
-        fl = fcntl.fcntl(fd, fcntl.F_GETFL)
-        fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
-        try:
-            result = output.read()
-        except:
-            result = b""
-        fcntl.fcntl(fd, fcntl.F_SETFL, fl)
-        return result
+    source_attributes = ("cmd", "subscribe_cmd", "shell", "_icon", "refresh")
 
     def _init_subprocess(self, cmd):
         """
@@ -263,7 +693,9 @@ class SubprocessWidget(Widget):
             return None
         if isinstance(cmd, str):
             cmd = shlex.split(cmd)
-        logger.debug("Launching {}".format(" ".join(cmd)))
+        logger.debug(lazy("Launching {cmd}", cmd=cmd))
+        if registry.enabled:
+            registry.counter("subprocess_spawns").inc()
         return subprocess.Popen(
             cmd, stdout=subprocess.PIPE, shell=self.shell, env=self.env
         )
@@ -279,20 +711,29 @@ class SubprocessWidget(Widget):
             )
 
     def notify(self, *args, **kwargs):
+        """
+        Wait for an output of subscribe_cmd, then drain what is already there
+
+        If subscribe_cmd exits, it is reaped so the next notify respawns it.
+        """
         if self.subscribe_cmd:
             self._init_subscribe_subproc()
-            self._subscribe_subproc.stdout.readline()
-            # hack to flush the stdout
-            try:
-                self._no_blocking_read(self._subscribe_subproc.stdout)
-            except:
-                pass
+            if self._subscribe_subproc is None:
+                return True
+            fd = self._subscribe_subproc.stdout.fileno()
+            data = os.read(fd, 65536)
+            while data and select.select([fd], [], [], 0)[0]:
+                data = os.read(fd, 65536)
+            if not data:
+                self._subscribe_subproc.wait()
+                self._subscribe_subproc = None
         return True
 
     def continuous_update(self):
-        while not self._stop.is_set():
+        while self._wait_active():
+            version = self._record.version
             try:
-                self.update()
+                self._timed_update()
             except Exception as e:
                 logger.error(e)
                 try:
@@ -300,22 +741,59 @@ class SubprocessWidget(Widget):
                 except:
                     pass
             finally:
-                splitted_sleep(self.refresh, stop=self._stop.is_set)
+                splitted_sleep(
+                    self.poll_interval(self._record.version != version),
+                    stop=self._stop.is_set
+                )
                 self.notify()
         try:
             self._subproc.terminate()
         except:
             pass
 
+    def _run_in_prefork(self):
+        """
+        Run cmd in the prefork server and return the first line of its output
+
+        The line is returned as soon as it is streamed back, without waiting
+        for the command to exit.
+        """
+        if self._stop.is_set():
+            return b""
+        first_line = Future()
+        output = bytearray()
+
+        def on_output(chunk):
+            output.extend(chunk)
+            end = output.find(b"\n")
+            if end != -1 and not first_line.done():
+                first_line.set_result(bytes(output[:end + 1]))
+
+        def on_exit(future):
+            if first_line.done():
+                return
+            if future.exception() is not None:
+                first_line.set_exception(future.exception())
+            else:
+                first_line.set_result(future.result().stdout)
+
+        self.prefork.run(
+            self.cmd, shell=self.shell, env=self.env, on_output=on_output
+        ).add_done_callback(on_exit)
+        return first_line.result()
+
     def update(self, *args, **kwargs):
         with self._lock_update:
-            self._subproc = self._init_subprocess(self.cmd)
-            output = self._subproc.stdout.readline()
+            if self.prefork is not None and self.prefork.running:
+                output = self._run_in_prefork()
+            else:
+                self._subproc = self._init_subprocess(self.cmd)
+                output = self._subproc.stdout.readline()
             if output != b"":
-                self.trigger_global_update(self.organize_result(
+                self.emit(OutputValue(
                     output.decode().replace('\n', '').replace('\r', '')
                 ))
-            if self._subproc.poll() is not None:
+            if self._subproc is not None and self._subproc.poll() is not None:
                 self._subproc = self._subproc.terminate()
 
     def stop(self, *args, **kwargs):
@@ -332,7 +810,7 @@ class SubprocessWidget(Widget):
             pass
 
     def __init__(self, cmd, subscribe_cmd=None, shell=False, infinite=True,
-                 *args, **kwargs):
+                 prefork=None, *args, **kwargs):
         super().__init__(*args, **kwargs, infinite=infinite)
 
         #: override environment variables to get the same output everywhere
@@ -348,3 +826,7 @@ class SubprocessWidget(Widget):
 
         #: value for the subprocess.Popen shell parameter. Default to False
         self.shell = shell
+
+        #: PreforkServer running cmd, instead of forking the main process.
+        #  cmd has to exit. Fall back on Popen if the server is not running.
+        self.prefork = prefork
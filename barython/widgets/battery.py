@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
 import logging
 import os
 
 from .base import Widget
+from barython.log import lazy
+from barython.source import freeze
 
 
-logger = logging.getLogger("battery_widget")
+logger = logging.getLogger("barython")
 
 BAT_DIR = "/sys/class/power_supply"
 BAT_TYPE = "Battery"
@@ -26,6 +29,9 @@ BATTERY_INFO_FILES = {
     "type": ["type"],
 }
 
+#: infos of each battery, by name
+BatteryValue = namedtuple("BatteryValue", ("batteries", ))
+
 
 def _read_1st_and_concat(*files):
     """
@@ -33,10 +39,10 @@ def _read_1st_and_concat(*files):
 
     :param *files: files to try. Will stop at the first available file.
     """
-    for f in files:
+    for path in files:
         try:
-            with open(f) as f:
-                return " ".join(l.strip() for l in f.readlines())
+            with open(path) as f:
+                return " ".join(line.strip() for line in f.readlines())
         except FileNotFoundError:
             continue
 
@@ -45,6 +51,8 @@ class BatteryWidget(Widget):
     """
     Show battery level
     """
+    source_attributes = ("padding", "_icon", "refresh")
+
     def _result_by_battery(self, battery, infos, show_batt_name=False):
         r = ""
         if show_batt_name:
@@ -63,6 +71,9 @@ class BatteryWidget(Widget):
         )
         return super().organize_result(r)
 
+    def organize_value(self, value):
+        return self.organize_result(**value.batteries)
+
     def list_batteries(self):
         """
         List batteries by checking each power supply device's type
@@ -86,11 +97,10 @@ class BatteryWidget(Widget):
                     *[os.path.join(BAT_DIR, battery, f) for f in val]
                 )
             except FileNotFoundError:
-                logger.debug(
-                    "Could not read file {} for battery {}".format(
-                        key, battery
-                    )
-                )
+                logger.debug(lazy(
+                    "Could not read file {key} for battery {battery}",
+                    key=key, battery=battery
+                ))
                 continue
 
             try:
@@ -130,8 +140,19 @@ class BatteryWidget(Widget):
         batteries = {}
         for b in self.list_batteries():
             batteries[b] = self.read_battery_infos(b)
-        logger.debug("Batteries: {}".format(batteries.values()))
-        self.trigger_global_update(self.organize_result(**batteries))
+        logger.debug(lazy("Batteries: {batteries}", batteries=batteries))
+        discharging = any(
+            str(infos.get("status", "")).lower() == BAT_STATUS["DISCHARGING"]
+            for infos in batteries.values()
+        )
+        if discharging:
+            self.clear_interval_hint("on_ac")
+        else:
+            self.set_interval_hint("on_ac", self.ac_refresh_factor)
+        self.emit(BatteryValue(freeze(batteries)))
 
-    def __init__(self, refresh=10, *args, **kwargs):
+    def __init__(self, refresh=10, ac_refresh_factor=1, *args, **kwargs):
         super().__init__(refresh=refresh, infinite=True, *args, **kwargs)
+
+        #: stretch the refresh by this factor when no battery is discharging
+        self.ac_refresh_factor = ac_refresh_factor
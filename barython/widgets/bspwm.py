@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple, OrderedDict
 import logging
 import re
+import shlex
 
 from .base import Widget, protect_handler
-from barython.tools import splitted_sleep
 from barython.hooks.bspwm import BspwmHook
+from barython.markup import Markup, escape
+from barython.source import freeze
 
 
 logger = logging.getLogger("barython")
 
+DesktopsValue = namedtuple("DesktopsValue", ("monitors", ))
+
 
 class BspwmDesktopWidget(Widget):
     """
@@ -24,22 +29,108 @@ class BspwmDesktopWidget(Widget):
         "U": ("bg_focused_urgent", "fg_focused_urgent"),
         "u": ("bg_urgent", "fg_urgent"),
     }
+    view_attributes = Widget.view_attributes + tuple(
+        "{}_{}".format(color, kind) for color in ("fg", "bg") for kind in (
+            "occupied", "free", "urgent", "monitor", "focused_occupied",
+            "focused_free", "focused_urgent", "focused_monitor"
+        )
+    ) + ("fixed_order", "_focused")
 
     @protect_handler
     def handler(self, monitors, *args, **kwargs):
         """
         Filter events sent by notifications
         """
-        new_content = self.decorate_with_self_attributes(
-            self.organize_result(monitors)
-        )
+        self._monitors = monitors
         with self._lock_update:
-            self._update_screens(new_content)
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
+            for m, prop in monitors.items():
+                focused = next(
+                    self._get_focused_desktop(prop["desktops"]), None
+                )
+                if focused is not None:
+                    self._focused[m] = focused
+            self.emit(DesktopsValue(freeze(monitors)))
 
     def _actions_desktop(self, desktop, *args, **kwargs):
         return {1: "bspc desktop -f \"{}\"".format(desktop)}
 
+    def _predict_focus(self, monitors, desktop):
+        """
+        Return the monitors expected once desktop is focused
+        """
+        target_m = next((
+            m for m, prop in monitors.items()
+            if any(d[1:] == desktop for d in prop["desktops"])
+        ), None)
+        if target_m is None:
+            return None
+        predicted = OrderedDict()
+        for m, prop in monitors.items():
+            desktops = prop["desktops"]
+            if m == target_m:
+                desktops = [
+                    (d[0].upper() if d[1:] == desktop else d[0].lower()) +
+                    d[1:] for d in desktops
+                ]
+            predicted[m] = dict(
+                prop, focused=(m == target_m), desktops=desktops
+            )
+        return predicted
+
+    def _predict_swap(self, monitors, d0, d1):
+        """
+        Return the monitors expected once desktops d0 and d1 are swapped
+
+        Desktops keep their state (occupied, free, urgent) and monitors keep
+        the focus of the swapped positions.
+        """
+        positions = {
+            d[1:]: (m, i) for m, prop in monitors.items()
+            for i, d in enumerate(prop["desktops"])
+        }
+        if d0 not in positions or d1 not in positions:
+            return None
+        predicted = OrderedDict(
+            (m, dict(prop, desktops=list(prop["desktops"])))
+            for m, prop in monitors.items()
+        )
+
+        def move(slot, desktop):
+            state = desktop[0].upper() if slot[0].isupper() else (
+                desktop[0].lower()
+            )
+            return state + desktop[1:]
+
+        (m0, i0), (m1, i1) = positions[d0], positions[d1]
+        slot0 = monitors[m0]["desktops"][i0]
+        slot1 = monitors[m1]["desktops"][i1]
+        predicted[m0]["desktops"][i0] = move(slot0, slot1)
+        predicted[m1]["desktops"][i1] = move(slot1, slot0)
+        return predicted
+
+    def predict(self, action):
+        """
+        Predict the desktops after a bspc focus or swap
+        """
+        if self._monitors is None:
+            return None
+        try:
+            argv = shlex.split(action)
+        except ValueError:
+            return None
+        if len(argv) == 4 and argv[:3] == ["bspc", "desktop", "-f"]:
+            monitors = self._predict_focus(self._monitors, argv[3])
+        elif (len(argv) == 5 and argv[:2] == ["bspc", "desktop"] and
+                argv[3] == "-s"):
+            monitors = self._predict_swap(self._monitors, argv[2], argv[4])
+        else:
+            return None
+        if monitors is None:
+            return None
+        return self.decorate_with_self_attributes(
+            self.organize_result(monitors)
+        )
+
     def _actions_monitor(self, monitor, *args, **kwargs):
         return {1: "bspc monitor -f \"{}\"".format(monitor)}
 
@@ -52,17 +143,17 @@ class BspwmDesktopWidget(Widget):
 
         :param desktops_to_sort: list of desktops to reorder
         """
-        d = desktops_to_sort.copy()
         # All desktops that are not in self._fixed_order will be put at the
         # end
         max_index = len(self.fixed_order)
-        d.sort(key=lambda x: self.fixed_order.index(x[1:])
-               if x[1:] in self.fixed_order else max_index)
-        return d
+        return sorted(
+            desktops_to_sort, key=lambda x: self.fixed_order.index(x[1:])
+            if x[1:] in self.fixed_order else max_index
+        )
 
     def _parse_monitor(self, m, prop):
         decorate_kwargs = {
-            "text": m, "padding": self.padding,
+            "text": escape(m), "padding": self.padding,
             "actions": self._actions_monitor(m, prop)
         }
         if prop["focused"]:
@@ -76,7 +167,7 @@ class BspwmDesktopWidget(Widget):
     def _parse_desktop(self, d, m):
         d_name = d[1:]
         decorate_kwargs = {
-            "text": d_name, "padding": self.padding,
+            "text": escape(d_name), "padding": self.padding,
             "actions": self._actions_desktop(d_name, m)
         }
 
@@ -100,9 +191,6 @@ class BspwmDesktopWidget(Widget):
 
     def _parse_and_decorate(self, infos):
         for m, prop in infos.items():
-            self._focused[m] = next(
-                self._get_focused_desktop(prop["desktops"])
-            )
             if len(list(infos.keys())) > 1:
                 yield self._parse_monitor(m, prop)
             desktop_list = (self._sort_fixed_order(prop["desktops"])
@@ -113,8 +201,13 @@ class BspwmDesktopWidget(Widget):
     def organize_result(self, monitors, *args, **kwargs):
         """
         Override this method to change the infos to print
+
+        The colors shared by adjacent desktops are merged.
         """
-        return "".join(self._parse_and_decorate(monitors))
+        markup = Markup()
+        for decorated in self._parse_and_decorate(monitors):
+            markup.raw(decorated)
+        return str(markup)
 
     def __init__(self, fg_occupied=None, bg_occupied=None,
                  fg_free=None, bg_free=None,
@@ -185,6 +278,9 @@ class BspwmDesktopWidget(Widget):
         #: registered the focused desktop of each monitors
         self._focused = dict()
 
+        #: last monitors state received, used to predict the actions result
+        self._monitors = None
+
         # Update the widget when PA volume changes
         self.hooks.subscribe(
             self.handler, BspwmHook, bspwm_version=self.bspwm_version
@@ -200,6 +296,15 @@ class BspwmDesktopPoolWidget(BspwmDesktopWidget):
     always show desktops in the same order (and will not fully respect the
     order returned by bspwm).
     """
+    #: the rendering depends on the monitors of the screens
+    view_attributes = BspwmDesktopWidget.view_attributes + (
+        "_screens_monitors",
+    )
+
+    @property
+    def _screens_monitors(self):
+        return sorted(repr(s.bspwm_monitor_name) for s in self.screens)
+
     def _swap_desktop(self, target_d):
         """
         Swap desktop d of monitor m with the one on the current screen
@@ -243,9 +348,6 @@ class BspwmDesktopPoolWidget(BspwmDesktopWidget):
     def _parse_and_decorate(self, infos):
         def get_desktops():
             for m, prop in infos.items():
-                self._focused[m] = next(
-                    self._get_focused_desktop(prop["desktops"])
-                )
                 for d in prop["desktops"]:
                     yield d, m
 
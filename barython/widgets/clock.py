@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
 from datetime import datetime
 
 from .base import Widget
 
 
+ClockValue = namedtuple("ClockValue", ("date_now", ))
+
+
 class ClockWidget(Widget):
+    source_attributes = ("date_format", "_icon", "refresh")
+    view_attributes = Widget.view_attributes + ("date_format", )
+
     def organize_result(self, date_now, **kwargs):
         return super().organize_result(date_now.strftime(self.date_format))
 
     def update(self, *args, **kwargs):
-        self.trigger_global_update(
-            self.organize_result(datetime.now())
-        )
+        # no date format shows less than seconds: the value only changes
+        # once per second
+        self.emit(ClockValue(datetime.now().replace(microsecond=0)))
 
     def __init__(self, date_format="%c", infinite=True, *args, **kwargs):
         super().__init__(infinite=True, *args, **kwargs)
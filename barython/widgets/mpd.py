@@ -1,29 +1,35 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
 import logging
 import mpd
 
 from .base import Widget
 from barython.hooks.mpd import MPDHook
+from barython.log import lazy
+from barython.markup import escape
+from barython.source import freeze
 
 
 logger = logging.getLogger("barython")
 
+MPDValue = namedtuple("MPDValue", ("status", "current", "running"))
+NOT_RUNNING = MPDValue(None, None, False)
+
 
 class MPDWidget(Widget):
     """
     Requires python-mpd2
     """
     _icon = None
+    source_attributes = ("host", "port", "_icon")
+
+    def _icon_for(self, status):
+        return self.icons.lookup(state=status or None)
 
     @property
     def icon(self):
-        status = self.status
-        no_icon = self._icon is None or not status
-        if isinstance(self._icon, str) or no_icon:
-            return self._icon
-        global_icon = self._icon.get("global", None)
-        return self._icon.get(status, global_icon)
+        return self._icon_for(self.status)
 
     @icon.setter
     def icon(self, value):
@@ -31,6 +37,24 @@ class MPDWidget(Widget):
 
     @property
     def status(self):
+        """
+        Last status fetched, None if MPD is not running
+        """
+        value = self.value_source.value
+        return value.status if value is not None else None
+
+    @property
+    def current(self):
+        """
+        Last song fetched
+        """
+        value = self.value_source.value
+        return value.current if value is not None else None
+
+    def fetch_status(self):
+        """
+        Ask the status to MPD
+        """
         try:
             r = self._mpdclient.status()["state"]
         except Exception:
@@ -38,8 +62,10 @@ class MPDWidget(Widget):
             r = self._mpdclient.status()["state"]
         return r
 
-    @property
-    def current(self):
+    def fetch_current(self):
+        """
+        Ask the current song to MPD
+        """
         try:
             r = self._mpdclient.currentsong()
         except Exception:
@@ -65,10 +91,10 @@ class MPDWidget(Widget):
         """
         Override this method to change the infos to print
         """
-        # avoid doing useless connections to mpd
-        icon = self.icon
+        icon = self._icon_for(status)
         if current:
-            artist, title = current["artist"], current["title"]
+            artist = escape(current["artist"])
+            title = escape(current["title"])
         if not running:
             return "{}".format(icon) if icon else ""
         if icon:
@@ -79,25 +105,40 @@ class MPDWidget(Widget):
         else:
             return "{} - {}".format(artist, title)
 
+    def organize_value(self, value):
+        return self.organize_result(**value._asdict())
+
     def handler(self, event=None, run=True, *args, **kwargs):
         if not run:
-            return self.trigger_global_update(
-                self.organize_result(running=False)
-            )
+            return self.emit(NOT_RUNNING)
         return super().handler(event=event, run=run, *args, **kwargs)
 
+    def predict(self, action):
+        """
+        Predict the status after a mpc playback command
+        """
+        argv = action.split()
+        value = self.value_source.value
+        if (len(argv) != 2 or argv[0] != "mpc" or
+                value is None or not value.running):
+            return None
+        if argv[1] == "toggle":
+            status = "pause" if value.status == "play" else "play"
+        elif argv[1] in ("play", "pause", "stop"):
+            status = argv[1]
+        else:
+            return None
+        return self.render_value(value._replace(status=status))
+
     def update(self, *args, **kwargs):
         try:
-            return self.trigger_global_update(
-                self.organize_result(status=self.status, current=self.current)
+            value = MPDValue(
+                self.fetch_status(), freeze(self.fetch_current()), True
             )
         except Exception as e:
-            logger.debug(
-                "MPD is not running or cannot be joined: {}".format(e)
-            )
-            return self.trigger_global_update(
-                self.organize_result(running=False)
-            )
+            logger.debug(lazy("MPD is not running or cannot be joined: {}", e))
+            value = NOT_RUNNING
+        return self.emit(value)
 
     def __init__(self, host="localhost", port=6600, password=None,
                  *args, **kwargs):
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
 import logging
 import xpybutil
 
 from .base import Widget
+from barython.log import lazy
+from barython.markup import escape
 from barython.hooks.xorg import WindowHook
 
 
 logger = logging.getLogger("barython")
 
+WindowValue = namedtuple("WindowValue", ("active_window", ))
+
 
 class ActiveWindowWidget(Widget):
     """
@@ -16,6 +21,7 @@ class ActiveWindowWidget(Widget):
     """
     #: list of atom names to catch
     _atom_names = ("_NET_ACTIVE_WINDOW", "WM_NAME")
+    source_attributes = ("_icon", )
 
     @property
     def active_window_name(self):
@@ -29,14 +35,15 @@ class ActiveWindowWidget(Widget):
 
     def handler(self, events, *args, **kwargs):
         for e, aname in events:
-            print(aname)
+            logger.debug(lazy("Atom {atom} changed", atom=aname))
             if aname in self._atom_names:
                 return super().handler(*args, **kwargs)
 
+    def organize_value(self, value):
+        return self.organize_result(active_window=escape(value.active_window))
+
     def update(self, *args, **kwargs):
-        return self.trigger_global_update(
-            self.organize_result(active_window=self.active_window_name)
-        )
+        return self.emit(WindowValue(self.active_window_name))
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Measure the cost of the attributes access on a screen
+
+Compares Screen with a screen resolving the panel attributes in
+__getattribute__, as barython did before, on the hot paths: rendering the
+bar and reading the inherited attributes. Results are written in JSON.
+"""
+
+import argparse
+import json
+import timeit
+
+from barython.panel import Panel
+from barython.screen import Screen
+from barython.widgets.base import TextWidget
+
+
+class GetattributeScreen(Screen):
+    """
+    Screen resolving the panel attributes on each attribute access
+    """
+    def __getattribute__(self, name):
+        attr = super().__getattribute__(name)
+        # attributes to inherit from panel
+        panel_attr = ("height", "fg", "bg", "fonts", "refresh", "clickable")
+        if name in panel_attr:
+            if (attr is None or attr == -1) and self.panel:
+                return getattr(self.panel, name, attr)
+        return attr
+
+
+def build_screen(screen_class, nb_widgets):
+    p = Panel(keep_unplugged_screens=True)
+    s = screen_class(geometry=(1920, 18, 0, 0))
+    widgets = [TextWidget(text="text{}".format(i)) for i in range(nb_widgets)]
+    for w in widgets:
+        w.update()
+    s.add_widget("l", *widgets)
+    p.add_screen(s)
+    return s
+
+
+def inherited_access(screen):
+    return (screen.height, screen.fg, screen.bg, screen.fonts,
+            screen.refresh, screen.clickable)
+
+
+def measure(screen_class, nb_widgets, number):
+    s = build_screen(screen_class, nb_widgets)
+    return {
+        "gather": timeit.timeit(s.gather, number=number) / number,
+        "content_versions": timeit.timeit(
+            s.content_versions, number=number
+        ) / number,
+        "inherited_access": timeit.timeit(
+            lambda: inherited_access(s), number=number
+        ) / number,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--widgets", type=int, nargs="+",
+                        default=[5, 20, 100])
+    parser.add_argument("--number", type=int, default=10000,
+                        help="number of calls measured")
+    parser.add_argument("--output", default=None,
+                        help="JSON output file, stdout if not set")
+    args = parser.parse_args(argv)
+
+    results = []
+    for nb_widgets in args.widgets:
+        for name, screen_class in (("descriptor", Screen),
+                                   ("getattribute", GetattributeScreen)):
+            result = measure(screen_class, nb_widgets, args.number)
+            result.update({"screen": name, "widgets": nb_widgets})
+            results.append(result)
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+Emit fake `bspc subscribe` or `pactl subscribe` events at a fixed rate
+
+The emission time of each event is recorded in the file given with --record,
+one monotonic time per line.
+"""
+
+import argparse
+import itertools
+import sys
+import time
+
+
+def bspwm_events(desktops=10):
+    """
+    Yield bspwm reports, moving the focus on each event
+    """
+    for focused in itertools.cycle(range(desktops)):
+        yield "WMDVI-I-0:{}:LT".format(":".join(
+            ("O" if d == focused else "o") + str(d) for d in range(desktops)
+        ))
+
+
+def pulseaudio_events():
+    while True:
+        yield "Event 'change' on sink #0"
+
+
+EVENTS = {"bspwm": bspwm_events, "pulseaudio": pulseaudio_events}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", choices=sorted(EVENTS.keys()))
+    parser.add_argument("--rate", type=float, default=10,
+                        help="events per second")
+    parser.add_argument("--record", default=None,
+                        help="file where events time are recorded")
+    args = parser.parse_args(argv)
+
+    record = open(args.record, "a") if args.record else None
+    interval = 1 / args.rate
+    next_event = time.monotonic()
+    try:
+        for event in EVENTS[args.source]():
+            next_event += interval
+            time.sleep(max(0, next_event - time.monotonic()))
+            if record:
+                record.write("{}\n".format(time.monotonic()))
+                record.flush()
+            sys.stdout.write(event + "\n")
+            sys.stdout.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        if record:
+            record.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""
+Fake lemonbar, recording the time of each received frame
+
+Accepts (and ignores) the lemonbar options. Frames are recorded in
+$BARYTHON_BENCH_RECORD_DIR/<pid>.frames, one "<monotonic time> <bytes>" line
+per frame.
+"""
+
+import os
+import sys
+import time
+
+
+def main():
+    record_dir = os.environ.get("BARYTHON_BENCH_RECORD_DIR", None)
+    record = None
+    if record_dir:
+        record = open(
+            os.path.join(record_dir, "{}.frames".format(os.getpid())), "w"
+        )
+    try:
+        for line in sys.stdin.buffer:
+            if record:
+                record.write("{} {}\n".format(time.monotonic(), len(line)))
+                record.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if record:
+            record.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Replay recorded hook events in a headless panel
+
+The bspwm and pulseaudio events recorded by an EventRecorder are replayed
+in a panel drawing in fake lemonbars, at the recorded pace, N times faster or
+as fast as possible (speed 0). Frames, CPU and metrics are written in JSON.
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from barython.hooks.audio import PulseAudioHook
+from barython.hooks.bspwm import BspwmHook
+from barython.hooks.replay import replace_hooks
+from barython.metrics import registry
+from barython.output import MemoryOutput
+
+from benchmarks.run import build_panel, bytes_per_frame, read_frames
+
+
+def run_replay(path, nb_screens, nb_widgets, speed=1,
+               instance_per_screen=True, in_memory=False, settle=0.5):
+    with tempfile.TemporaryDirectory() as records_dir:
+        os.environ["BARYTHON_BENCH_RECORD_DIR"] = records_dir
+        registry.reset()
+        registry.enable()
+
+        output = MemoryOutput() if in_memory else None
+        panel = build_panel(
+            nb_screens, nb_widgets, instance_per_screen, output=output
+        )
+        replays = [
+            r for hook_class in (BspwmHook, PulseAudioHook)
+            for r in replace_hooks(panel.hooks, hook_class, path, speed=speed)
+        ]
+
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.monotonic()
+        threading.Thread(target=panel.start).start()
+        for r in replays:
+            r.finished.wait()
+        replay_duration = time.monotonic() - start
+        # let the last events be drawn
+        time.sleep(settle)
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        panel.stop()
+        registry.disable()
+
+        frames = read_frames(records_dir, output)
+
+    cpu = (
+        usage_end.ru_utime - usage_start.ru_utime +
+        usage_end.ru_stime - usage_start.ru_stime
+    )
+    metrics = registry.snapshot()
+    return {
+        "screens": nb_screens,
+        "widgets": nb_widgets,
+        "instance_per_screen": instance_per_screen,
+        "in_memory": in_memory,
+        "speed": speed,
+        "events": sum(r.replayed for r in replays),
+        "replay_duration": replay_duration,
+        "frames": len(frames),
+        "bytes_per_frame": bytes_per_frame(frames),
+        "cpu_seconds": cpu,
+        "max_rss_kb": usage_end.ru_maxrss,
+        "metrics": metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("events", help="file recorded by an EventRecorder")
+    parser.add_argument("--speed", type=float, nargs="+", default=[1],
+                        help="replay speeds, 0 for as fast as possible")
+    parser.add_argument("--screens", type=int, default=1)
+    parser.add_argument("--widgets", type=int, default=5)
+    parser.add_argument("--single-instance", action="store_true",
+                        help="use one lemonbar for all screens")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="draw in memory instead of fake lemonbars")
+    parser.add_argument("--output", default=None,
+                        help="JSON output file, stdout if not set")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_replay(
+            args.events, args.screens, args.widgets, speed=speed,
+            instance_per_screen=not args.single_instance,
+            in_memory=args.in_memory
+        ) for speed in args.speed
+    ]
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+Measure the event-to-frame latency of barython
+
+Runs a panel drawing in fake lemonbars, fed by fake bspwm and pulseaudio
+event sources, for each scenario of the screens x widgets grid. Results are
+written in JSON.
+"""
+
+import argparse
+from bisect import bisect_left
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from barython.hooks.audio import PulseAudioHook
+from barython.hooks.bspwm import BspwmHook
+from barython.metrics import registry
+from barython.output import MemoryOutput
+from barython.panel import Panel
+from barython.screen import Screen
+from barython.widgets.audio import PulseAudioWidget
+from barython.widgets.base import TextWidget
+from barython.widgets.bspwm import BspwmDesktopWidget
+from barython.widgets.clock import ClockWidget
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FAKE_LEMONBAR = os.path.join(HERE, "fake_lemonbar.py")
+FAKE_EVENTS = os.path.join(HERE, "fake_events.py")
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = int(round(q / 100 * (len(values) - 1)))
+    return values[min(len(values) - 1, index)]
+
+
+def build_panel(nb_screens, nb_widgets, instance_per_screen=True,
+                output=None):
+    """
+    Build a panel with nb_screens screens of nb_widgets widgets each
+
+    :param output: output to draw in, fake lemonbars if None
+    """
+    p = Panel(instance_per_screen=instance_per_screen,
+              keep_unplugged_screens=True, refresh=0, output=output)
+    p.bar_cmd = FAKE_LEMONBAR
+    for i in range(nb_screens):
+        s = Screen(geometry=(1920, 18, 1920 * i, 0), refresh=0)
+        s.bspwm_monitor_name = "DVI-I-0"
+        widgets = [
+            BspwmDesktopWidget(refresh=0, fg_focused_occupied="#FFFFFFFF",
+                               bg_focused_occupied="#FF000000"),
+            PulseAudioWidget(cmd=["echo 50 false"], refresh=0),
+            ClockWidget(refresh=1),
+        ]
+        widgets.extend(
+            TextWidget(text="text{}".format(j))
+            for j in range(max(0, nb_widgets - len(widgets)))
+        )
+        s.add_widget("l", *widgets[:nb_widgets])
+        p.add_screen(s)
+    return p
+
+
+def plug_fake_sources(panel, records_dir, bspwm_rate, pulseaudio_rate):
+    """
+    Replace the commands of the hooks by fake event sources
+
+    :return: path of the file where bspwm events are recorded
+    """
+    events_record = os.path.join(records_dir, "bspwm.events")
+    sources = {
+        BspwmHook: ("bspwm", bspwm_rate, events_record),
+        PulseAudioHook: ("pulseaudio", pulseaudio_rate,
+                         os.path.join(records_dir, "pulseaudio.events")),
+    }
+    for hook_class, (source, rate, record) in sources.items():
+        for h in panel.hooks.hooks.get(hook_class, []):
+            h.cmd = [sys.executable, FAKE_EVENTS, source,
+                     "--rate", str(rate), "--record", record]
+    return events_record
+
+
+def read_frames(records_dir, output=None):
+    """
+    (time, bytes) of the frames drawn in the fake lemonbars, or in output
+    """
+    if output is not None:
+        return sorted((f.time, len(f.data)) for f in output.frames)
+    frames = []
+    for f in os.listdir(records_dir):
+        if f.endswith(".frames"):
+            with open(os.path.join(records_dir, f)) as lines:
+                frames.extend(
+                    (float(line.split()[0]), int(line.split()[1]))
+                    for line in lines if line.strip()
+                )
+    return sorted(frames)
+
+
+def bytes_per_frame(frames):
+    if not frames:
+        return None
+    return sum(nbytes for _, nbytes in frames) / len(frames)
+
+
+def read_times(path):
+    try:
+        with open(path) as f:
+            return [float(line.split()[0]) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def run_scenario(nb_screens, nb_widgets, duration, bspwm_rate=20,
+                 pulseaudio_rate=5, instance_per_screen=True,
+                 in_memory=False):
+    with tempfile.TemporaryDirectory() as records_dir:
+        os.environ["BARYTHON_BENCH_RECORD_DIR"] = records_dir
+        registry.reset()
+        registry.enable()
+
+        output = MemoryOutput() if in_memory else None
+        panel = build_panel(
+            nb_screens, nb_widgets, instance_per_screen, output=output
+        )
+        events_record = plug_fake_sources(
+            panel, records_dir, bspwm_rate, pulseaudio_rate
+        )
+
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        threading.Thread(target=panel.start).start()
+        time.sleep(duration)
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        panel.stop()
+        registry.disable()
+
+        events = read_times(events_record)
+        frames = read_frames(records_dir, output)
+        times = [t for t, _ in frames]
+
+    latencies = []
+    for e in events:
+        i = bisect_left(times, e)
+        if i < len(times):
+            latencies.append(times[i] - e)
+
+    cpu = (
+        usage_end.ru_utime - usage_start.ru_utime +
+        usage_end.ru_stime - usage_start.ru_stime
+    )
+    metrics = registry.snapshot()
+    return {
+        "screens": nb_screens,
+        "widgets": nb_widgets,
+        "instance_per_screen": instance_per_screen,
+        "in_memory": in_memory,
+        "duration": duration,
+        "events": len(events),
+        "frames": len(frames),
+        "fps": len(frames) / duration,
+        "bytes_per_frame": bytes_per_frame(frames),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / duration,
+        "max_rss_kb": usage_end.ru_maxrss,
+        "threads": metrics.pop("threads"),
+        "metrics": metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--screens", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    parser.add_argument("--widgets", type=int, nargs="+",
+                        default=[5, 20, 100])
+    parser.add_argument("--duration", type=float, default=5,
+                        help="duration of each scenario, in seconds")
+    parser.add_argument("--bspwm-rate", type=float, default=20,
+                        help="bspwm events per second")
+    parser.add_argument("--pulseaudio-rate", type=float, default=5,
+                        help="pulseaudio events per second")
+    parser.add_argument("--single-instance", action="store_true",
+                        help="use one lemonbar for all screens")
+    parser.add_argument("--compare-instances", action="store_true",
+                        help="run each scenario with one lemonbar per "
+                        "screen, then with one lemonbar for all screens")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="draw in memory instead of fake lemonbars")
+    parser.add_argument("--output", default=None,
+                        help="JSON output file, stdout if not set")
+    args = parser.parse_args(argv)
+
+    if args.compare_instances:
+        modes = (True, False)
+    else:
+        modes = (not args.single_instance, )
+
+    results = []
+    for nb_screens in args.screens:
+        for nb_widgets in args.widgets:
+            for instance_per_screen in modes:
+                results.append(run_scenario(
+                    nb_screens, nb_widgets, args.duration,
+                    bspwm_rate=args.bspwm_rate,
+                    pulseaudio_rate=args.pulseaudio_rate,
+                    instance_per_screen=instance_per_screen,
+                    in_memory=args.in_memory,
+                ))
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()